@@ -4,6 +4,7 @@ Generate comprehensive Postman collection for NPP Contract Management API
 All 194 endpoints organized by module
 """
 
+import argparse
 import json
 
 # Base collection structure
@@ -433,20 +434,6 @@ member_accounts_module = {
 }
 collection["item"].append(member_accounts_module)
 
-print("Generating Postman collection...")
-print(f"Added Authentication module: {len(auth_module['item'])} endpoints")
-print(f"Added Users module: {len(users_module['item'])} endpoints")
-print(f"Added Roles module: {len(roles_module['item'])} endpoints")
-print(f"Added Contracts module: {len(contracts_module['item'])} endpoints")
-print(f"Added Proposals module: {len(proposals_module['item'])} endpoints")
-print(f"Added Products module: {len(products_module['item'])} endpoints")
-print(f"Added Manufacturers module: {len(manufacturers_module['item'])} endpoints")
-print(f"Added Distributors module: {len(distributors_module['item'])} endpoints")
-print(f"Added Industries module: {len(industries_module['item'])} endpoints")
-print(f"Added OpCos module: {len(opcos_module['item'])} endpoints")
-print(f"Added Customer Accounts module: {len(customer_accounts_module['item'])} endpoints")
-print(f"Added Member Accounts module: {len(member_accounts_module['item'])} endpoints")
-
 # 13. VELOCITY MODULE (11 endpoints)
 velocity_module = {
     "name": "13. Velocity - Data Ingestion (11 endpoints)",
@@ -689,28 +676,72 @@ proposal_products_module = {
 }
 collection["item"].append(proposal_products_module)
 
-print(f"Added Velocity module: {len(velocity_module['item'])} endpoints")
-print(f"Added Reports module: {len(reports_module['item'])} endpoints")
-print(f"Added Bulk Renewal module: {len(bulk_renewal_module['item'])} endpoints")
-print(f"Added Lookup module: {len(lookup_module['item'])} endpoints")
-print(f"Added Contract Prices module: {len(contract_prices_module['item'])} endpoints")
-print(f"Added Contract Version OpCos module: {len(contract_version_opcos_module['item'])} endpoints")
-print(f"Added Contract Version Distributors module: {len(contract_version_distributors_module['item'])} endpoints")
-print(f"Added Contract Version Manufacturers module: {len(contract_version_manufacturers_module['item'])} endpoints")
-print(f"Added Contract Version Industries module: {len(contract_version_industries_module['item'])} endpoints")
-print(f"Added Contract Version Products module: {len(contract_version_products_module['item'])} endpoints")
-print(f"Added Proposal Products module: {len(proposal_products_module['item'])} endpoints")
-
-# Save to file
-with open("NPP_Contract_Management_API.postman_collection.json", "w") as f:
-    json.dump(collection, f, indent=2)
-
-print(f"\n✅ Postman collection generated successfully!")
-print(f"📁 File: NPP_Contract_Management_API.postman_collection.json")
-print(f"📊 Total modules: {len(collection['item'])}")
-total_endpoints = sum(len(module['item']) for module in collection['item'])
-print(f"📊 Total endpoints: {total_endpoints}")
-print(f"\n🎯 Import this file into Postman to test all {total_endpoints} endpoints!")
-print(f"🔑 Run 'Login' request first to get JWT token")
-print(f"🌐 Base URL: http://34.9.77.60:8081/api")
 
+# Entry point: write the collection file when run as a script
+def main():
+    parser = argparse.ArgumentParser(description="Generate the NPP Contract Management Postman collection")
+    parser.add_argument("--scan-controllers", action="store_true",
+                        help="Build the endpoint list from NPPContractManagement.API/Controllers "
+                             "and merge in the sample bodies below")
+    args = parser.parse_args()
+    if args.scan_controllers:
+        return write_scanned_collection()
+
+    print("Generating Postman collection...")
+    print(f"Added Authentication module: {len(auth_module['item'])} endpoints")
+    print(f"Added Users module: {len(users_module['item'])} endpoints")
+    print(f"Added Roles module: {len(roles_module['item'])} endpoints")
+    print(f"Added Contracts module: {len(contracts_module['item'])} endpoints")
+    print(f"Added Proposals module: {len(proposals_module['item'])} endpoints")
+    print(f"Added Products module: {len(products_module['item'])} endpoints")
+    print(f"Added Manufacturers module: {len(manufacturers_module['item'])} endpoints")
+    print(f"Added Distributors module: {len(distributors_module['item'])} endpoints")
+    print(f"Added Industries module: {len(industries_module['item'])} endpoints")
+    print(f"Added OpCos module: {len(opcos_module['item'])} endpoints")
+    print(f"Added Customer Accounts module: {len(customer_accounts_module['item'])} endpoints")
+    print(f"Added Member Accounts module: {len(member_accounts_module['item'])} endpoints")
+    print(f"Added Velocity module: {len(velocity_module['item'])} endpoints")
+    print(f"Added Reports module: {len(reports_module['item'])} endpoints")
+    print(f"Added Bulk Renewal module: {len(bulk_renewal_module['item'])} endpoints")
+    print(f"Added Lookup module: {len(lookup_module['item'])} endpoints")
+    print(f"Added Contract Prices module: {len(contract_prices_module['item'])} endpoints")
+    print(f"Added Contract Version OpCos module: {len(contract_version_opcos_module['item'])} endpoints")
+    print(f"Added Contract Version Distributors module: {len(contract_version_distributors_module['item'])} endpoints")
+    print(f"Added Contract Version Manufacturers module: {len(contract_version_manufacturers_module['item'])} endpoints")
+    print(f"Added Contract Version Industries module: {len(contract_version_industries_module['item'])} endpoints")
+    print(f"Added Contract Version Products module: {len(contract_version_products_module['item'])} endpoints")
+    print(f"Added Proposal Products module: {len(proposal_products_module['item'])} endpoints")
+
+    # Save to file
+    with open("NPP_Contract_Management_API.postman_collection.json", "w") as f:
+        json.dump(collection, f, indent=2)
+
+    print(f"\n✅ Postman collection generated successfully!")
+    print(f"📁 File: NPP_Contract_Management_API.postman_collection.json")
+    print(f"📊 Total modules: {len(collection['item'])}")
+    total_endpoints = sum(len(module['item']) for module in collection['item'])
+    print(f"📊 Total endpoints: {total_endpoints}")
+    print(f"\n🎯 Import this file into Postman to test all {total_endpoints} endpoints!")
+    print(f"🔑 Run 'Login' request first to get JWT token")
+    print(f"🌐 Base URL: http://34.9.77.60:8081/api")
+
+
+def write_scanned_collection():
+    from perf.controller_scan import scanned_collection
+
+    scanned, stale = scanned_collection()
+    with open("NPP_Contract_Management_API.postman_collection.json", "w") as f:
+        json.dump(scanned, f, indent=2)
+
+    total_endpoints = sum(len(module['item']) for module in scanned['item'])
+    print(f"✅ Postman collection generated from controllers!")
+    print(f"📁 File: NPP_Contract_Management_API.postman_collection.json")
+    print(f"📊 Total modules: {len(scanned['item'])}")
+    print(f"📊 Total endpoints: {total_endpoints}")
+    if stale:
+        print(f"⚠️  {len(stale)} hand-written requests match no controller route "
+              f"(python -m perf.controller_scan --report)")
+
+
+if __name__ == "__main__":
+    main()
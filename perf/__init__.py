@@ -0,0 +1,7 @@
+"""
+Performance tooling for the NPP Contract Management API.
+
+Everything here is driven by the request registry that
+generate_postman_collection.py builds, so new endpoints added to the
+collection are picked up by the load tools automatically.
+"""
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-send templating vs compiled request plans
+
+Measures how many requests per second one core can prepare when every send
+resolves {{baseUrl}}/{{token}} and re-encodes the body ("template", what the
+runner did before plans), against the compiled plan paths ("plan" for aiohttp,
+"wire" for raw HTTP/1.1 bytes). With --base-url it also logs in, sends the
+GET items (session items and uploads excluded, as in perf.runner) and reports
+requests per CPU-second for both paths.
+
+Usage:
+    python -m perf.bench_plan --seconds 2
+    python -m perf.bench_plan --base-url http://127.0.0.1:8080/api --requests 5000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from yarl import URL
+
+from perf.collection import build_request, collection_variables, iter_items, load_collection
+from perf.plan import bearer_line, bearer_value, compile_plan
+from perf.runner import add_common_arguments, login, open_session, select_items, send
+from perf.stats import format_table
+
+SAMPLE_TOKEN = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "x" * 280 + ".signature"
+
+
+def _items(collection):
+    return [(m, i) for m, i in iter_items(collection)
+            if i["request"].get("body", {}).get("mode") != "formdata"]
+
+
+def _cpu_rate(prepare, count, seconds):
+    """Run prepare(i) until `seconds` of CPU time are used; return ops per CPU-second."""
+    done = 0
+    start = time.process_time()
+    deadline = start + seconds
+    while True:
+        for i in range(1000):
+            prepare(i % count)
+        done += 1000
+        now = time.process_time()
+        if now >= deadline:
+            return done / (now - start)
+
+
+def bench_prepare(items, variables, seconds):
+    plan = compile_plan(items, variables)
+    count = len(items)
+    bearer = bearer_value(variables["token"])
+    line = bearer_line(variables["token"])
+
+    def template(i):
+        method, url, headers, data = build_request(items[i][1], variables)
+        return method, URL(url), headers, data
+
+    def compiled(i):
+        request = plan[i]
+        return request.method, request.url, request.request_headers(bearer), request.body
+
+    def wire(i):
+        return plan[i].wire(line)
+
+    return [("template (before)", _cpu_rate(template, count, seconds)),
+            ("plan (aiohttp)", _cpu_rate(compiled, count, seconds)),
+            ("wire (raw bytes)", _cpu_rate(wire, count, seconds))]
+
+
+async def bench_send(items, collection, variables, requests, concurrency, user=None, password=None,
+                     timeout=30.0):
+    results = []
+    async with open_session(concurrency, timeout) as session:
+        await login(session, collection, variables, user, password)
+        plan = compile_plan(items, variables)
+        bearer = bearer_value(variables["token"])
+        for label, prepare in (
+            ("template (before)", lambda i: build_request(items[i][1], variables)),
+            ("plan (aiohttp)", lambda i: (plan[i].method, plan[i].url,
+                                          plan[i].request_headers(bearer), plan[i].body)),
+        ):
+            counter = iter(range(requests))
+
+            async def worker():
+                for n in counter:
+                    method, url, headers, data = prepare(n % len(items))
+                    await send(session, method, url, headers, data)
+
+            start = time.process_time()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            results.append((label, requests / (time.process_time() - start)))
+    return results
+
+
+def _print(title, results):
+    baseline = results[0][1]
+    rows = [{"name": label, "rate": rate, "speedup": rate / baseline} for label, rate in results]
+    print(title)
+    print(format_table(rows, [("name", "Path"), ("rate", "Req/s per core", ",.0f"),
+                              ("speedup", "Speedup", ".2f")]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--seconds", type=float, default=1.0, help="CPU seconds per prepare variant")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per path with --base-url")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    items = _items(collection)
+
+    _print(f"Request preparation ({len(items)} items, {args.seconds:g} CPU s each)",
+           bench_prepare(items, dict(variables, token=SAMPLE_TOKEN), args.seconds))
+    if args.base_url:
+        # Only reads, with a real token: writes and 401s would time error paths
+        send_items = select_items(collection, None, ["GET"])
+        print()
+        _print(f"End to end against {args.base_url} ({len(send_items)} GET items, {args.requests} requests each)",
+               asyncio.run(bench_send(send_items, collection, variables, args.requests, args.concurrency,
+                                      args.user, args.password, args.timeout)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
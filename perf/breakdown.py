@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Client / server / database latency breakdown per endpoint
+
+perf.runner --correlate FILE tags every request with an X-Correlation-ID
+header and writes the client-side timing of each request to FILE. The API's
+Serilog template prints neither headers nor scope properties, so the same id
+is also sent as a perfcid query parameter, which the Hosting.Diagnostics
+"Request starting"/"Request finished" lines do carry. This tool streams the
+API log, joins each tagged request to its "Request finished" time and sums the
+"Executed DbCommand (Nms)" entries logged while it was open. Each request is
+split into
+
+    network  client latency - server time: TCP, Kestrel queueing, client overhead
+    app      server time - DB time: middleware (CORS, RequestLogger, auth),
+             routing, controller and service code, serialization
+    db       EF Core command time
+
+and the report gives p50/p95 of each layer per endpoint, plus each layer's
+share of the mean client latency. Percentiles of the layers do not add up to
+the client percentile; the shares do.
+
+Log lines carry no request id, so a DbCommand logged while several requests
+are open is split evenly between them, as in perf.query_log. The Shared
+column is the fraction of requests that had such commands; run the load at
+--concurrency 1 for an exact split.
+
+Usage:
+    python -m perf.runner --base-url http://localhost:5143/api --concurrency 1 --requests 5000 \
+        --correlate /tmp/timings.csv
+    python -m perf.breakdown /tmp/timings.csv NPPContractManagement.API/logs/npp-20261018.log
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+from yarl import URL
+
+from perf.serilog import db_command, iter_log, request_finished, request_starting
+from perf.stats import format_table, percentile
+
+HEADER = "X-Correlation-ID"
+PARAMETER = "perfcid"
+LAYERS = ("network", "app", "db")
+TIMING_FIELDS = ["correlation_id", "module", "endpoint", "method", "status", "client_ms"]
+
+_CORRELATION = re.compile(r"[?&]" + PARAMETER + r"=([0-9a-z]+-[0-9a-f]+)")
+
+
+class Correlator:
+    """Tags requests with correlation ids and keeps their client timings."""
+
+    def __init__(self):
+        self.prefix = os.urandom(3).hex()
+        self.rows = []
+        self.next_id = 0
+
+    def tag(self, url, headers):
+        """(correlation id, url, headers) for a yarl URL, with the id in the query string and header."""
+        correlation_id = f"{self.prefix}-{self.next_id:x}"
+        self.next_id += 1
+        # Appended as text: update_query() would re-encode the rest of an already encoded query
+        url = URL(f"{url}{'&' if url.raw_query_string else '?'}{PARAMETER}={correlation_id}", encoded=True)
+        headers = dict(headers, **{HEADER: correlation_id})
+        return correlation_id, url, headers
+
+    def record(self, correlation_id, module, name, method, latency, status):
+        self.rows.append((correlation_id, module, name, method, status, round(latency * 1000.0, 3)))
+
+    def write(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(TIMING_FIELDS)
+            writer.writerows(self.rows)
+
+
+def load_timings(path):
+    """{correlation id: timing row} from a --correlate file."""
+    timings = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            row["client_ms"] = float(row["client_ms"])
+            timings[row["correlation_id"]] = row
+    return timings
+
+
+class _OpenRequest:
+    __slots__ = ("correlation_id", "db_ms", "commands", "shared")
+
+    def __init__(self, correlation_id):
+        self.correlation_id = correlation_id
+        self.db_ms = 0.0
+        self.commands = 0.0
+        self.shared = False
+
+
+def join_log(paths, timings):
+    """Attach server and DB time to the timing rows; returns the number joined.
+
+    Untagged requests in the log (other clients) still count as open when a
+    DbCommand is split, so a busy shared server shows up as a high Shared.
+    """
+    joined = 0
+    for path in paths:
+        open_requests = {}
+        untagged = 0
+        for entry in iter_log(path):
+            command = db_command(entry)
+            if command:
+                active = list(open_requests.values())
+                if not active:
+                    continue
+                share = 1.0 / (len(active) + untagged)
+                for request in active:
+                    request.db_ms += command[0] * share
+                    request.commands += share
+                    request.shared |= share < 1.0
+                continue
+            started = request_starting(entry)
+            if started:
+                match = _CORRELATION.search(started[1])
+                if match and match.group(1) in timings:
+                    open_requests[match.group(1)] = _OpenRequest(match.group(1))
+                elif started[0] != "OPTIONS":
+                    untagged += 1
+                continue
+            finished = request_finished(entry)
+            if finished:
+                match = _CORRELATION.search(finished[1])
+                request = open_requests.pop(match.group(1), None) if match else None
+                if request is None:
+                    if finished[0] != "OPTIONS" and untagged:
+                        untagged -= 1
+                    continue
+                row = timings[request.correlation_id]
+                row.update(server_ms=finished[3], db_ms=request.db_ms, commands=request.commands,
+                           shared=request.shared, server_status=finished[2])
+                joined += 1
+    return joined
+
+
+def split(row):
+    """{layer: ms} for a joined timing row."""
+    server = row["server_ms"]
+    db = min(row["db_ms"], server)
+    return {"network": max(0.0, row["client_ms"] - server), "app": server - db, "db": db}
+
+
+def waterfall_rows(timings):
+    """Per-endpoint layer percentiles and mean shares, plus an "All" row."""
+    groups = {}
+    for row in timings.values():
+        if "server_ms" in row:
+            groups.setdefault(f"{row['module']} / {row['endpoint']}", []).append(row)
+    groups_all = [row for rows in groups.values() for row in rows]
+    rows = []
+    for name, group in sorted(groups.items()) + ([("All", groups_all)] if len(groups) > 1 else []):
+        layers = {layer: [] for layer in LAYERS}
+        client = sorted(row["client_ms"] for row in group)
+        for row in group:
+            for layer, value in split(row).items():
+                layers[layer].append(value)
+        total = sum(client)
+        out = {"name": name, "count": len(group), "client_p50_ms": percentile(client, 50),
+               "client_p95_ms": percentile(client, 95),
+               "commands": sum(row["commands"] for row in group) / len(group),
+               "shared": sum(row["shared"] for row in group) / len(group)}
+        for layer, values in layers.items():
+            values.sort()
+            out[f"{layer}_p50_ms"] = percentile(values, 50)
+            out[f"{layer}_p95_ms"] = percentile(values, 95)
+            out[f"{layer}_share"] = sum(values) / total if total else None
+        out["largest"] = max(LAYERS, key=lambda layer: out[f"{layer}_share"] or 0)
+        rows.append(out)
+    return rows
+
+
+WATERFALL_COLUMNS = [
+    ("name", "Endpoint"),
+    ("count", "Count", "d"),
+    ("client_p50_ms", "Client p50", ".1f"),
+    ("client_p95_ms", "Client p95", ".1f"),
+    ("network_p50_ms", "Net p50", ".1f"),
+    ("network_p95_ms", "Net p95", ".1f"),
+    ("app_p50_ms", "App p50", ".1f"),
+    ("app_p95_ms", "App p95", ".1f"),
+    ("db_p50_ms", "DB p50", ".1f"),
+    ("db_p95_ms", "DB p95", ".1f"),
+    ("network_share", "Net %", ".0%"),
+    ("app_share", "App %", ".0%"),
+    ("db_share", "DB %", ".0%"),
+    ("commands", "Cmds/req", ".1f"),
+    ("shared", "Shared", ".0%"),
+    ("largest", "Largest"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("timings", help="CSV written by perf.runner --correlate")
+    parser.add_argument("logs", nargs="+", help="API log files covering the run (plain or .gz)")
+    parser.add_argument("--json", help="Write the per-endpoint rows to this file")
+    args = parser.parse_args(argv)
+
+    timings = load_timings(args.timings)
+    joined = join_log(args.logs, timings)
+    print(f"Joined {joined:,} of {len(timings):,} tagged requests to the API log")
+    if not joined:
+        print("No tagged requests found; is the log from the same run and at Information level?",
+              file=sys.stderr)
+        return 1
+    rows = waterfall_rows(timings)
+    print(format_table(rows, WATERFALL_COLUMNS))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
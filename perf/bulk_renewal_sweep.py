@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Bulk renewal scaling sweep
+
+Calls BulkRenewalController's "Validate Contracts" item (and with --execute
+"Create Bulk Renewal") with contract id lists of geometrically growing size,
+records latency, response bytes and server DB time per size, and fits
+latency = c + a * n^b. An exponent b above --superlinear flags a renewal
+path that grows faster than the number of contracts. Both items come from
+the endpoint registry (POST /BulkRenewal/validate and /create). The
+hand-written collection's /bulk-renewal/preview and /execute routes do not
+exist in the API.
+
+Only sizes where every sample returned 2xx are fitted. A size that fails is
+shown with its status and makes the exit code 1.
+
+Server DB time comes from the API's Serilog file (--api-log): the sum of
+"Executed DbCommand (Nms)" entries inside each request. Requests are sent one
+at a time so that attribution is exact.
+
+Usage:
+    python -m perf.bulk_renewal_sweep --base-url http://localhost:5143/api \
+        --max-size 1024 --api-log NPPContractManagement.API/logs/npp-20260220.log
+    python -m perf.bulk_renewal_sweep --ids contract_ids.txt --execute   # disposable DB only
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from perf.collection import build_request, collection_variables, find_item, item_body, item_path, load_collection
+from perf.runner import add_common_arguments, login, open_session
+from perf.serilog import LogTail, db_time_for
+from perf.stats import fit_power_law, format_table, geometric_sizes
+
+PREVIEW_ITEM = "Validate Contracts"
+EXECUTE_ITEM = "Create Bulk Renewal"
+# BulkRenewalRequest with no price change, due date or extra products, so only the contract count varies
+RENEWAL_REQUEST = {"contractIds": [], "pricingAdjustment": None, "proposalDueDate": None,
+                   "additionalProductIds": []}
+
+
+def load_ids(path):
+    """Contract ids from a JSON list or a file with one id per line."""
+    with open(path) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return [int(i) for i in json.loads(text)]
+    return [int(line.split(",")[0]) for line in text.splitlines() if line.strip()[:1].isdigit()]
+
+
+async def _send(session, item, variables, body):
+    method, url, headers, _ = build_request(item, variables)
+    # The body replaces the item's, which may have none; [ApiController] answers 415 without the header
+    headers = dict(headers, **{"Content-Type": "application/json"})
+    start = time.perf_counter()
+    async with session.request(method, url, headers=headers,
+                               data=json.dumps(body, separators=(",", ":")).encode("utf-8")) as response:
+        payload = await response.read()
+        return response.status, time.perf_counter() - start, len(payload)
+
+
+async def sweep(session, item, variables, ids, sizes, samples, tail, settle):
+    template = item_body(item)
+    method = item["request"]["method"].upper()
+    path = item_path(item).split("?", 1)[0]
+    results = []
+    for size in sizes:
+        # ValidateContracts takes a bare id list, CreateBulkRenewal a BulkRenewalRequest
+        body = ids[:size] if isinstance(template, list) else dict(RENEWAL_REQUEST, contractIds=ids[:size])
+        runs = []
+        for _ in range(samples):
+            if tail:
+                tail.read()
+            status, latency, size_bytes = await _send(session, item, variables, body)
+            db = None
+            if tail:
+                await asyncio.sleep(settle)  # let Serilog flush the request's entries
+                db = db_time_for(tail.read(), method, path)
+            runs.append((status, latency, size_bytes, db))
+        row = {"size": size, "status": ",".join(sorted({str(r[0]) for r in runs})),
+               "failed": any(not 200 <= r[0] < 300 for r in runs)}
+        # Error responses are fast and small; their timings would fake a growth curve
+        ok = [r for r in runs if 200 <= r[0] < 300]
+        if ok:
+            latencies = [r[1] for r in ok]
+            has_db = all(r[3] for r in ok)
+            row.update({
+                "latency_ms": statistics.median(latencies) * 1000.0,
+                "min_ms": min(latencies) * 1000.0,
+                "bytes": int(statistics.median(r[2] for r in ok)),
+                "db_ms": statistics.median(r[3][0] for r in ok) if has_db else None,
+                "db_commands": int(statistics.median(r[3][1] for r in ok)) if has_db else None,
+                "server_ms": statistics.median(r[3][2] for r in ok) if has_db else None,
+            })
+        results.append(row)
+        print(f"  n={size:<6} {row.get('latency_ms', 0):9.1f} ms  {row.get('bytes', 0):>10,} B  "
+              f"HTTP {row['status']}", file=sys.stderr)
+    return results
+
+
+def analyze(results, superlinear):
+    """Growth fits for latency, bytes and DB time over the sizes that succeeded;
+    flags exponents above `superlinear`."""
+    results = [r for r in results if not r["failed"]]
+    xs = [r["size"] for r in results]
+    fits = {}
+    for metric in ("latency_ms", "bytes", "db_ms", "db_commands"):
+        ys = [r[metric] for r in results]
+        if all(y is not None for y in ys):
+            fit = fit_power_law(xs, ys)
+            if fit:
+                fit["superlinear"] = fit["b"] > superlinear
+                fits[metric] = fit
+    # Marginal cost per contract between neighbouring sizes; a rising value is the superlinear part
+    for previous, current in zip(results, results[1:]):
+        current["ms_per_contract"] = ((current["latency_ms"] - previous["latency_ms"])
+                                      / (current["size"] - previous["size"]))
+    return fits
+
+
+def print_report(label, results, fits):
+    print(f"\n{label}")
+    print(format_table(results, [
+        ("size", "Contracts"), ("status", "HTTP"), ("latency_ms", "Median ms", ".1f"),
+        ("min_ms", "Min ms", ".1f"), ("ms_per_contract", "Marginal ms/contract", ".3f"),
+        ("bytes", "Response bytes", ","), ("db_ms", "DB ms", ".0f"), ("db_commands", "DB commands"),
+        ("server_ms", "Server ms", ".1f"),
+    ]))
+    for metric, fit in fits.items():
+        flag = "  <-- SUPERLINEAR" if fit["superlinear"] else ""
+        print(f"  {metric:12} ~ {fit['c']:.2f} + {fit['a']:.4g} * n^{fit['b']:.2f}  (R²={fit['r2']:.3f}){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--ids", help="File with contract ids (JSON list or one per line); "
+                                      "default: consecutive ids from --first-id")
+    parser.add_argument("--first-id", type=int, default=1)
+    parser.add_argument("--start-size", type=int, default=1)
+    parser.add_argument("--max-size", type=int, default=512)
+    parser.add_argument("--factor", type=float, default=2.0, help="Growth factor between sizes")
+    parser.add_argument("--samples", type=int, default=3, help="Requests per size (median is reported)")
+    parser.add_argument("--execute", action="store_true",
+                        help="Also sweep Execute Bulk Renewal. This renews contracts: "
+                             "only use against a disposable database")
+    parser.add_argument("--preview-item", default=PREVIEW_ITEM)
+    parser.add_argument("--execute-item", default=EXECUTE_ITEM)
+    parser.add_argument("--api-log", help="API Serilog file to read server DB time from")
+    parser.add_argument("--log-settle", type=float, default=0.2,
+                        help="Seconds to wait for log entries after each request")
+    parser.add_argument("--superlinear", type=float, default=1.15,
+                        help="Growth exponent above which a metric is flagged")
+    parser.add_argument("--json", help="Write results and fits to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    sizes = geometric_sizes(args.start_size, args.max_size, args.factor)
+    ids = load_ids(args.ids) if args.ids else list(range(args.first_id, args.first_id + sizes[-1]))
+    if len(ids) < sizes[-1]:
+        sizes = [s for s in sizes if s <= len(ids)]
+        print(f"Only {len(ids)} contract ids available; sweeping up to {sizes[-1]}", file=sys.stderr)
+    names = [args.preview_item] + ([args.execute_item] if args.execute else [])
+    items = [find_item(collection, name) for name in names]
+    if None in items and not args.scan_controllers and not args.collection:
+        # The default items only exist in the endpoint registry
+        scanned = load_collection(None, True)
+        items = [item or find_item(scanned, name) for name, item in zip(names, items)]
+    if None in items:
+        parser.error(f"Collection has no item named {names[items.index(None)]!r}")
+
+    async def run():
+        async with open_session(1, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            tail = LogTail(args.api_log) if args.api_log else None
+            out = {}
+            for name, item in zip(names, items):
+                print(f"{name}: sizes {sizes}", file=sys.stderr)
+                out[name] = await sweep(session, item, variables, ids, sizes, args.samples, tail,
+                                        args.log_settle)
+            return out
+
+    report = {}
+    flagged = False
+    for name, results in asyncio.run(run()).items():
+        fits = analyze(results, args.superlinear)
+        print_report(name, results, fits)
+        failed = [r["size"] for r in results if r["failed"]]
+        if failed:
+            print(f"  {len(failed)} sizes failed ({', '.join(map(str, failed))}); they are not fitted")
+        flagged = flagged or bool(failed) or any(f["superlinear"] for f in fits.values())
+        report[name] = {"results": results, "fits": fits}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+HTTP caching and conditional-request analyzer for the lookup endpoints
+
+The anonymous /lookup GETs (price types, statuses, states, currencies, ...;
+with --scan-controllers the real /v1/lookup routes) serve reference data.
+The Angular services fetch it again on nearly every screen. For each
+endpoint this tool sends --samples plain requests and then repeats them with
+If-None-Match / If-Modified-Since from the validators it got back. It
+reports:
+
+    ETag, Last-Modified, Cache-Control/Expires freshness, whether the body is
+    identical on every request, and whether the conditional request gets a 304
+
+and classifies the endpoint:
+
+    fresh              max-age/Expires > 0: repeat loads never reach the API
+    revalidates        validators work: repeat loads cost a 304
+    validator ignored  ETag/Last-Modified sent, but conditional requests get 200
+    uncached           same body every time, no validators or freshness
+    changes            the body differs between requests
+
+Non-2xx responses and connection errors are "failed": they are left out of
+the totals and the --baseline comparison, and the exit code is 1.
+
+A page load that fetches every endpoint costs the full response (headers
+plus body) and the full latency for an uncached endpoint, a 304 for one that
+revalidates, and nothing for a fresh one. "Saved" is what a fresh cache hit
+would save on top of the current behaviour. With --logs the API's request
+log supplies the observed volume per endpoint, which gives the same figures
+per day.
+
+After a deploy, run it with --baseline set to the previous --json output. It
+exits 1 if an endpoint is cached less than it was: fresh → revalidates, or
+revalidates → served in full.
+
+Usage:
+    python -m perf.caching --base-url http://localhost:5143/api --scan-controllers --json cache.json
+    python -m perf.caching --scan-controllers --logs NPPContractManagement.API/logs/npp-*.log \
+        --baseline cache.json
+"""
+
+import argparse
+import asyncio
+import email.utils
+import glob
+import hashlib
+import json
+import statistics
+import sys
+import time
+
+import aiohttp
+
+from perf.collection import (
+    build_request, collection_variables, item_method, item_path, item_requires_auth, iter_items,
+    load_collection,
+)
+from perf.runner import add_common_arguments, open_session
+from perf.serilog import iter_log, request_finished, url_path
+from perf.stats import format_table
+
+# How much of the repeat-load cost the verdict removes; a lower rank after a deploy is a regression
+_RANK = {"fresh": 2, "revalidates": 1}
+
+
+def lookup_targets(collection, names=None):
+    """[(module, item)] for the anonymous GET items under /lookup/."""
+    targets = []
+    for module, item in iter_items(collection):
+        if names and item["name"] not in names:
+            continue
+        if item_method(item) == "GET" and not item_requires_auth(item) and "/lookup/" in item_path(item):
+            targets.append((module, item))
+    return targets
+
+
+def cache_control(value):
+    """{directive: value or True} from a Cache-Control header."""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+
+def freshness(headers):
+    """Freshness lifetime in seconds the response allows a browser cache (0 if none)."""
+    directives = cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    for name in ("max-age", "s-maxage"):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except (TypeError, ValueError):
+                return 0
+    if headers.get("Expires"):
+        try:
+            expires = email.utils.parsedate_to_datetime(headers["Expires"]).timestamp()
+            date = (email.utils.parsedate_to_datetime(headers["Date"]).timestamp()
+                    if headers.get("Date") else time.time())
+            return max(0, int(expires - date))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+async def fetch(session, url, headers):
+    """(status, ms, header bytes, body bytes, body digest, response headers) for one GET."""
+    start = time.perf_counter()
+    async with session.get(url, headers=headers) as response:
+        body = await response.read()
+        ms = (time.perf_counter() - start) * 1000.0
+        header_bytes = sum(len(k) + len(v) + 4 for k, v in response.raw_headers) + 17
+        # Bytes on the wire: the encoded length when the server compressed the body
+        body_bytes = int(response.headers.get("Content-Length", len(body)))
+        return (response.status, ms, header_bytes, body_bytes, hashlib.sha1(body).hexdigest(),
+                response.headers.copy())
+
+
+async def probe(session, url, headers, samples):
+    """Plain and conditional requests for one endpoint; returns a result row."""
+    plain = [await fetch(session, url, headers) for _ in range(samples)]
+    status, _, header_bytes, body_bytes, _, response_headers = plain[-1]
+    row = {
+        "status": status, "ms": statistics.median(r[1] for r in plain),
+        "bytes": header_bytes + body_bytes, "body_bytes": body_bytes,
+        "etag": response_headers.get("ETag"), "last_modified": response_headers.get("Last-Modified"),
+        "cache_control": response_headers.get("Cache-Control"), "max_age": freshness(response_headers),
+        "stable": len({r[4] for r in plain}) == 1,
+        "conditional_status": None, "conditional_ms": None, "conditional_bytes": None,
+    }
+    conditional = dict(headers)
+    if row["etag"]:
+        conditional["If-None-Match"] = row["etag"]
+    if row["last_modified"]:
+        conditional["If-Modified-Since"] = row["last_modified"]
+    if len(conditional) > len(headers):
+        revalidated = [await fetch(session, url, conditional) for _ in range(samples)]
+        row["conditional_status"] = ",".join(sorted({str(r[0]) for r in revalidated}))
+        row["conditional_ms"] = statistics.median(r[1] for r in revalidated)
+        row["conditional_bytes"] = statistics.median(r[2] + r[3] for r in revalidated)
+    return row
+
+
+def classify(row):
+    """Verdict, plus the bytes and ms a repeat load costs today."""
+    if row["max_age"] > 0:
+        return "fresh", 0, 0.0
+    if row["conditional_status"] == "304":
+        return "revalidates", row["conditional_bytes"], row["conditional_ms"]
+    if row["conditional_status"]:
+        verdict = "validator ignored"
+    else:
+        verdict = "uncached" if row["stable"] else "changes"
+    return verdict, row["bytes"], row["ms"]
+
+
+def observed_traffic(paths, targets):
+    """{item name: (GETs, 304s)} and the seconds the log files span."""
+    templates = [(item_path(item).split("?")[0].lower(), item["name"]) for _, item in targets]
+    counts = {}
+    first = last = None
+    for path in paths:
+        for entry in iter_log(path):
+            finished = request_finished(entry)
+            if not finished or finished[0] != "GET":
+                continue
+            request_path = url_path(finished[1])
+            for template, name in templates:
+                if request_path.endswith(template):
+                    requests, not_modified = counts.get(name, (0, 0))
+                    counts[name] = (requests + 1, not_modified + (finished[2] == 304))
+                    first = entry.timestamp if first is None else first
+                    last = entry.timestamp
+                    break
+    return counts, (last - first) if first is not None else 0.0
+
+
+def regressions(rows, baseline):
+    """[(name, was, now)] for endpoints cached less than in the baseline rows."""
+    before = {row["name"]: row["verdict"] for row in baseline}
+    return [(row["name"], before[row["name"]], row["verdict"]) for row in rows
+            if row["name"] in before and _RANK.get(row["verdict"], 0) < _RANK.get(before[row["name"]], 0)]
+
+
+CACHE_COLUMNS = [
+    ("name", "Endpoint"),
+    ("status", "HTTP"),
+    ("bytes", "Bytes", ",.0f"),
+    ("ms", "ms", ".1f"),
+    ("has_etag", "ETag"),
+    ("has_last_modified", "Last-Mod"),
+    ("cache_control", "Cache-Control"),
+    ("conditional_status", "Conditional"),
+    ("conditional_ms", "Cond ms", ".1f"),
+    ("verdict", "Verdict"),
+    ("saved_bytes", "Saved B/load", ",.0f"),
+    ("saved_ms", "Saved ms/load", ".1f"),
+    ("per_day", "Req/day", ",.0f"),
+    ("observed_304", "Logged 304s", ",d"),
+    ("saved_mb_per_day", "Saved MB/day", ",.1f"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--items", nargs="*", help="Item names (default: every anonymous /lookup/ GET)")
+    parser.add_argument("--samples", type=int, default=5, help="Plain and conditional requests per endpoint")
+    parser.add_argument("--logs", nargs="*", help="API log files (globs) for the observed request volume")
+    parser.add_argument("--baseline", help="Previous --json output; exit 1 if caching regressed")
+    parser.add_argument("--json", help="Write the per-endpoint results to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    targets = lookup_targets(collection, args.items)
+    if not targets:
+        print("No anonymous /lookup/ GET items found", file=sys.stderr)
+        return 2
+
+    async def run():
+        rows = []
+        async with open_session(1, args.timeout) as session:
+            for module, item in targets:
+                _, url, headers, _ = build_request(item, variables)
+                try:
+                    row = await probe(session, url, headers, args.samples)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    row = {"status": type(e).__name__}
+                row.update(name=item["name"], path=item_path(item))
+                rows.append(row)
+        return rows
+
+    print(f"Probing {len(targets)} lookup endpoints at {variables['baseUrl']}", file=sys.stderr)
+    rows = asyncio.run(run())
+    counts, span = ({}, 0.0)
+    if args.logs:
+        paths = sorted({path for pattern in args.logs for path in glob.glob(pattern)})
+        counts, span = observed_traffic(paths, targets)
+    for row in rows:
+        # Error responses (404 on a missing route, 5xx) say nothing about caching
+        if "bytes" not in row or not 200 <= row["status"] < 300:
+            row["verdict"] = "failed"
+            continue
+        row["verdict"], row["saved_bytes"], row["saved_ms"] = classify(row)
+        row["has_etag"] = "yes" if row["etag"] else "no"
+        row["has_last_modified"] = "yes" if row["last_modified"] else "no"
+        if span > 0:
+            requests, row["observed_304"] = counts.get(row["name"], (0, 0))
+            row["per_day"] = requests * 86400.0 / span
+            row["saved_mb_per_day"] = row["per_day"] * row["saved_bytes"] / 1e6
+
+    print(format_table(rows, CACHE_COLUMNS))
+    measured = [row for row in rows if row["verdict"] != "failed"]
+    print(f"\nA page load fetching all {len(measured)} endpoints: "
+          f"{sum(r['saved_bytes'] for r in measured):,.0f} bytes and "
+          f"{sum(r['saved_ms'] for r in measured):,.1f} ms of sequential latency would be saved by fresh caching")
+    if span > 0:
+        print(f"Observed traffic ({span / 3600:.1f} h of logs): "
+              f"{sum(r.get('saved_mb_per_day', 0) for r in measured):,.1f} MB/day and "
+              f"{sum(r.get('per_day', 0) * r['saved_ms'] for r in measured) / 1000:,.0f} "
+              f"request-seconds/day would be saved")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    failed = len(rows) - len(measured)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(measured, json.load(f))
+        for name, was, now in found:
+            print(f"  REGRESSION {name}: {was} -> {now}")
+        if found:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Access to the Postman collection built by generate_postman_collection.py
+
+Loads the in-memory collection (module dicts + create_request items) and
+turns items into plain (method, url, headers, body) tuples for the load tools.
+"""
+
+import json
+import os
+import re
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLLECTION_FILE = os.path.join(REPO_ROOT, "NPP_Contract_Management_API.postman_collection.json")
+
+_VARIABLE = re.compile(r"\{\{(\w+)\}\}")
+_MODULE_NAME = re.compile(r"^\s*(\d+)\.\s*(.*?)\s*(\(\d+ endpoints\))?\s*$")
+
+
+def load_collection(path=None, scanned=False):
+    """Return the collection dict, from the generator module or a JSON export.
+
+    scanned=True builds the endpoint list from the controllers instead
+    (see perf.controller_scan), keeping the hand-written sample bodies.
+    """
+    if scanned:
+        from perf.controller_scan import scanned_collection
+        return scanned_collection()[0]
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import generate_postman_collection
+    return generate_postman_collection.collection
+
+
+def collection_variables(collection, base_url=None):
+    """Collection variables ({{baseUrl}}, {{token}}, ...) as a dict."""
+    variables = {v["key"]: v.get("value", "") for v in collection.get("variable", [])}
+    if base_url:
+        variables["baseUrl"] = base_url.rstrip("/")
+    return variables
+
+
+def module_short_name(name):
+    """'04. Contracts (24 endpoints)' -> 'Contracts'"""
+    match = _MODULE_NAME.match(name)
+    return match.group(2) if match else name
+
+
+def module_matches(name, selectors):
+    """Match a module by number ('04'), short name or substring ('contract version')."""
+    if not selectors:
+        return True
+    match = _MODULE_NAME.match(name)
+    number = match.group(1) if match else ""
+    lowered = name.lower()
+    for selector in selectors:
+        selector = selector.strip().lower()
+        if selector.isdigit():
+            # Numbers only select by module number; "4" must not match "(24 endpoints)"
+            if number and int(selector) == int(number):
+                return True
+            continue
+        if selector and selector in lowered:
+            return True
+    return False
+
+
+def iter_items(collection, modules=None):
+    """Yield (module short name, item) for every request item in the collection."""
+    for module in collection["item"]:
+        if not module_matches(module["name"], modules):
+            continue
+        short = module_short_name(module["name"])
+        for item in module["item"]:
+            yield short, item
+
+
+def find_item(collection, name):
+    """Return the first item with the given name, or None."""
+    for _, item in iter_items(collection):
+        if item["name"] == name:
+            return item
+    return None
+
+
+def substitute(text, variables):
+    """Resolve {{var}} placeholders; unknown variables are left untouched."""
+    return _VARIABLE.sub(lambda m: str(variables.get(m.group(1), m.group(0))), text)
+
+
+def item_method(item):
+    return item["request"]["method"].upper()
+
+
+def item_path(item):
+    """Path and query of the item without the {{baseUrl}} prefix."""
+    raw = item["request"]["url"]["raw"]
+    return raw[len("{{baseUrl}}"):] if raw.startswith("{{baseUrl}}") else raw
+
+
+def item_requires_auth(item):
+    return item["request"].get("auth", {}).get("type") != "noauth"
+
+
+def item_is_upload(item):
+    return item["request"].get("body", {}).get("mode") == "formdata"
+
+
+def item_body(item):
+    """The raw JSON body as a Python value, or None."""
+    body = item["request"].get("body")
+    if not body or body.get("mode") != "raw":
+        return None
+    return json.loads(body["raw"])
+
+
+def build_request(item, variables):
+    """Turn an item into (method, url, headers, body bytes) for the current variables."""
+    request = item["request"]
+    url = substitute(request["url"]["raw"], variables)
+    headers = {h["key"]: substitute(h["value"], variables) for h in request.get("header", [])}
+    if item_requires_auth(item) and variables.get("token"):
+        headers["Authorization"] = "Bearer " + variables["token"]
+    body = request.get("body")
+    data = None
+    if body and body.get("mode") == "raw":
+        data = substitute(body["raw"], variables).encode("utf-8")
+    return item_method(item), url, headers, data
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Write-contention and deadlock probe for the contract-version child tables
+
+The Contract Version - OpCos / Distributors / Manufacturers / Industries /
+Products modules and Contract Prices all write rows that hang off one
+contract version. This probe runs their write items (assign -> update ->
+remove, derived like perf.scenarios chains) from many workers in two phases:
+
+    hot       every worker writes to the same contract version
+    disjoint  each worker writes to a contract version of its own
+
+and compares the two. When the hot phase has much lower throughput or more
+409/500 responses than the disjoint phase, concurrent editing of one
+contract serialises on hot rows. Failed writes (409, 500, 503, connection
+errors) are retried with backoff up to --retries times, and the retries are
+counted. With --api-log, the API log entries written during each phase are
+scanned for MySQL deadlocks (1213), lock wait timeouts (1205), EF
+concurrency exceptions and duplicate keys.
+
+Target versions come from --targets (contractId or contractId:version) or from
+perf.seed output (--seed-ids, version 1 of the generated contracts); the first
+target is the hot one. Other ids in the bodies (opCoId, productId, ...) are
+drawn from seeded rows when --seed-ids is given.
+
+Usage:
+    python -m perf.contention --base-url http://localhost:5143/api --seed-ids seed-data/seed_ids.json \
+        --concurrency 32 --duration 30 --api-log NPPContractManagement.API/logs/npp-20260220.log
+    python -m perf.contention --targets 101 102:2 103 104 --phases hot
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, load_collection
+from perf.runner import Recorder, add_common_arguments, login, open_session
+from perf.scenarios import derive_chains, extract_id
+from perf.seed import SeededIds
+from perf.serilog import LogTail, db_command
+from perf.stats import LATENCY_COLUMNS, format_table, percentile
+
+CHILD_RESOURCES = ("contract-version/", "contract-prices")
+RETRY_STATUSES = {0, 409, 500, 503}
+LOCK_EVENTS = {
+    # Bare numbers only next to an error marker: a parameter or literal '1213' is not a deadlock
+    "deadlock": re.compile(r"Deadlock found when trying to get lock|ER_LOCK_DEADLOCK"
+                           r"|\b(?:error|errno|error code)\s*:?\s*\(?1213\b", re.I),
+    "lock wait timeout": re.compile(r"Lock wait timeout exceeded|ER_LOCK_WAIT_TIMEOUT"
+                                    r"|\b(?:error|errno|error code)\s*:?\s*\(?1205\b", re.I),
+    "concurrency conflict": re.compile(r"DbUpdateConcurrencyException|optimistic concurrency", re.I),
+    "duplicate key": re.compile(r"Duplicate entry .* for key", re.I),
+}
+
+
+def write_sequences(collection):
+    """{resource: [write Step]} for the contract-version child resources and contract prices."""
+    sequences = {}
+    for chain in derive_chains(collection):
+        if not chain.name.startswith(CHILD_RESOURCES):
+            continue
+        steps = [s for s in chain.steps if s.is_write and s.path.startswith("/" + chain.name)]
+        if steps and steps[0].role == "create":
+            sequences[chain.name] = steps
+    return sequences
+
+
+def parse_targets(values):
+    targets = []
+    for value in values:
+        contract, _, version = str(value).partition(":")
+        targets.append((int(contract), int(version or 1)))
+    return targets
+
+
+def lock_events(entries):
+    """{kind: count} of lock/deadlock entries, plus failed DbCommands and a sample line per kind."""
+    counts, samples = {}, {}
+    for entry in entries:
+        command = db_command(entry)
+        # Successful commands are skipped: their SQL and parameters can contain anything
+        if command is not None and not command[1]:
+            continue
+        if command is None and entry.level not in ("ERR", "WRN", "FTL"):
+            continue
+        text = entry.message + "\n" + entry.text
+        if command:
+            counts["failed DbCommand"] = counts.get("failed DbCommand", 0) + 1
+        for kind, pattern in LOCK_EVENTS.items():
+            match = pattern.search(text)
+            if match:
+                counts[kind] = counts.get(kind, 0) + 1
+                line_start = text.rfind("\n", 0, match.start()) + 1
+                samples.setdefault(kind, text[line_start:].split("\n", 1)[0][:160])
+    return counts, samples
+
+
+class PhaseStats:
+    def __init__(self, name):
+        self.name = name
+        self.recorder = Recorder()
+        self.sequences = 0
+        self.failed_sequences = 0
+        self.retries = 0
+        self.final_statuses = {}
+        self.locks = {}
+        self.samples = {}
+
+    def row(self):
+        recorder = self.recorder
+        requests = sum(len(v) for v in recorder.latencies.values())
+        statuses = {}
+        for counts in recorder.statuses.values():
+            for status, n in counts.items():
+                statuses[status] = statuses.get(status, 0) + n
+        latencies = sorted(v for values in recorder.latencies.values() for v in values)
+        return {
+            "name": self.name,
+            "sequences": self.sequences,
+            "sequences_per_s": (self.sequences - self.failed_sequences) / recorder.elapsed,
+            "failed_sequences": self.failed_sequences,
+            "requests": requests,
+            "rate_409": statuses.get(409, 0) / requests if requests else 0.0,
+            "rate_5xx": sum(n for s, n in statuses.items() if s >= 500) / requests if requests else 0.0,
+            "retries": self.retries,
+            "p95_ms": percentile(latencies, 95) * 1000.0 if latencies else None,
+            "deadlocks": self.locks.get("deadlock", 0),
+            "lock_waits": self.locks.get("lock wait timeout", 0),
+            "conflicts": self.locks.get("concurrency conflict", 0),
+        }
+
+
+async def _send(session, step, variables, path, body, stats, retries, rng):
+    method, _, headers, _ = build_request(step.item, variables)
+    data = json.dumps(body, separators=(",", ":")).encode("utf-8") if body is not None else None
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        payload, location = None, None
+        try:
+            async with session.request(method, variables["baseUrl"] + path, headers=headers,
+                                       data=data) as response:
+                status = response.status
+                raw = await response.read()
+                if step.role == "create" and status < 300:
+                    location = response.headers.get("Location")
+                    payload = json.loads(raw) if raw else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            status = 0
+        stats.recorder.record(step.module, step.name, time.perf_counter() - start, status)
+        if status not in RETRY_STATUSES or attempt == retries:
+            break
+        stats.retries += 1
+        await asyncio.sleep(0.01 * 2 ** attempt * (1 + rng.random()))
+    stats.final_statuses[status] = stats.final_statuses.get(status, 0) + 1
+    return status, payload, location
+
+
+async def run_sequence(session, key, steps, target, variables, stats, retries, tag, ids, rng):
+    """assign -> update -> remove one child row of `target` (contractId, version)."""
+    contract, version = target
+    captured = {"contracts": contract}
+    ok = True
+    for step in steps:
+        path = step.resolve_path(captured)
+        if path is None:
+            continue  # the create failed, nothing to update or remove
+        body = step.resolve_body(captured, tag, ids, rng)
+        if isinstance(body, dict) and "versionNumber" in body:
+            body["versionNumber"] = version
+        status, payload, location = await _send(session, step, variables, path, body, stats, retries, rng)
+        if status >= 300 or status == 0:
+            ok = False
+        elif step.role == "create":
+            new_id = extract_id(payload, key, location)
+            if new_id is not None:
+                captured[key] = new_id
+    stats.sequences += 1
+    stats.failed_sequences += not ok
+
+
+async def run_phase(session, name, sequences, targets, variables, concurrency, duration, retries,
+                    ids=None, tail=None, seed=0):
+    """Every worker runs the sequences round-robin against targets[worker % len(targets)]."""
+    stats = PhaseStats(name)
+    if tail:
+        tail.read()
+    keys = list(sequences)
+    deadline = time.perf_counter() + duration
+
+    async def worker(number):
+        rng = random.Random(f"{seed}:{name}:{number}")
+        target = targets[number % len(targets)]
+        run = 0
+        while time.perf_counter() < deadline:
+            key = keys[(number + run) % len(keys)]
+            await run_sequence(session, key, sequences[key], target, variables, stats, retries,
+                               f"{name[0]}{number}r{run}", ids, rng)
+            run += 1
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    stats.recorder.stop()
+    if tail:
+        await asyncio.sleep(1.0)  # let Serilog flush the phase's last entries
+        stats.locks, stats.samples = lock_events(tail.read())
+    return stats
+
+
+PHASE_COLUMNS = [
+    ("name", "Phase"),
+    ("sequences", "Sequences"),
+    ("sequences_per_s", "OK seq/s", ".1f"),
+    ("failed_sequences", "Failed"),
+    ("requests", "Requests"),
+    ("rate_409", "409 rate", ".2%"),
+    ("rate_5xx", "5xx rate", ".2%"),
+    ("retries", "Retries"),
+    ("p95_ms", "p95 ms", ".1f"),
+    ("deadlocks", "Deadlocks"),
+    ("lock_waits", "Lock waits"),
+    ("conflicts", "EF conflicts"),
+]
+
+
+def compare(phases):
+    """Hot/disjoint throughput ratio, or None unless both phases ran."""
+    rows = {p.name: p.row() for p in phases}
+    if "hot" in rows and "disjoint" in rows and rows["disjoint"]["sequences_per_s"]:
+        return rows["hot"]["sequences_per_s"] / rows["disjoint"]["sequences_per_s"]
+    return None
+
+
+def print_report(phases, collapse_ratio):
+    for phase in phases:
+        print(f"\n{phase.name} phase, per item")
+        print(format_table(phase.recorder.by_endpoint(), LATENCY_COLUMNS))
+    print("\nPhases")
+    print(format_table([p.row() for p in phases], PHASE_COLUMNS))
+    for phase in phases:
+        for kind, sample in phase.samples.items():
+            print(f"  {phase.name}: {phase.locks[kind]} x {kind}: {sample}")
+    ratio = compare(phases)
+    if ratio is not None:
+        verdict = ("writes to one contract version serialise on hot rows" if ratio < collapse_ratio
+                   else "no significant collapse on a shared contract version")
+        print(f"\nHot / disjoint throughput: {ratio:.2f} -> {verdict}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--targets", nargs="*", help="contractId[:version] targets; the first is the hot one")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: targets and body ids")
+    parser.add_argument("--resources", nargs="*", help="Only these child resources (substring match)")
+    parser.add_argument("--phases", nargs="*", choices=("hot", "disjoint"), default=["hot", "disjoint"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per phase")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--api-log", help="API Serilog file to scan for lock and deadlock entries")
+    parser.add_argument("--collapse-ratio", type=float, default=0.5,
+                        help="Hot/disjoint throughput below this is reported as serialisation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write phase summaries to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+    sequences = write_sequences(collection)
+    if args.resources:
+        sequences = {k: v for k, v in sequences.items() if any(r.lower() in k for r in args.resources)}
+    if not sequences:
+        print("No contract-version child resources with a create item found", file=sys.stderr)
+        return 2
+    if args.targets:
+        targets = parse_targets(args.targets)
+    elif ids is not None and ids.tables.get("contracts", (None, None))[1]:
+        first, last = ids.tables["contracts"][1]
+        targets = [(i, 1) for i in range(first, min(last, first + args.concurrency - 1) + 1)]
+    else:
+        parser.error("Pass --targets or --seed-ids with generated contracts")
+    if "disjoint" in args.phases and len(targets) < args.concurrency:
+        print(f"Only {len(targets)} targets for {args.concurrency} workers; disjoint workers will share some",
+              file=sys.stderr)
+    tail = LogTail(args.api_log) if args.api_log else None
+    print(f"Probing {', '.join(sequences)} with {args.concurrency} workers, hot target "
+          f"contract {targets[0][0]} v{targets[0][1]}")
+
+    async def run():
+        async with open_session(args.concurrency, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            phases = []
+            for name in args.phases:
+                phase_targets = targets[:1] if name == "hot" else targets
+                print(f"{name} phase: {args.duration:g}s", file=sys.stderr)
+                phases.append(await run_phase(session, name, sequences, phase_targets, variables,
+                                              args.concurrency, args.duration, args.retries, ids, tail,
+                                              args.seed))
+            return phases
+
+    phases = asyncio.run(run())
+    print_report(phases, args.collapse_ratio)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"phases": [dict(p.row(), lock_events=p.locks, samples=p.samples) for p in phases],
+                       "hot_disjoint_ratio": compare(phases)}, f, indent=2)
+    ratio = compare(phases)
+    return 1 if ratio is not None and ratio < args.collapse_ratio else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
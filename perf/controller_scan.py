@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Endpoint registry generated from NPPContractManagement.API/Controllers/*.cs
+
+Extracts route templates, HTTP verbs, [Authorize]/[AllowAnonymous] and the
+[FromBody] parameter type of every controller action, then merges them with
+the hand-written items (names and sample bodies) from
+generate_postman_collection.py. Parse results are cached per file, keyed by
+content hash, so a regeneration after a one-controller change only re-parses
+that file.
+
+Usage:
+    python -m perf.controller_scan --report
+    python -m perf.controller_scan --output NPP_Contract_Management_API.postman_collection.json
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+from perf.collection import (
+    REPO_ROOT, item_method, item_path, load_collection, module_short_name,
+)
+
+API_DIR = os.path.join(REPO_ROOT, "NPPContractManagement.API")
+CONTROLLERS_DIR = os.path.join(API_DIR, "Controllers")
+# Where [FromBody] types are declared: DTO classes, entities, and request records nested in controllers
+TYPE_DIRS = [os.path.join(API_DIR, name) for name in ("DTOs", "Models", "Controllers")]
+CACHE_FILE = os.path.join(REPO_ROOT, "perf", ".controller_scan_cache.json")
+# Bump when the parse output format changes so stale cache entries are dropped
+CACHE_VERSION = 1
+
+_ATTRIBUTE = re.compile(r"^\s*\[(.*)\]\s*(//.*)?$")
+_HTTP = re.compile(r"\bHttp(Get|Post|Put|Delete|Patch)\b\s*(?:\(\s*(?:template\s*:\s*)?\"([^\"]*)\")?")
+_ROUTE = re.compile(r"\bRoute\s*\(\s*\"([^\"]*)\"")
+_AUTHORIZE = re.compile(r"\bAuthorize\b(?:\s*\(\s*Roles\s*=\s*\"([^\"]*)\")?")
+_ALLOW_ANONYMOUS = re.compile(r"\bAllowAnonymous\b")
+_CLASS = re.compile(r"\bclass\s+(\w+?)Controller\b")
+_METHOD = re.compile(r"\bpublic\b[^=;]*?\b(\w+)\s*\(")
+_FROM_BODY = re.compile(r"\[FromBody\]\s*([\w\.]+(?:<[^>]*>)?(?:\[\])?\??)\s+\w+")
+_TEMPLATE_PARAM = re.compile(r"\{\*?(\w+)(?::[^}]*)?(\?)?\}")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_TYPE = re.compile(r"\b(class|record|enum)\s+(\w+)(?:<[^>]*>)?\s*(?:\(([^)]*)\))?\s*(?::\s*([\w\.]+))?")
+_PROPERTY = re.compile(r"\bpublic\s+(?:(?:virtual|required|new)\s+)*([\w\.]+(?:<[^{};=()]*>)?(?:\[\])?\??)"
+                       r"\s+(\w+)\s*\{\s*(?:get|init)\b")
+_BRACE = re.compile(r"[{}]")
+_GENERIC = re.compile(r"^(?:[\w\.]+\.)?(\w+)<(.*)>$")
+_COLLECTIONS = {"List", "IList", "IEnumerable", "ICollection", "IReadOnlyList", "IReadOnlyCollection",
+                "HashSet", "ISet", "Collection"}
+_SAMPLES = {
+    "int": 1, "long": 1, "short": 1, "byte": 1, "uint": 1, "ulong": 1, "decimal": 1.0, "double": 1.0,
+    "float": 1.0, "bool": True, "string": "string", "char": "a", "object": {},
+    "DateTime": "2025-01-01T00:00:00", "DateTimeOffset": "2025-01-01T00:00:00+00:00", "DateOnly": "2025-01-01",
+    "TimeSpan": "00:00:00", "TimeOnly": "00:00:00", "Guid": "00000000-0000-0000-0000-000000000000",
+}
+
+
+def _attributes(line):
+    match = _ATTRIBUTE.match(line)
+    return match.group(1) if match else None
+
+
+def parse_controller(text):
+    """Parse one controller source file into a dict of class info and endpoints."""
+    controller = None
+    class_attrs = {"route": "", "authorize": False, "roles": [], "anonymous": False}
+    pending = []
+    endpoints = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        attrs = _attributes(line)
+        if attrs is not None:
+            pending.append(attrs)
+            i += 1
+            continue
+        class_match = _CLASS.search(line)
+        if class_match and controller is None:
+            controller = class_match.group(1)
+            joined = " ".join(pending)
+            route = _ROUTE.search(joined)
+            authorize = _AUTHORIZE.search(joined)
+            class_attrs = {
+                "route": route.group(1) if route else "",
+                "authorize": bool(authorize),
+                "roles": _roles(authorize),
+                "anonymous": bool(_ALLOW_ANONYMOUS.search(joined)),
+            }
+            pending = []
+        elif pending and controller:
+            joined = " ".join(pending)
+            verbs = _HTTP.findall(joined)
+            method_match = _METHOD.search(line)
+            if verbs and method_match:
+                signature = line
+                j = i
+                while "{" not in signature and "=>" not in signature and j < i + 10 and j + 1 < len(lines):
+                    j += 1
+                    signature += " " + lines[j].strip()
+                body = _FROM_BODY.search(signature)
+                authorize = _AUTHORIZE.search(joined)
+                method_route = _ROUTE.search(joined)
+                for verb, template in verbs:
+                    endpoints.append({
+                        "action": method_match.group(1),
+                        "method": verb.upper(),
+                        "template": template if template or not method_route else method_route.group(1),
+                        "authorize": bool(authorize),
+                        "roles": _roles(authorize),
+                        "anonymous": bool(_ALLOW_ANONYMOUS.search(joined)),
+                        "body_type": body.group(1) if body else None,
+                        "line": i + 1,
+                    })
+            if line.strip() and not line.strip().startswith("//"):
+                pending = []
+        i += 1
+    if controller is None:
+        return None
+    return {"controller": controller, **class_attrs, "endpoints": endpoints}
+
+
+def _roles(authorize_match):
+    if not authorize_match or not authorize_match.group(1):
+        return []
+    return [r.strip() for r in authorize_match.group(1).split(",") if r.strip()]
+
+
+def route_path(parsed, endpoint):
+    """Full route template relative to {{baseUrl}} (which already ends in /api)."""
+    template = endpoint["template"]
+    if template.startswith("~/") or template.startswith("/"):
+        route = template.lstrip("~/")
+    else:
+        route = "/".join(p for p in (parsed["route"].strip("/"), template.strip("/")) if p)
+    # Routing is case-insensitive; use the collection's lower-case spelling for tokens
+    route = route.replace("[controller]", parsed["controller"].lower())
+    route = route.replace("[action]", endpoint["action"].lower())
+    if route.lower().startswith("api/"):
+        route = route[4:]
+    elif route.lower() == "api":
+        route = ""
+    return "/" + route
+
+
+def sample_path(template, value="1"):
+    """Fill route parameters with a sample value; optional parameters are dropped."""
+    segments = []
+    for segment in template.strip("/").split("/"):
+        if _TEMPLATE_PARAM.fullmatch(segment) and _TEMPLATE_PARAM.fullmatch(segment).group(2):
+            continue
+        segments.append(_TEMPLATE_PARAM.sub(value, segment))
+    return "/" + "/".join(segments)
+
+
+def template_regex(template):
+    parts = []
+    for segment in template.strip("/").split("/"):
+        pieces = _TEMPLATE_PARAM.split(segment)
+        # split() yields [literal, name, optional, literal, ...]
+        pattern = "".join(re.escape(p) if k % 3 == 0 else ("[^/]+" if k % 3 == 1 else "")
+                          for k, p in enumerate(pieces) if p is not None)
+        parts.append(pattern)
+    return re.compile("^/" + "/".join(parts) + "/?$", re.IGNORECASE)
+
+
+def literal_segments(template):
+    return sum(1 for s in template.strip("/").split("/") if s and not _TEMPLATE_PARAM.search(s))
+
+
+def _file_key(path):
+    return os.path.relpath(path, REPO_ROOT).replace(os.sep, "/")
+
+
+def _load_cache(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("files", {}) if cache.get("version") == CACHE_VERSION else {}
+
+
+def scan_controllers(directory=CONTROLLERS_DIR, cache_path=CACHE_FILE, stats=None):
+    """Parse every *Controller.cs under directory, reusing cached results.
+
+    A file is only read when its size/mtime changed, and only re-parsed when
+    its SHA-1 changed. Returns a list of parsed controllers sorted by file.
+    """
+    cache = _load_cache(cache_path) if cache_path else {}
+    fresh = {}
+    stats = stats if stats is not None else {}
+    stats.update(files=0, parsed=0, hashed=0)
+    results = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith("Controller.cs"):
+                continue
+            path = os.path.join(root, name)
+            key = _file_key(path)
+            st = os.stat(path)
+            entry = cache.get(key)
+            stats["files"] += 1
+            if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha1(data).hexdigest()
+                stats["hashed"] += 1
+                if not entry or entry["sha1"] != digest:
+                    stats["parsed"] += 1
+                    entry = {"sha1": digest, "parsed": parse_controller(data.decode("utf-8-sig"))}
+                entry = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            fresh[key] = entry
+            if entry["parsed"]:
+                results.append(dict(entry["parsed"], file=key))
+    if cache_path and fresh != cache:
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": fresh}, f)
+        os.replace(tmp, cache_path)
+    return sorted(results, key=lambda c: c["file"])
+
+
+def registry(controllers):
+    """Flatten parsed controllers into endpoint dicts with full path templates."""
+    endpoints = []
+    for parsed in controllers:
+        for endpoint in parsed["endpoints"]:
+            anonymous = endpoint["anonymous"] or parsed["anonymous"]
+            endpoints.append({
+                "controller": parsed["controller"],
+                "file": parsed["file"],
+                "action": endpoint["action"],
+                "method": endpoint["method"],
+                "path": route_path(parsed, endpoint),
+                "auth_required": (endpoint["authorize"] or parsed["authorize"]) and not anonymous,
+                "roles": endpoint["roles"] or parsed["roles"],
+                "body_type": endpoint["body_type"],
+            })
+    return endpoints
+
+
+def _split_arguments(text):
+    """Split on the commas of a parameter or type-argument list that are not inside <...>."""
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(text):
+        depth += (char == "<") - (char == ">")
+        if char == "," and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_types(text):
+    """{type name: {"kind", "base", "properties": [[type, name], ...]}} for one source file.
+
+    Properties are the public get/init ones declared directly in the class
+    body, plus the parameters of a positional record.
+    """
+    text = _COMMENT.sub("", text)
+    types = {}
+    for match in _TYPE.finditer(text):
+        kind, name, parameters, base = match.groups()
+        info = {"kind": "enum" if kind == "enum" else "class", "base": base, "properties": []}
+        types.setdefault(name, info)
+        if kind == "enum":
+            continue
+        for parameter in _split_arguments(parameters or ""):
+            words = parameter.split("=")[0].split()
+            if len(words) >= 2:
+                info["properties"].append([words[-2], words[-1]])
+        start = text.find("{", match.end())
+        if start < 0 or ";" in text[match.end():start]:
+            continue
+        depth, end = 0, len(text)
+        for brace in _BRACE.finditer(text, start):
+            depth += 1 if brace.group() == "{" else -1
+            if depth == 0:
+                end = brace.start()
+                break
+        body = text[start:end]
+        depth, position = 0, 0
+        for prop in _PROPERTY.finditer(body):
+            depth += body.count("{", position, prop.start()) - body.count("}", position, prop.start())
+            position = prop.start()
+            if depth == 1:
+                info["properties"].append([prop.group(1), prop.group(2)])
+    return types
+
+
+def scan_types(directories=None):
+    """{type name: [(file, type info)]} for every class, record and enum in the API sources."""
+    types = {}
+    for directory in directories or TYPE_DIRS:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.endswith(".cs"):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, encoding="utf-8-sig") as f:
+                    for type_name, info in parse_types(f.read()).items():
+                        types.setdefault(type_name, []).append((_file_key(path), info))
+    return types
+
+
+def _json_name(name):
+    """System.Text.Json's camelCase policy: leading capitals are lowered, up to the start of the next word."""
+    upper = len(name) - len(name.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    if upper <= 1 or upper == len(name):
+        return name[:upper].lower() + name[upper:]
+    return name[:upper - 1].lower() + name[upper - 1:]
+
+
+def sample_value(type_name, types, file=None, seen=()):
+    """Placeholder JSON value for a C# type; DTOs become objects with every property filled in.
+
+    A type declared in `file` (a request record nested in the controller)
+    wins over one with the same name elsewhere. Cycles and unknown types give None.
+    """
+    type_name = type_name.strip().rstrip("?")
+    if type_name.endswith("[]"):
+        return [sample_value(type_name[:-2], types, file, seen)]
+    generic = _GENERIC.match(type_name)
+    if generic:
+        outer, arguments = generic.group(1), _split_arguments(generic.group(2))
+        if outer in _COLLECTIONS:
+            return [sample_value(arguments[0], types, file, seen)]
+        if outer == "Nullable":
+            return sample_value(arguments[0], types, file, seen)
+        return {}
+    type_name = type_name.rsplit(".", 1)[-1]
+    if type_name in _SAMPLES:
+        return _SAMPLES[type_name]
+    candidates = types.get(type_name)
+    if not candidates or type_name in seen:
+        return None
+    info = next((i for f, i in candidates if f == file), candidates[0][1])
+    if info["kind"] == "enum":
+        return 0
+    seen = seen + (type_name,)
+    body = {}
+    chain = [info]
+    while chain[-1]["base"] and chain[-1]["base"] in types and len(chain) < 5:
+        chain.append(types[chain[-1]["base"]][0][1])
+    for level in reversed(chain):
+        for property_type, name in level["properties"]:
+            body[_json_name(name)] = sample_value(property_type, types, file, seen)
+    return body
+
+
+def _default_body(body_type, types=None, file=None):
+    if not body_type:
+        return None
+    body = sample_value(body_type, types or {}, file)
+    return {} if body is None else body
+
+
+def match_items(endpoints, collection):
+    """Assign each hand-written item to the most specific endpoint with the same verb.
+
+    Returns (matches, stale): matches maps endpoint index to [(module, item)],
+    stale lists the items that no controller route serves.
+    """
+    compiled = [(template_regex(e["path"]), literal_segments(e["path"])) for e in endpoints]
+    matches = {}
+    stale = []
+    for module in collection["item"]:
+        for item in module["item"]:
+            method = item_method(item)
+            path = item_path(item).split("?", 1)[0]
+            best = None
+            for index, endpoint in enumerate(endpoints):
+                if endpoint["method"] != method or not compiled[index][0].match(path):
+                    continue
+                if best is None or compiled[index][1] > compiled[best][1]:
+                    best = index
+            if best is None:
+                stale.append((module["name"], item))
+            else:
+                matches.setdefault(best, []).append((module["name"], item))
+    return matches, stale
+
+
+def endpoint_resolver(endpoints):
+    """Return resolve(method, path) -> the most specific endpoint serving it, or None.
+
+    `path` is relative to the API base, e.g. "/contracts/42" for /api/contracts/42.
+    """
+    by_method = {}
+    for endpoint in endpoints:
+        by_method.setdefault(endpoint["method"], []).append(
+            (literal_segments(endpoint["path"]), template_regex(endpoint["path"]), endpoint))
+    for candidates in by_method.values():
+        candidates.sort(key=lambda c: -c[0])
+    cache = {}
+
+    def resolve(method, path):
+        key = (method, path)
+        if key not in cache:
+            if len(cache) > 100000:  # distinct ids in the path; keep memory bounded
+                cache.clear()
+            cache[key] = next((e for _, regex, e in by_method.get(method, ()) if regex.match(path)), None)
+        return cache[key]
+
+    return resolve
+
+
+def _title(action):
+    return " ".join(_CAMEL.split(action))
+
+
+def _attach_body(item, body):
+    """Give an item a JSON body and Content-Type.
+
+    create_request drops an empty body, and [ApiController] answers a
+    [FromBody] action called without one with 415.
+    """
+    request = item["request"]
+    if not any(h.get("key", "").lower() == "content-type" for h in request.get("header", [])):
+        request["header"] = request.get("header", []) + [{"key": "Content-Type", "value": "application/json"}]
+    request["body"] = {"mode": "raw", "raw": json.dumps(body, indent=2)}
+    return item
+
+
+def build_collection(base, endpoints, create_request, types=None):
+    """Collection with one item per scanned endpoint, reusing hand-written items.
+
+    Endpoints nobody wrote an item for are added with generated names and
+    placeholder bodies built from their [FromBody] type (see scan_types), to
+    the module most of their controller's items live in.
+    """
+    matches, stale = match_items(endpoints, base)
+    modules = {m["name"]: [] for m in base["item"]}
+    home = {}
+    for index, found in matches.items():
+        controller = endpoints[index]["controller"]
+        for module_name, _ in found:
+            counts = home.setdefault(controller, {})
+            counts[module_name] = counts.get(module_name, 0) + 1
+    next_number = len(base["item"]) + 1
+    for index, endpoint in enumerate(endpoints):
+        if index in matches:
+            for module_name, item in matches[index]:
+                if endpoint["body_type"] and "body" not in item["request"]:
+                    item = _attach_body(copy.deepcopy(item), _default_body(endpoint["body_type"], types,
+                                                                           endpoint["file"]))
+                modules[module_name].append(item)
+            continue
+        counts = home.get(endpoint["controller"])
+        if counts:
+            module_name = max(counts, key=counts.get)
+        else:
+            module_name = f"{next_number:02d}. {_title(endpoint['controller'])}"
+            next_number += 1
+            home[endpoint["controller"]] = {module_name: 1}
+            modules[module_name] = []
+        body = _default_body(endpoint["body_type"], types, endpoint["file"])
+        item = create_request(_title(endpoint["action"]), endpoint["method"],
+                              sample_path(endpoint["path"]), body, endpoint["auth_required"],
+                              f"{endpoint['controller']}Controller.{endpoint['action']} (generated from {endpoint['file']})")
+        if body is not None and "body" not in item["request"]:
+            _attach_body(item, body)
+        modules[module_name].append(item)
+
+    collection = {k: copy.deepcopy(v) for k, v in base.items() if k != "item"}
+    collection["item"] = []
+    for name, items in modules.items():
+        if not items:
+            continue
+        label = re.sub(r"\s*\(\d+ endpoints\)\s*$", "", name)
+        collection["item"].append({"name": f"{label} ({len(items)} endpoints)", "item": items})
+    total = sum(len(m["item"]) for m in collection["item"])
+    info = collection.setdefault("info", {})
+    info["name"] = f"NPP Contract Management API - Generated from Controllers ({total} Endpoints)"
+    return collection, stale
+
+
+def scanned_collection(cache_path=CACHE_FILE, stats=None):
+    """Controller-derived collection merged with generate_postman_collection.py samples."""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import generate_postman_collection as generator
+
+    base = load_collection()
+    endpoints = registry(scan_controllers(cache_path=cache_path, stats=stats))
+    return build_collection(base, endpoints, generator.create_request, scan_types())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="Write the merged Postman collection to this file")
+    parser.add_argument("--report", action="store_true",
+                        help="List generated endpoints and hand-written items with no route")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every controller again")
+    args = parser.parse_args(argv)
+
+    stats = {}
+    start = time.perf_counter()
+    collection, stale = scanned_collection(None if args.no_cache else CACHE_FILE, stats)
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(m["item"]) for m in collection["item"])
+    generated = [(m["name"], i) for m in collection["item"] for i in m["item"]
+                 if "(generated from " in i["request"].get("description", "")]
+    print(f"Scanned {stats['files']} controllers ({stats['parsed']} parsed, "
+          f"{stats['files'] - stats['parsed']} from cache) in {elapsed * 1000:.0f}ms")
+    print(f"Endpoints: {total} ({total - len(generated)} with hand-written samples, "
+          f"{len(generated)} generated)")
+    print(f"Hand-written items with no matching route: {len(stale)}")
+    if args.report:
+        print("\nGenerated (no hand-written item):")
+        for module, item in generated:
+            print(f"  {item_method(item):6} {item_path(item):60} [{module_short_name(module)}]")
+        print("\nNo matching controller route:")
+        for module, item in stale:
+            print(f"  {item_method(item):6} {item_path(item):60} {item['name']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(collection, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Multi-process, multi-host load generation with merged histograms
+
+One asyncio loop saturates a core long before the API does. The coordinator
+runs the same load as perf.runner (closed loop over the selected items) or
+perf.workload (open-loop arrival schedule) in many worker processes, on this
+host and on any others that join it over TCP:
+
+    runner mode    the selected items are dealt round-robin into one shard
+                   per worker (every worker gets all items if there are
+                   fewer items than workers); --concurrency is the total
+    workload mode  every worker runs every stream at rate / workers;
+                   independent Poisson streams add up to the full rate, and
+                   constant streams are phase-shifted so they interleave
+
+Every --interval seconds each worker sends the histograms (perf.histogram)
+recorded since its last report, as zlib-compressed JSON with only the
+non-empty buckets. The coordinator prints a live per-module view from them.
+It merges them into one histogram per endpoint, which gives the same
+percentiles as a single process that saw every request. The final report
+and the result store use the merged histograms.
+
+Other hosts need the same checkout (the collection and --seed-ids paths are
+read by the workers) and run an agent that starts their worker processes:
+
+    python -m perf.distributed --connect coordinator-host:7700 --processes 8
+
+Usage:
+    python -m perf.distributed --processes 8 --modules lookup contracts --concurrency 512 --duration 60
+    python -m perf.distributed --processes 8 --workload perf/workloads/contract_api.json --scale 100
+    python -m perf.distributed --listen 0.0.0.0:7700 --processes 8 --remote-workers 24 \
+        --workload perf/workloads/contract_api.json --scale 500
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import zlib
+
+from perf.collection import collection_variables, load_collection
+from perf.histogram import Histogram
+from perf.results import add_store_arguments, save_from_args
+from perf.runner import add_common_arguments, login, open_session, run_load, select_items
+from perf.seed import SeededIds
+from perf.stats import format_table
+from perf.workload import WORKLOAD_COLUMNS, build_streams, run_workload
+
+DEFAULT_PORT = 7700
+CONNECT_TIMEOUT = 60.0
+# --listen hosts that bind every interface; local workers reach those over loopback
+WILDCARD_HOSTS = {"", "0.0.0.0", "::", "[::]"}
+
+
+async def send_message(writer, message):
+    """Length-prefixed zlib-compressed JSON frame."""
+    data = zlib.compress(json.dumps(message, separators=(",", ":")).encode("utf-8"), 1)
+    writer.write(len(data).to_bytes(4, "big") + data)
+    await writer.drain()
+
+
+async def read_message(reader):
+    """Next frame, or None when the peer has closed the connection."""
+    try:
+        size = int.from_bytes(await reader.readexactly(4), "big")
+        return json.loads(zlib.decompress(await reader.readexactly(size)))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+def split_total(total, shards, shard):
+    """This shard's part of an integer total; the parts add up to the total (at least 1 each)."""
+    return max(1, total // shards + (shard < total % shards))
+
+
+def parse_address(value, default_host="127.0.0.1"):
+    host, _, port = value.rpartition(":")
+    return host or default_host, int(port or DEFAULT_PORT)
+
+
+def local_address(host):
+    """Address local workers connect to for a coordinator listening on host."""
+    return "127.0.0.1" if host in WILDCARD_HOSTS else host
+
+
+class IntervalRecorder:
+    """Response-time histograms per (module, item), handed off at every report."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = {}
+
+    def add(self, module, name, seconds, status):
+        key = (module, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+            self.errors[key] = 0
+        histogram.record_seconds(seconds)
+        if status == 0 or status >= 400:
+            self.errors[key] += 1
+
+    def take(self):
+        """[[module, item, histogram dict, errors]] since the last call."""
+        histograms, errors = self.histograms, self.errors
+        self.histograms, self.errors = {}, {}
+        return [[module, name, histogram.to_dict(), errors[(module, name)]]
+                for (module, name), histogram in histograms.items()]
+
+    def stop(self):
+        pass
+
+
+class _LoadRecorder(IntervalRecorder):
+    """perf.runner's record() signature."""
+
+    def record(self, module, name, latency, status):
+        self.add(module, name, latency, status)
+
+
+class _WorkloadRecorder(IntervalRecorder):
+    """perf.workload's record() signature; latency is from the intended send."""
+
+    def record(self, stream, request, status, intended, sent, done):
+        self.add(request.module, request.name, done - intended, status)
+
+
+async def _report(writer, recorder, interval):
+    while True:
+        await asyncio.sleep(interval)
+        await send_message(writer, {"type": "report", "endpoints": recorder.take()})
+
+
+async def run_shard(job, writer):
+    """Run this worker's share of the load, reporting histograms every job["interval"] seconds."""
+    collection = load_collection(job["collection"], job["scan_controllers"])
+    variables = collection_variables(collection, job["base_url"])
+    ids = SeededIds.load(job["seed_ids"]) if job["seed_ids"] else None
+    shard, shards = job["shard"], job["shards"]
+    if job["workload"]:
+        streams = build_streams(job["workload"], collection, variables, job["scale"] / shards, ids)
+        for stream in streams:
+            if stream.arrival == "constant":
+                stream.phase = (shard + 1) / shards
+        recorder = _WorkloadRecorder()
+        pool_size = split_total(job["max_in_flight"], shards, shard)
+    else:
+        items = select_items(collection, job["modules"], job["methods"])
+        if len(items) >= shards:
+            items = items[shard::shards]
+        recorder = _LoadRecorder()
+        pool_size = split_total(job["concurrency"], shards, shard)
+    async with open_session(pool_size, job["timeout"]) as session:
+        await login(session, collection, variables, job["user"], job["password"])
+        await asyncio.sleep(max(0.0, job["start_at"] - time.time()))
+        reporter = asyncio.ensure_future(_report(writer, recorder, job["interval"]))
+        try:
+            if job["workload"]:
+                seed = None if job["seed"] is None else job["seed"] + shard
+                await run_workload(streams, variables, job["duration"], session, pool_size, seed,
+                                   recorder=recorder)
+            else:
+                requests = split_total(job["requests"], shards, shard) if job["requests"] else None
+                await run_load(items, variables, pool_size, job["duration"], requests,
+                               session=session, recorder=recorder)
+        finally:
+            reporter.cancel()
+    await send_message(writer, {"type": "done", "endpoints": recorder.take()})
+
+
+async def _work(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await send_message(writer, {"type": "hello", "host": socket.gethostname(), "pid": os.getpid()})
+        job = await read_message(reader)
+        if job is None:
+            return
+        try:
+            await run_shard(job, writer)
+        except Exception as e:
+            await send_message(writer, {"type": "error", "message": f"{type(e).__name__}: {e}"})
+    finally:
+        writer.close()
+
+
+def _worker_process(host, port):
+    asyncio.run(_work(host, port))
+
+
+def start_workers(count, host, port):
+    processes = [multiprocessing.Process(target=_worker_process, args=(host, port), daemon=True)
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+class Coordinator:
+    """Accepts workers, hands out shards and merges their reports."""
+
+    def __init__(self, job, expected, interval):
+        self.job = job
+        self.expected = expected
+        self.interval = interval
+        self.connections = []
+        self.all_connected = asyncio.Event()
+        self.totals = {}
+        self.window = {}
+        self.errors = []
+        self.finished = 0
+        self.started = None
+
+    async def accept(self, reader, writer):
+        hello = await read_message(reader)
+        if hello is None or len(self.connections) >= self.expected:
+            writer.close()
+            return
+        self.connections.append((reader, writer, hello))
+        print(f"  worker {len(self.connections)}/{self.expected}: {hello['host']} pid {hello['pid']}",
+              file=sys.stderr)
+        if len(self.connections) == self.expected:
+            self.all_connected.set()
+
+    def merge(self, endpoints):
+        for module, name, data, errors in endpoints:
+            histogram = Histogram.from_dict(data)
+            for store in (self.totals, self.window):
+                merged, count = store.get((module, name), (None, 0))
+                merged = merged or Histogram(histogram.significant_digits)
+                store[(module, name)] = (merged.merge(histogram), count + errors)
+
+    async def collect(self, reader, writer, hello):
+        while True:
+            message = await read_message(reader)
+            if message is None:
+                self.errors.append(f"{hello['host']} pid {hello['pid']}: disconnected")
+                break
+            if message["type"] == "error":
+                self.errors.append(f"{hello['host']} pid {hello['pid']}: {message['message']}")
+                break
+            self.merge(message["endpoints"])
+            if message["type"] == "done":
+                break
+        self.finished += 1
+        writer.close()
+
+    async def live_view(self):
+        # Workers report on the interval from the common start; sampling half an
+        # interval later puts one report per worker in each window
+        await asyncio.sleep(self.interval / 2)
+        while True:
+            await asyncio.sleep(self.interval)
+            window, self.window = self.window, {}
+            rows = module_rows(window, self.interval)
+            print(f"{time.perf_counter() - self.started:6.0f}s  {sum(row['rps'] for row in rows):,.0f} req/s",
+                  file=sys.stderr)
+            for row in rows:
+                print(f"        {row['name']:<40} {row['rps']:>9,.0f}/s  p50 {row['p50_ms']:7.1f}  "
+                      f"p99 {row['p99_ms']:7.1f} ms  {row['errors']} errors", file=sys.stderr)
+
+    async def run(self):
+        """Send every worker its shard and wait for all of them; returns the elapsed seconds."""
+        start_at = time.time() + 2.0  # every worker logs in before the common start
+        for shard, (_, writer, _) in enumerate(self.connections):
+            await send_message(writer, dict(self.job, shard=shard, shards=self.expected, start_at=start_at))
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        self.started = time.perf_counter()
+        view = asyncio.ensure_future(self.live_view())
+        try:
+            await asyncio.gather(*(self.collect(*connection) for connection in self.connections))
+        finally:
+            view.cancel()
+        return time.perf_counter() - self.started
+
+
+def module_rows(histograms, elapsed):
+    """Merged summaries per module from {(module, item): (Histogram, errors)}."""
+    merged = {}
+    for (module, _), (histogram, errors) in histograms.items():
+        total, count = merged.get(module, (Histogram(), 0))
+        merged[module] = (total.merge(histogram), count + errors)
+    rows = []
+    for module, (histogram, errors) in sorted(merged.items()):
+        row = histogram.summary(elapsed, errors)
+        row["name"] = module
+        rows.append(row)
+    return rows
+
+
+def endpoint_rows(histograms, elapsed):
+    rows = []
+    for (module, name), (histogram, errors) in sorted(histograms.items()):
+        row = histogram.summary(elapsed, errors)
+        row["name"] = f"{module} / {name}"
+        rows.append(row)
+    return rows
+
+
+def run_agent(args):
+    """--connect: start --processes workers that join a remote coordinator."""
+    host, port = parse_address(args.connect)
+    print(f"Starting {args.processes} workers for {host}:{port}", file=sys.stderr)
+    processes = start_workers(args.processes, host, port)
+    for process in processes:
+        process.join()
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="Worker processes on this host")
+    parser.add_argument("--remote-workers", type=int, default=0,
+                        help="Worker processes expected from other hosts (--connect agents)")
+    parser.add_argument("--listen", default=None,
+                        help=f"Coordinator address for remote agents (e.g. 0.0.0.0:{DEFAULT_PORT})")
+    parser.add_argument("--connect", help="Run as an agent for the coordinator at HOST:PORT")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between worker reports")
+    parser.add_argument("--workload", help="Workload JSON file (open loop); default: closed loop over items")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every workload stream's rate")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Workload mode: outstanding requests across all workers")
+    parser.add_argument("--seed", type=int, help="Seed for Poisson arrivals (offset per worker)")
+    parser.add_argument("--modules", nargs="*", help="Runner mode: module numbers or names")
+    parser.add_argument("--methods", nargs="*", default=["GET"], help="Runner mode: HTTP verbs")
+    parser.add_argument("--concurrency", type=int, default=64, help="Runner mode: connections across all workers")
+    parser.add_argument("--duration", type=float, help="Seconds to run (default: 30, or the workload's)")
+    parser.add_argument("--requests", type=int, help="Runner mode: stop after this many requests in total")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed (same path on every host)")
+    parser.add_argument("--json", help="Write the merged histograms to this file")
+    add_store_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.connect:
+        return run_agent(args)
+    if args.processes + args.remote_workers < 1:
+        parser.error("need at least one worker")
+
+    workload = None
+    if args.workload:
+        with open(args.workload) as f:
+            workload = json.load(f)
+    collection = load_collection(args.collection, args.scan_controllers)
+    base_url = collection_variables(collection, args.base_url)["baseUrl"]
+    duration = args.duration or (workload or {}).get("duration", 30.0)
+    job = {
+        "type": "job", "base_url": args.base_url, "collection": args.collection,
+        "scan_controllers": args.scan_controllers, "user": args.user, "password": args.password,
+        "timeout": args.timeout, "seed_ids": os.path.abspath(args.seed_ids) if args.seed_ids else None,
+        "interval": args.interval, "duration": duration, "workload": workload, "scale": args.scale,
+        "max_in_flight": args.max_in_flight, "seed": args.seed, "modules": args.modules,
+        "methods": args.methods, "concurrency": args.concurrency, "requests": args.requests,
+    }
+    expected = args.processes + args.remote_workers
+
+    async def run():
+        coordinator = Coordinator(job, expected, args.interval)
+        host, port = parse_address(args.listen) if args.listen else ("127.0.0.1", 0)
+        server = await asyncio.start_server(coordinator.accept, host, port)
+        port = server.sockets[0].getsockname()[1]
+        print(f"Coordinator on {host}:{port}, waiting for {expected} workers", file=sys.stderr)
+        processes = start_workers(args.processes, local_address(host), port)
+        try:
+            await asyncio.wait_for(coordinator.all_connected.wait(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Only {len(coordinator.connections)} of {expected} workers connected",
+                  file=sys.stderr)
+            return None, None, processes
+        server.close()
+        mode = f"workload {args.workload} x{args.scale:g}" if workload else f"{args.concurrency} connections"
+        print(f"Running {mode} on {expected} workers for {duration:g}s against {base_url}", file=sys.stderr)
+        elapsed = await coordinator.run()
+        return coordinator, elapsed, processes
+
+    coordinator, elapsed, processes = asyncio.run(run())
+    for process in processes:
+        process.join(timeout=5)
+    if coordinator is None:
+        return 1
+    for error in coordinator.errors:
+        print(f"  worker failed: {error}", file=sys.stderr)
+    if not coordinator.totals:
+        return 1
+
+    print(f"\nDuration: {elapsed:.1f}s, {expected} workers\n")
+    print("Per module")
+    print(format_table(module_rows(coordinator.totals, elapsed), WORKLOAD_COLUMNS))
+    print("\nPer endpoint")
+    print(format_table(endpoint_rows(coordinator.totals, elapsed), WORKLOAD_COLUMNS))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"duration_s": elapsed, "workers": expected,
+                       "endpoints": [{"module": module, "name": name, "errors": errors,
+                                      "response": histogram.to_dict()}
+                                     for (module, name), (histogram, errors) in sorted(coordinator.totals.items())]},
+                      f, indent=2)
+    histograms = {f"{module} / {name}": value for (module, name), value in coordinator.totals.items()}
+    save_from_args(args, "distributed", histograms, elapsed, base_url)
+    return 1 if coordinator.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Streaming download benchmark for the Excel export endpoints
+
+Downloads every export item (Export Products, Export Products to Excel for a
+proposal, Export Usage Report, ...; with --scan-controllers also the API's
+POST /reports/*/excel routes) one at a time. Bodies are read in chunks and
+discarded. For each download it records:
+
+    time to headers, time to first body byte (TTFB), total time, bytes,
+    throughput, and the client's peak Python heap during the download
+
+A server that builds the whole workbook in memory before sending
+(File(byte[]) with EPPlus GetAsByteArray) answers with a Content-Length.
+Its TTFB is most of the total time, and TTFB grows with the data. A
+streaming server answers chunked, and its first bytes arrive early.
+
+Run it against datasets of increasing size to see where exports start to
+time out. --scales runs --reseed (a shell command with {scale}, e.g.
+perf.seed plus a mysql load) before each size. --label tags a single run
+against whatever is loaded. Use --buffered to read whole bodies instead and
+compare the client memory.
+
+Usage:
+    python -m perf.exports --base-url http://localhost:5143/api --samples 3
+    python -m perf.exports --scales 0.01 0.1 1 --timeout 600 --reseed \
+        "python -m perf.seed --scale {scale} --output /tmp/seed && mysql --local-infile=1 npp < /tmp/seed/load.sql"
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, item_path, iter_items, load_collection
+from perf.runner import add_common_arguments, login, open_session
+from perf.seed import SeededIds
+from perf.stats import format_table
+
+_EXPORT = re.compile(r"(?i)/(export|excel)(/|\?|$)")
+CHUNK_SIZE = 64 * 1024
+
+
+def export_targets(collection, names=None):
+    """[(module, item)] for every export/excel download item."""
+    targets = []
+    for module, item in iter_items(collection):
+        if names and item["name"] not in names:
+            continue
+        if item["request"]["method"].upper() in ("GET", "POST") and _EXPORT.search(item_path(item)):
+            targets.append((module, item))
+    return targets
+
+
+async def download(session, method, url, headers, data, buffered=False, chunk_size=CHUNK_SIZE):
+    """One download; timings in ms, client peak heap in KB (tracemalloc must be running)."""
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = {"status": 0, "headers_ms": None, "ttfb_ms": None, "total_ms": None, "bytes": 0,
+              "content_length": False, "chunked": False}
+    start = time.perf_counter()
+    try:
+        async with session.request(method, url, headers=headers, data=data) as response:
+            result["headers_ms"] = (time.perf_counter() - start) * 1000.0
+            result["status"] = response.status
+            result["content_length"] = "Content-Length" in response.headers
+            result["chunked"] = response.headers.get("Transfer-Encoding", "").lower() == "chunked"
+            if buffered:
+                body = await response.read()
+                result["ttfb_ms"] = result["headers_ms"]
+                result["bytes"] = len(body)
+                del body
+            else:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    if result["ttfb_ms"] is None:
+                        result["ttfb_ms"] = (time.perf_counter() - start) * 1000.0
+                    result["bytes"] += len(chunk)
+    except asyncio.TimeoutError:
+        result["status"] = "timeout"
+    except aiohttp.ClientError as e:
+        result["status"] = type(e).__name__
+    result["total_ms"] = (time.perf_counter() - start) * 1000.0
+    result["peak_kb"] = (tracemalloc.get_traced_memory()[1] - baseline) / 1024.0
+    return result
+
+
+def _median(runs, key):
+    values = [r[key] for r in runs if r[key] is not None]
+    return statistics.median(values) if values else None
+
+
+def summarize_runs(runs):
+    ok = [r for r in runs if r["status"] == 200]
+    statuses = ",".join(sorted({str(r["status"]) for r in runs}))
+    row = {"status": statuses, "ok": len(ok), "samples": len(runs)}
+    if not ok:
+        return row
+    row.update({key: _median(ok, key) for key in ("headers_ms", "ttfb_ms", "total_ms", "bytes", "peak_kb")})
+    row["mb_per_s"] = row["bytes"] / 1e6 / (row["total_ms"] / 1000.0) if row["total_ms"] else None
+    row["ttfb_share"] = row["ttfb_ms"] / row["total_ms"] if row["ttfb_ms"] and row["total_ms"] else None
+    # File(byte[]) sets Content-Length; a streamed response is chunked
+    buffered = all(r["content_length"] and not r["chunked"] for r in ok)
+    row["server"] = "buffered" if buffered else "streamed"
+    return row
+
+
+async def bench(session, targets, variables, samples, buffered, ids=None, seed=0):
+    """Download each target `samples` times; {export name: summary row}."""
+    rng = random.Random(seed)
+    results = {}
+    for module, item in targets:
+        method, url, headers, data = build_request(item, variables)
+        if ids is not None:
+            split = urlsplit(url)
+            url = split._replace(path=ids.rewrite_path(split.path, rng)).geturl()
+        runs = [await download(session, method, url, headers, data, buffered) for _ in range(samples)]
+        row = summarize_runs(runs)
+        row["name"] = f"{module} / {item['name']}"
+        results[row["name"]] = row
+        print(f"  {row['name']}: HTTP {row['status']}, {row.get('bytes') or 0:,.0f} B, "
+              f"TTFB {row.get('ttfb_ms') or 0:.0f} ms, total {row.get('total_ms') or 0:.0f} ms", file=sys.stderr)
+    return results
+
+
+EXPORT_COLUMNS = [
+    ("dataset", "Dataset"),
+    ("name", "Export"),
+    ("status", "HTTP"),
+    ("headers_ms", "Headers ms", ".0f"),
+    ("ttfb_ms", "TTFB ms", ".0f"),
+    ("total_ms", "Total ms", ".0f"),
+    ("ttfb_share", "TTFB share", ".0%"),
+    ("bytes", "Bytes", ",.0f"),
+    ("mb_per_s", "MB/s", ".2f"),
+    ("peak_kb", "Client peak KB", ",.0f"),
+    ("server", "Server"),
+]
+
+
+def breaking_points(datasets):
+    """{export: first dataset whose downloads did not all succeed}"""
+    broken = {}
+    for dataset, results in datasets.items():
+        for name, row in results.items():
+            if row["ok"] < row["samples"]:
+                broken.setdefault(name, dataset)
+    return broken
+
+
+def print_report(datasets):
+    rows = [dict(row, dataset=dataset) for dataset, results in datasets.items() for row in results.values()]
+    rows.sort(key=lambda r: (r["name"], list(datasets).index(r["dataset"])))
+    print()
+    print(format_table(rows, EXPORT_COLUMNS))
+    for name, dataset in breaking_points(datasets).items():
+        print(f"  {name}: fails from dataset {dataset}")
+    buffered = sorted({r["name"] for r in rows if r.get("server") == "buffered"})
+    if buffered:
+        print(f"  {len(buffered)} exports buffer the whole workbook before sending (Content-Length, no chunking)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.set_defaults(timeout=300.0)
+    parser.add_argument("--items", nargs="*", help="Item names (default: every export item)")
+    parser.add_argument("--samples", type=int, default=3, help="Downloads per export per dataset (median)")
+    parser.add_argument("--buffered", action="store_true", help="Read whole bodies instead of streaming")
+    parser.add_argument("--scales", nargs="*", help="Dataset sizes to run --reseed for, in order")
+    parser.add_argument("--reseed", help="Shell command run before each scale; {scale} is substituted")
+    parser.add_argument("--label", default="current", help="Dataset label when --scales is not used")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: ids for /proposals/{id}/... paths")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args(argv)
+    if args.scales and not args.reseed:
+        parser.error("--scales needs --reseed")
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    targets = export_targets(collection, args.items)
+    if not targets:
+        print("No export items found", file=sys.stderr)
+        return 2
+    datasets = {}
+    tracemalloc.start()
+    for scale in args.scales or [None]:
+        label = args.label if scale is None else f"scale {scale}"
+        if scale is not None:
+            print(f"Reseeding for scale {scale}", file=sys.stderr)
+            completed = subprocess.run(args.reseed.format(scale=scale), shell=True)
+            if completed.returncode:
+                print(f"Reseed failed with exit code {completed.returncode}", file=sys.stderr)
+                return 1
+        ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+
+        async def run():
+            async with open_session(1, args.timeout) as session:
+                await login(session, collection, variables, args.user, args.password)
+                return await bench(session, targets, variables, args.samples, args.buffered, ids)
+
+        print(f"{label}: {len(targets)} exports", file=sys.stderr)
+        datasets[label] = asyncio.run(run())
+    tracemalloc.stop()
+    print_report(datasets)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(datasets, f, indent=2)
+    return 1 if breaking_points(datasets) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
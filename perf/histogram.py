@@ -0,0 +1,113 @@
+"""
+Mergeable HDR-style latency histograms
+
+Values are recorded in integer microseconds into log-linear buckets: every
+power-of-two range is split into the same number of linear sub-buckets, so
+the relative error is bounded (0.1% at the default 3 significant digits) from
+1µs up to hours with a few thousand counters. Histograms with the same
+precision merge by adding counts, which makes them safe to combine across
+endpoints, runs, processes and hosts without losing percentile accuracy.
+"""
+
+import math
+
+
+class Histogram:
+    """Log-linear histogram of microsecond values."""
+
+    def __init__(self, significant_digits=3):
+        self.significant_digits = significant_digits
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.half_count = 1 << (self.sub_bucket_bits - 1)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        bucket = max(0, value.bit_length() - self.sub_bucket_bits)
+        return bucket * self.half_count + (value >> bucket)
+
+    def _highest_equivalent(self, index):
+        bucket = max(0, (index - self.half_count) // self.half_count)
+        sub = index - bucket * self.half_count
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, value_us, count=1):
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def record_seconds(self, seconds):
+        self.record(seconds * 1e6)
+
+    def merge(self, other):
+        """Add another histogram's counts into this one; returns self."""
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def value_at(self, q):
+        """Value (µs) at quantile q (0-100), reported as the bucket's highest value."""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def buckets(self):
+        """[(highest value µs, count)] for each non-empty bucket, in value order."""
+        return [(min(self._highest_equivalent(index), self.max), count)
+                for index, count in sorted(self.counts.items())]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, elapsed, errors=0):
+        """Same keys as perf.stats.summarize(), plus p99.9."""
+        ms = 1000.0
+        return {
+            "count": self.count,
+            "errors": errors,
+            "rps": self.count / elapsed if elapsed > 0 else 0.0,
+            "mean_ms": self.mean / ms,
+            "p50_ms": self.value_at(50) / ms,
+            "p95_ms": self.value_at(95) / ms,
+            "p99_ms": self.value_at(99) / ms,
+            "p999_ms": self.value_at(99.9) / ms,
+            "max_ms": (self.max or 0) / ms,
+        }
+
+    def to_dict(self):
+        return {
+            "significant_digits": self.significant_digits,
+            "count": self.count, "total": self.total, "min": self.min, "max": self.max,
+            "counts": sorted(self.counts.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["significant_digits"])
+        histogram.counts = {int(index): count for index, count in data["counts"]}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
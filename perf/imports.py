@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Excel import throughput harness with generated workbooks
+
+The import items (Import Products from Excel, Import Customers/Members from
+Excel, a proposal's product import; with --scan-controllers the API's
+POST /v1/proposals/products/excel-import/{manufacturerId}) have no file
+attached in the collection. This tool writes a valid workbook for each one,
+using openpyxl's write-only mode, at growing row counts (--min-rows,
+doubling up to --max-rows). Each workbook is uploaded as multipart/form-data
+in the `file` field, one request at a time.
+
+Workbook layouts:
+  proposal products  the 15 columns of ProposalProductExcelService's template.
+                     SKUs are taken from the Download Products Template item
+                     for --manufacturer-id when the collection has one, so
+                     rows are valid. Otherwise from --skus, or made up
+                     (rows then fail validation but still get parsed).
+  other imports      one column per field of the module's create body
+                     (Create Product, Create Customer, Create Member).
+                     Text values get the row number appended to stay unique.
+
+For each size it records the file size, upload-to-response time, rows/s and
+the valid/invalid counts from the response. Server memory is not exposed
+over HTTP. When the API runs on this machine, --api-pid samples the
+process's resident set (VmRSS) during each upload and records the peak
+growth. An endpoint stops escalating at its first failure: non-2xx (the
+proposal import rejects files over 10 MB), timeout, success=false, or longer
+than --max-seconds. The largest size before that is reported as the maximum
+safe batch.
+
+Usage:
+    python -m perf.imports --base-url http://localhost:5143/api --max-rows 200000 --samples 2
+    python -m perf.imports --scan-controllers --manufacturer-id 1000001 --api-pid $(pgrep -f NPPContractManagement.API)
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, item_body, item_path, iter_items, load_collection
+from perf.runner import add_common_arguments, login, open_session
+from perf.stats import format_table, geometric_sizes
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# ProposalProductExcelService.GenerateTemplateAsync / ImportFromExcelAsync column order
+PROPOSAL_PRODUCT_HEADERS = [
+    "SKU", "Product Name", "UOM", "Billbacks Allowed",
+    "Allowance", "Commercial Del Price", "Commercial FOB Price",
+    "Commodity Del Price", "Commodity FOB Price", "PUA",
+    "FFS Price", "NOI Price", "PTV",
+    "Internal Notes", "Manufacturer Notes",
+]
+_IMPORT = re.compile(r"(?i)/(import|excel-import)(/\d+)?/?$")
+_PROPOSAL_PRODUCTS = re.compile(r"(?i)/proposals/(\d+/)?products/")
+_TEMPLATE = re.compile(r"(?i)/proposals/products/excel-template/\d+$")
+
+
+def import_targets(collection, names=None):
+    """[(module, item, layout)]; layout is "proposal" or the create body's field names."""
+    items = list(iter_items(collection))
+    targets = []
+    for module, item in items:
+        if names and item["name"] not in names:
+            continue
+        path = item_path(item).split("?")[0]
+        if item["request"]["method"].upper() != "POST" or not _IMPORT.search(path):
+            continue
+        if _PROPOSAL_PRODUCTS.search(path):
+            targets.append((module, item, "proposal"))
+            continue
+        resource = _IMPORT.sub("", path)
+        create = next((i for m, i in items if m == module and i["request"]["method"].upper() == "POST"
+                       and item_path(i).split("?")[0] == resource and isinstance(item_body(i), dict)), None)
+        if create:
+            targets.append((module, item, list(item_body(create).items())))
+        else:
+            print(f"  {module} / {item['name']}: no create body to derive columns from, skipped",
+                  file=sys.stderr)
+    return targets
+
+
+def _proposal_rows(rows, skus):
+    for n in range(rows):
+        sku = skus[n % len(skus)] if skus else f"SKU-{n + 1}"
+        price = round(5 + (n % 400) * 1.25, 2)
+        yield [sku, f"Product {n + 1}", "CS", "Yes" if n % 2 else "No", round(price * 0.05, 2),
+               price, price - 1, price + 2, price + 1, 0.5, price * 0.9, price * 0.95, 1.0,
+               f"internal {n + 1}", f"manufacturer {n + 1}"]
+
+
+def _body_rows(rows, fields):
+    for n in range(rows):
+        yield [f"{value}-{n + 1}" if isinstance(value, str) else value for _, value in fields]
+
+
+def write_workbook(path, layout, rows, skus=None):
+    """Stream a workbook with openpyxl's write-only mode; returns its size in bytes."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Import")
+    if layout == "proposal":
+        sheet.append(PROPOSAL_PRODUCT_HEADERS)
+        generated = _proposal_rows(rows, skus)
+    else:
+        sheet.append([name[0].upper() + name[1:] for name, _ in layout])
+        generated = _body_rows(rows, layout)
+    for row in generated:
+        sheet.append(row)
+    workbook.save(path)
+    return os.path.getsize(path)
+
+
+def for_manufacturer(url, manufacturer_id):
+    """Point a template or proposal-products import URL (manufacturer id last) at another manufacturer."""
+    return re.sub(r"/\d+(\?|$)", f"/{manufacturer_id}\\1", url, count=1)
+
+
+async def template_skus(session, collection, variables, manufacturer_id):
+    """SKUs from the Download Products Template item, or None when there is none."""
+    item = next((i for _, i in iter_items(collection) if _TEMPLATE.search(item_path(i).split("?")[0])), None)
+    if item is None:
+        return None
+    from openpyxl import load_workbook
+
+    method, url, headers, _ = build_request(item, variables)
+    url = for_manufacturer(url, manufacturer_id)
+    async with session.request(method, url, headers=headers) as response:
+        if response.status != 200:
+            print(f"Template download failed with HTTP {response.status}", file=sys.stderr)
+            return None
+        content = await response.read()
+    sheet = load_workbook(io.BytesIO(content), read_only=True).active
+    return [str(row[0]).strip() for row in sheet.iter_rows(min_row=2, values_only=True) if row and row[0]]
+
+
+class RssSampler:
+    """Peak VmRSS growth of a local process while active (Linux /proc)."""
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.baseline = self.peak = None
+        self._task = None
+
+    def rss_kb(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+        return None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, self.rss_kb())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.baseline = self.peak = self.rss_kb()
+        self._task = asyncio.ensure_future(self._sample())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.peak = max(self.peak, self.rss_kb())
+        return {"rss_before_mb": self.baseline / 1024.0, "rss_growth_mb": (self.peak - self.baseline) / 1024.0}
+
+
+def _count(data, *names):
+    """First present count field of the import response (camelCase or PascalCase)."""
+    for name in names:
+        for key in (name, name[0].upper() + name[1:]):
+            if isinstance(data, dict) and isinstance(data.get(key), int):
+                return data[key]
+    return None
+
+
+async def upload(session, item, variables, path, api_pid=None, manufacturer_id=None):
+    method, url, headers, _ = build_request(item, variables)
+    if manufacturer_id is not None:
+        # Rows are validated against the manufacturer in the URL, which must own the template SKUs
+        url = for_manufacturer(url, manufacturer_id)
+    headers = {k: v for k, v in headers.items() if k.lower() != "content-type"}
+    sampler = RssSampler(api_pid) if api_pid else None
+    result = {"status": 0, "message": None}
+    with open(path, "rb") as f:
+        form = aiohttp.FormData()
+        form.add_field("file", f, filename=os.path.basename(path), content_type=XLSX_TYPE)
+        if sampler:
+            sampler.start()
+        start = time.perf_counter()
+        try:
+            async with session.request(method, url, headers=headers, data=form) as response:
+                text = await response.text()
+                result["status"] = response.status
+        except asyncio.TimeoutError:
+            result["status"], text = "timeout", ""
+        except aiohttp.ClientError as e:
+            result["status"], text = type(e).__name__, ""
+        result["seconds"] = time.perf_counter() - start
+    if sampler:
+        result.update(await sampler.stop())
+    try:
+        data = json.loads(text) if text else None
+    except ValueError:
+        data = {"message": text[:200]}
+    result["success"] = data.get("success", data.get("Success")) if isinstance(data, dict) else None
+    result["message"] = (data.get("message") or data.get("Message")) if isinstance(data, dict) else None
+    result["valid"] = _count(data, "validRows", "importedCount", "imported", "successCount")
+    result["invalid"] = _count(data, "invalidRows", "failedCount", "errorCount")
+    return result
+
+
+def _failed(result, max_seconds):
+    if not isinstance(result["status"], int) or not 200 <= result["status"] < 300:
+        return True
+    return result["success"] is False or result["seconds"] > max_seconds
+
+
+async def run_target(session, target, variables, sizes, directory, samples, max_seconds, skus, api_pid,
+                     manufacturer_id=None):
+    """Escalate row counts for one import until it fails; returns a row per size."""
+    module, item, layout = target
+    rows_out = []
+    for rows in sizes:
+        path = os.path.join(directory, f"import_{len(rows_out)}_{rows}.xlsx")
+        size = write_workbook(path, layout, rows, skus)
+        runs = [await upload(session, item, variables, path, api_pid,
+                             manufacturer_id if layout == "proposal" else None) for _ in range(samples)]
+        os.remove(path)
+        seconds = statistics.median(r["seconds"] for r in runs)
+        failed = [r for r in runs if _failed(r, max_seconds)]
+        last = runs[-1]
+        row = {
+            "rows": rows,
+            "mb": size / 1048576,
+            "status": ",".join(sorted({str(r["status"]) for r in runs})),
+            "seconds": seconds,
+            "rows_per_s": rows / seconds if seconds else None,
+            "valid": last["valid"],
+            "invalid": last["invalid"],
+            "rss_growth_mb": max((r.get("rss_growth_mb") for r in runs), default=None),
+            "failed": len(failed),
+            "message": (failed[-1]["message"] if failed else None),
+        }
+        rows_out.append(row)
+        print(f"  {rows:>8,} rows  {row['mb']:7.2f} MB  {seconds:8.2f} s  HTTP {row['status']}", file=sys.stderr)
+        if failed:
+            break
+    return rows_out
+
+
+def max_safe_batch(rows):
+    passed = [r["rows"] for r in rows if not r["failed"]]
+    return max(passed) if passed else None
+
+
+IMPORT_COLUMNS = [
+    ("rows", "Rows", ","),
+    ("mb", "MB", ".2f"),
+    ("status", "HTTP"),
+    ("seconds", "Seconds", ".2f"),
+    ("rows_per_s", "Rows/s", ",.0f"),
+    ("valid", "Valid"),
+    ("invalid", "Invalid"),
+    ("rss_growth_mb", "Server RSS +MB", ".1f"),
+    ("message", "Failure"),
+]
+
+
+def print_report(results):
+    for label, rows in results.items():
+        print(f"\n{label}")
+        print(format_table(rows, IMPORT_COLUMNS))
+        safe = max_safe_batch(rows)
+        ceiling = next((r["rows"] for r in rows if r["failed"]), None)
+        print(f"  max safe batch: {safe:,} rows" if safe else "  no size succeeded",
+              f"(fails at {ceiling:,})" if ceiling else "(no failure up to the largest size)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.set_defaults(timeout=600.0)
+    parser.add_argument("--items", nargs="*", help="Item names (default: every import item)")
+    parser.add_argument("--min-rows", type=int, default=100)
+    parser.add_argument("--max-rows", type=int, default=100000)
+    parser.add_argument("--factor", type=float, default=2.0, help="Growth factor between sizes")
+    parser.add_argument("--samples", type=int, default=1, help="Uploads per size (median)")
+    parser.add_argument("--max-seconds", type=float, default=120.0,
+                        help="An upload slower than this counts as a failure")
+    parser.add_argument("--manufacturer-id", type=int, default=1,
+                        help="Manufacturer whose template SKUs fill proposal product workbooks and "
+                             "whose import URL they are uploaded to")
+    parser.add_argument("--skus", help="File with one SKU per line for proposal product workbooks")
+    parser.add_argument("--api-pid", type=int, help="Local API process id to sample VmRSS from")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    targets = import_targets(collection, args.items)
+    if not targets:
+        print("No import items found", file=sys.stderr)
+        return 2
+    sizes = geometric_sizes(args.min_rows, args.max_rows, args.factor)
+    skus = None
+    if args.skus:
+        with open(args.skus) as f:
+            skus = [line.strip() for line in f if line.strip()]
+
+    async def run():
+        nonlocal skus
+        results = {}
+        async with open_session(1, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            if skus is None and any(layout == "proposal" for _, _, layout in targets):
+                skus = await template_skus(session, collection, variables, args.manufacturer_id)
+                print(f"{len(skus) if skus else 'No'} template SKUs for manufacturer {args.manufacturer_id}",
+                      file=sys.stderr)
+            with tempfile.TemporaryDirectory(prefix="imports-") as directory:
+                for target in targets:
+                    label = f"{target[0]} / {target[1]['name']}"
+                    print(f"{label}: {sizes[0]:,} to {sizes[-1]:,} rows", file=sys.stderr)
+                    results[label] = await run_target(session, target, variables, sizes, directory,
+                                                      args.samples, args.max_seconds, skus, args.api_pid,
+                                                      args.manufacturer_id)
+        return results
+
+    results = asyncio.run(run())
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({label: {"sizes": rows, "max_safe_batch": max_safe_batch(rows)}
+                       for label, rows in results.items()}, f, indent=2)
+    return 1 if any(max_safe_batch(rows) is None for rows in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
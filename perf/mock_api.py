@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+High-throughput local mock of the API, generated from the collection
+
+Serves every path/verb in the collection (or, with --scan-controllers, every
+controller route) with canned JSON shaped like the items' sample bodies, so
+the load tools can be exercised and benchmarked without MySQL or a deployed
+API. Responses are rendered to bytes once at startup and the HTTP/1.1 server
+is a bare asyncio Protocol with keep-alive and pipelining, which serves well
+over 10k requests per CPU-second; latency and errors are only added where a
+config file asks for them.
+
+Config (JSON, optional):
+    {
+      "default": {"latency": {"dist": "lognormal", "median_ms": 2, "p99_ms": 20}},
+      "routes": [
+        {"match": "GET /reports/*", "latency": {"dist": "uniform", "min_ms": 50, "max_ms": 400}},
+        {"match": "POST /bulk-renewal/*", "latency": {"dist": "exponential", "mean_ms": 800},
+         "error_rate": 0.02, "error_status": 503}
+      ]
+    }
+"match" is an fnmatch pattern against "METHOD /path/template"; later routes
+win. Latency distributions: fixed (ms), uniform (min_ms, max_ms), exponential
+(mean_ms), lognormal (median_ms, p99_ms).
+
+Usage:
+    python -m perf.mock_api --port 5143
+    python -m perf.mock_api --port 5143 --config latency.json --workers 4
+    python -m perf.runner --base-url http://127.0.0.1:5143/api --concurrency 64
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import signal
+import socket
+import sys
+import time
+from collections import deque
+
+from perf.collection import (
+    item_body, item_is_upload, item_method, item_path, item_requires_auth, iter_items,
+    load_collection,
+)
+from perf.stats import format_table
+
+SAMPLE_PAGE_ROWS = 10
+SAMPLE_TOTAL = 1000
+_PLACEHOLDER = re.compile(r"^(\d+|\{\{\w+\}\}|\{\w+[^}]*\})$")
+_REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized",
+            404: "Not Found", 411: "Length Required", 429: "Too Many Requests",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def render(status, payload=None):
+    """Complete HTTP/1.1 response bytes for a status and a JSON-serializable payload."""
+    body = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}", "Server: perf-mock"]
+    if payload is not None:
+        head.append("Content-Type: application/json; charset=utf-8")
+    head.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def path_template(path):
+    """Collection sample path -> template: numeric and {{var}} segments become {id}."""
+    return "/" + "/".join("{id}" if _PLACEHOLDER.match(s) else s for s in path.strip("/").split("/"))
+
+
+def _template_regex(template):
+    parts = ["[^/]+" if s.startswith("{") else re.escape(s) for s in template.strip("/").split("/")]
+    return re.compile("^/" + "/".join(parts) + "/?$", re.IGNORECASE)
+
+
+def _with_id(shape, index=1):
+    record = {"id": index}
+    if isinstance(shape, dict):
+        record.update(shape)
+    return record
+
+
+def canned_payload(method, path, item, shapes, module):
+    """Response payload for one route, built from the module's sample bodies."""
+    if item["name"] == "Login" or path.endswith("/auth/login") or path.endswith("/auth/refresh-token"):
+        return 200, {"token": "mock-token", "refreshToken": "mock-refresh-token", "expiresIn": 3600,
+                     "user": {"id": 1, "userId": "admin", "roles": ["System Administrator"]}}
+    if method == "DELETE":
+        return 204, None
+    body = item_body(item)
+    shape = body if isinstance(body, dict) else shapes.get(module, {})
+    if method == "POST":
+        return 201, _with_id(shape)
+    if method in ("PUT", "PATCH"):
+        return 200, _with_id(shape)
+    query = item_path(item).partition("?")[2]
+    if "page" in query.lower() or not path.rstrip("/").split("/")[-1].startswith("{"):
+        rows = [_with_id(shape, i + 1) for i in range(SAMPLE_PAGE_ROWS)]
+        return 200, {"items": rows, "totalCount": SAMPLE_TOTAL, "page": 1,
+                     "pageSize": SAMPLE_PAGE_ROWS}
+    return 200, _with_id(shape)
+
+
+class Route:
+    __slots__ = ("method", "template", "auth", "response", "latency", "error_rate", "error",
+                 "count")
+
+    def __init__(self, method, template, auth, response):
+        self.method = method
+        self.template = template
+        self.auth = auth
+        self.response = response
+        self.latency = None
+        self.error_rate = 0.0
+        self.error = None
+        self.count = 0
+
+
+def latency_sampler(spec):
+    """Callable returning a delay in seconds for a latency spec, or None for no delay."""
+    if not spec:
+        return None
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        delay = spec.get("ms", 0) / 1000.0
+        return (lambda: delay) if delay > 0 else None
+    if dist == "uniform":
+        low, high = spec["min_ms"] / 1000.0, spec["max_ms"] / 1000.0
+        return lambda: random.uniform(low, high)
+    if dist == "exponential":
+        rate = 1000.0 / spec["mean_ms"]
+        return lambda: random.expovariate(rate)
+    if dist == "lognormal":
+        mu = math.log(spec["median_ms"] / 1000.0)
+        # p99 of a lognormal is exp(mu + 2.326 sigma)
+        sigma = max(0.0, (math.log(spec["p99_ms"] / 1000.0) - mu) / 2.326)
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution {dist!r}")
+
+
+def build_routes(collection, config=None):
+    """(exact route dict, per-method regex fallbacks) for every item in the collection."""
+    shapes = {}
+    for module, item in iter_items(collection):
+        body = item_body(item) if not item_is_upload(item) else None
+        if item_method(item) == "POST" and isinstance(body, dict) and module not in shapes:
+            shapes[module] = body
+    routes = {}
+    for module, item in iter_items(collection):
+        method = item_method(item)
+        template = path_template(item_path(item).split("?", 1)[0])
+        if (method, template) in routes:
+            continue
+        status, payload = canned_payload(method, template, item, shapes, module)
+        routes[(method, template)] = Route(method, template, item_requires_auth(item),
+                                           render(status, payload))
+    apply_config(routes.values(), config or {})
+    patterns = {}
+    for route in routes.values():
+        literals = sum(1 for s in route.template.split("/") if s and not s.startswith("{"))
+        patterns.setdefault(route.method, []).append((literals, _template_regex(route.template), route))
+    for candidates in patterns.values():
+        candidates.sort(key=lambda c: -c[0])
+    return routes, patterns
+
+
+def apply_config(routes, config):
+    rules = [config.get("default", {})] + [dict(r, match=r["match"]) for r in config.get("routes", [])]
+    for route in routes:
+        key = f"{route.method} {route.template}"
+        for rule in rules:
+            if "match" in rule and not fnmatch.fnmatch(key, rule["match"]):
+                continue
+            if "latency" in rule:
+                route.latency = latency_sampler(rule["latency"])
+            if "error_rate" in rule:
+                route.error_rate = float(rule["error_rate"])
+                route.error = render(rule.get("error_status", 500),
+                                     {"message": "Injected error from perf.mock_api"})
+
+
+class MockProtocol(asyncio.Protocol):
+    """Minimal HTTP/1.1 server: keep-alive, pipelining, Content-Length and chunked bodies."""
+
+    NOT_FOUND = render(404, {"message": "No such route in the collection"})
+    UNAUTHORIZED = render(401, {"message": "Missing bearer token"})
+
+    def __init__(self, server):
+        self.server = server
+        self.buffer = b""
+        self.transport = None
+        self.pending = deque()
+        self.ready_at = 0.0
+        self.close_after = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+    def data_received(self, data):
+        buffer = self.buffer + data if self.buffer else data
+        out = []
+        while True:
+            end = buffer.find(b"\r\n\r\n")
+            if end < 0:
+                break
+            head = buffer[:end]
+            lowered = head.lower()
+            start = end + 4
+            length = lowered.find(b"\r\ncontent-length:")
+            if length >= 0:
+                stop = lowered.find(b"\r\n", length + 2)
+                size = int(head[length + 17:stop if stop > 0 else None])
+                if len(buffer) < start + size:
+                    break
+                rest = buffer[start + size:]
+            elif b"\r\ntransfer-encoding: chunked" in lowered:
+                terminator = buffer.find(b"\r\n0\r\n\r\n", start - 2)
+                if terminator < 0:
+                    break
+                rest = buffer[terminator + 7:]
+            else:
+                rest = buffer[start:]
+            if b"\r\nconnection: close" in lowered:
+                self.close_after = True
+            response, delay = self.server.respond(head, lowered)
+            if delay or self.pending:
+                self._defer(response, delay)
+            else:
+                out.append(response)
+            buffer = rest
+        self.buffer = buffer
+        if out:
+            self.transport.write(b"".join(out) if len(out) > 1 else out[0])
+        if self.close_after and not self.pending and self.transport:
+            self.transport.close()
+
+    def _defer(self, response, delay):
+        # Keep responses in request order on a pipelined connection
+        loop = asyncio.get_running_loop()
+        self.ready_at = max(loop.time() + (delay or 0.0), self.ready_at)
+        self.pending.append(response)
+        loop.call_at(self.ready_at, self._flush_one)
+
+    def _flush_one(self):
+        response = self.pending.popleft()
+        if self.transport is not None:
+            self.transport.write(response)
+            if self.close_after and not self.pending:
+                self.transport.close()
+
+
+class MockServer:
+    """Route table and counters shared by all connections of one process."""
+
+    def __init__(self, routes, patterns):
+        self.routes = routes
+        self.patterns = patterns
+        self.resolved = {}
+        self.requests = 0
+        self.not_found = 0
+
+    def resolve(self, method, path):
+        key = (method, path)
+        route = self.resolved.get(key)
+        if route is None and key not in self.resolved:
+            route = next((r for _, regex, r in self.patterns.get(method, ()) if regex.match(path)), None)
+            if len(self.resolved) > 100000:
+                self.resolved.clear()
+            self.resolved[key] = route
+        return route
+
+    def respond(self, head, lowered):
+        self.requests += 1
+        line_end = head.find(b"\r\n")
+        method, _, target = head[:line_end].partition(b" ")
+        target = target.rpartition(b" ")[0].split(b"?", 1)[0].decode("latin-1")
+        if target.lower().startswith("/api/"):
+            target = target[4:]
+        route = self.resolve(method.decode("latin-1"), target)
+        if route is None:
+            self.not_found += 1
+            return MockProtocol.NOT_FOUND, None
+        route.count += 1
+        if route.auth and b"\r\nauthorization: bearer " not in lowered:
+            return MockProtocol.UNAUTHORIZED, None
+        delay = route.latency() if route.latency else None
+        if route.error_rate and random.random() < route.error_rate:
+            return route.error, delay
+        return route.response, delay
+
+    def summary(self):
+        return sorted(({"route": f"{r.method} {r.template}", "count": r.count}
+                       for r in self.routes.values() if r.count), key=lambda r: -r["count"])
+
+
+async def serve(server, sock):
+    loop = asyncio.get_running_loop()
+    listener = await loop.create_server(lambda: MockProtocol(server), sock=sock, backlog=1024)
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows: Ctrl+C arrives as KeyboardInterrupt
+            pass
+    async with listener:
+        await stop.wait()
+
+
+def _run_worker(collection_path, scanned, config, sock, results):
+    # Routes hold latency closures, so each worker builds its own instead of unpickling them
+    server = MockServer(*build_routes(load_collection(collection_path, scanned), config))
+    started = time.process_time()
+    try:
+        asyncio.run(serve(server, sock))
+    except KeyboardInterrupt:
+        pass
+    results.put((os.getpid(), server.requests, server.not_found, time.process_time() - started,
+                 server.summary()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5143)
+    parser.add_argument("--collection", help="Read a collection JSON export instead of the generator")
+    parser.add_argument("--scan-controllers", action="store_true",
+                        help="Serve the endpoint registry generated from the API controllers")
+    parser.add_argument("--config", help="Latency/error config JSON")
+    parser.add_argument("--workers", type=int, default=1, help="Processes sharing the listening socket")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    # Validate the config and report the route count before forking
+    routes, _ = build_routes(load_collection(args.collection, args.scan_controllers), config)
+    print(f"Serving {len(routes)} routes on http://{args.host}:{args.port}/api "
+          f"with {args.workers} worker(s); Ctrl+C to stop", file=sys.stderr)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    results = multiprocessing.Queue()
+    if args.workers == 1:
+        _run_worker(args.collection, args.scan_controllers, config, sock, results)
+    else:
+        processes = [multiprocessing.Process(target=_run_worker,
+                                             args=(args.collection, args.scan_controllers, config, sock,
+                                                   results))
+                     for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # A terminal Ctrl+C reaches the workers too; a plain kill only reaches us
+            for process in processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGINT)
+
+    totals = {}
+    served = cpu = missing = 0
+    for _ in range(args.workers):
+        _, requests, not_found, seconds, summary = results.get()
+        served += requests
+        missing += not_found
+        cpu += seconds
+        for row in summary:
+            totals[row["route"]] = totals.get(row["route"], 0) + row["count"]
+    print(f"\nServed {served:,} requests ({missing:,} unmatched) in {cpu:.1f} CPU s: "
+          f"{served / cpu if cpu else 0:,.0f} requests per CPU-second")
+    rows = sorted(({"route": k, "count": v} for k, v in totals.items()), key=lambda r: -r["count"])
+    if rows:
+        print(format_table(rows[:20], [("route", "Route"), ("count", "Requests", ",")]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Deep-pagination crawler for the collection's list endpoints
+
+Finds every GET item with a page/pageNumber + pageSize query (Get All
+Contracts, Products, Velocity Shipments, Velocity Jobs, Users, ...) and walks
+it across page depths and page sizes, concurrently but rate-limited. Reports
+latency-vs-page-depth and latency-vs-pageSize curves per endpoint and flags
+offset-pagination cliffs: pages that get slower the deeper they are, which
+keyset pagination would keep flat.
+
+Usage:
+    python -m perf.pagination --base-url http://localhost:5143/api \
+        --max-page 5000 --page-sizes 10 50 100 500 --rate 20 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, iter_items, item_method, item_path, load_collection
+from perf.runner import RateLimiter, add_common_arguments, login, open_session
+from perf.stats import fit_power_law, format_table, geometric_sizes
+
+PAGE_PARAMS = ("page", "pageNumber", "pageIndex")
+SIZE_PARAMS = ("pageSize", "size", "limit")
+
+
+def paging_params(item):
+    """(page param, size param) if the item's query is paginated, else None."""
+    query = dict(parse_qsl(urlsplit(item_path(item)).query))
+    page = next((p for p in PAGE_PARAMS if p in query), None)
+    size = next((p for p in SIZE_PARAMS if p in query), None)
+    return (page, size) if page and size else None
+
+
+def list_endpoints(collection, modules=None):
+    return [(module, item, paging_params(item)) for module, item in iter_items(collection, modules)
+            if item_method(item) == "GET" and paging_params(item)]
+
+
+def with_query(url, **params):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({k: str(v) for k, v in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def count_rows(payload):
+    """Rows in a list response: a bare array or the first list-valued field."""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        for key in ("items", "data", "results", "records", "contracts", "products", "shipments", "jobs"):
+            for candidate in (key, key.capitalize()):
+                if isinstance(data.get(candidate), list):
+                    return len(data[candidate])
+        lists = [v for v in data.values() if isinstance(v, list)]
+        if lists:
+            return len(lists[0])
+    return None
+
+
+def plan_probes(endpoints, pages, page_sizes, depth_page_size, samples, seed):
+    """Depth curve at depth_page_size plus a pageSize curve at page 1, shuffled."""
+    probes = set()
+    for index in range(len(endpoints)):
+        for page in pages:
+            probes.add((index, page, depth_page_size))
+        for size in page_sizes:
+            probes.add((index, 1, size))
+    probes = [p + (s,) for p in sorted(probes) for s in range(samples)]
+    # Random order so neither the DB buffer pool nor the API warm up along one curve
+    random.Random(seed).shuffle(probes)
+    return probes
+
+
+async def crawl(session, endpoints, variables, probes, concurrency, limiter):
+    results = {}
+    queue = iter(probes)
+
+    async def worker():
+        for index, page, size, _ in queue:
+            module, item, (page_param, size_param) = endpoints[index]
+            method, url, headers, data = build_request(item, variables)
+            url = with_query(url, **{page_param: page, size_param: size})
+            await limiter.acquire()
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url, headers=headers, data=data) as response:
+                    payload = await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                payload, status = b"", 0
+            elapsed = time.perf_counter() - start
+            results.setdefault((index, page, size), []).append(
+                (elapsed, status, len(payload), count_rows(payload) if status == 200 else None))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def _point(samples, page, size):
+    latencies = [s[0] for s in samples]
+    rows = [s[3] for s in samples if s[3] is not None]
+    return {
+        "page": page, "page_size": size, "offset": (page - 1) * size,
+        "latency_ms": statistics.median(latencies) * 1000.0,
+        "bytes": int(statistics.median(s[2] for s in samples)),
+        "rows": rows[0] if rows else None,
+        "status": ",".join(sorted({str(s[1]) for s in samples})),
+    }
+
+
+def curves(endpoints, results, pages, page_sizes, depth_page_size, cliff_ratio):
+    report = []
+    for index, (module, item, _) in enumerate(endpoints):
+        depth = [_point(results[(index, p, depth_page_size)], p, depth_page_size) for p in pages]
+        sizes = [_point(results[(index, 1, s)], 1, s) for s in page_sizes]
+        # Past the last page the API returns nothing, which is cheap and hides the cliff
+        populated = [d for d in depth if d["rows"] != 0 and d["status"] == "200"]
+        fit = fit_power_law([d["offset"] + 1 for d in populated], [d["latency_ms"] for d in populated])
+        first, last = (populated[0], populated[-1]) if populated else (depth[0], depth[-1])
+        ratio = last["latency_ms"] / first["latency_ms"] if first["latency_ms"] else 0.0
+        report.append({
+            "name": f"{module} / {item['name']}",
+            "path": item_path(item).split("?", 1)[0],
+            "depth": depth,
+            "page_size": sizes,
+            "deepest_populated_page": last["page"],
+            "depth_ratio": ratio,
+            "offset_exponent": fit["b"] if fit else None,
+            "ms_per_row": _per_row(sizes),
+            "cliff": ratio >= cliff_ratio,
+        })
+    return report
+
+
+def _per_row(sizes):
+    """Marginal ms per extra row from the pageSize curve (least-squares slope)."""
+    ok = [s for s in sizes if s["status"] == "200"]
+    if len(ok) < 2:
+        return None
+    xs = [s["page_size"] for s in ok]
+    ys = [s["latency_ms"] for s in ok]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx if sxx else None
+
+
+def print_report(report, depth_page_size):
+    for endpoint in report:
+        print(f"\n{endpoint['name']}  ({endpoint['path']})")
+        print(f"Latency vs page depth (pageSize={depth_page_size})")
+        print(format_table(endpoint["depth"], [
+            ("page", "Page"), ("offset", "Offset", ","), ("latency_ms", "Median ms", ".1f"),
+            ("rows", "Rows"), ("bytes", "Bytes", ","), ("status", "HTTP")]))
+        print("Latency vs pageSize (page=1)")
+        print(format_table(endpoint["page_size"], [
+            ("page_size", "pageSize"), ("latency_ms", "Median ms", ".1f"), ("rows", "Rows"),
+            ("bytes", "Bytes", ","), ("status", "HTTP")]))
+    print("\nSummary")
+    print(format_table(report, [
+        ("name", "Endpoint"), ("deepest_populated_page", "Deepest page with rows"),
+        ("depth_ratio", "Deep/first latency", ".2f"), ("offset_exponent", "Offset exponent"),
+        ("ms_per_row", "ms per row", ".3f"), ("cliff", "Offset cliff")]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--modules", nargs="*", help="Limit to these modules")
+    parser.add_argument("--max-page", type=int, default=5000)
+    parser.add_argument("--page-factor", type=float, default=4.0, help="Growth factor between page depths")
+    parser.add_argument("--page-sizes", nargs="+", type=int, default=[10, 25, 50, 100, 250, 500])
+    parser.add_argument("--depth-page-size", type=int, help="pageSize for the depth curve (default: first)")
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=20.0, help="Max requests/sec across all workers")
+    parser.add_argument("--cliff-ratio", type=float, default=3.0,
+                        help="Flag endpoints whose deepest populated page is this many times slower")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write both curves for every endpoint to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    endpoints = list_endpoints(collection, args.modules)
+    if not endpoints:
+        parser.error("No paginated GET items in the selected modules")
+    pages = geometric_sizes(1, args.max_page, args.page_factor)
+    if pages[-1] != args.max_page:
+        pages.append(args.max_page)
+    depth_size = args.depth_page_size or args.page_sizes[0]
+    probes = plan_probes(endpoints, pages, args.page_sizes, depth_size, args.samples, args.seed)
+    print(f"Crawling {len(endpoints)} list endpoints: {len(probes)} requests at <= {args.rate:g}/s",
+          file=sys.stderr)
+
+    async def run():
+        async with open_session(args.concurrency, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            return await crawl(session, endpoints, variables, probes, args.concurrency,
+                               RateLimiter(args.rate, args.concurrency))
+
+    results = asyncio.run(run())
+    report = curves(endpoints, results, pages, args.page_sizes, depth_size, args.cliff_ratio)
+    print_report(report, depth_size)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
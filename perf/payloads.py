@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Payload size, over-fetch and compression audit
+
+Calls every selected item once (GETs by default; other verbs are opt-in as
+in perf.runner) and records for each response:
+
+    bytes as decoded and as served (Content-Encoding), gzip and brotli sizes
+    at the levels ASP.NET Core's response compression uses, JSON depth, field
+    count, null fields and the share of the payload spent on property names
+
+Paginated GETs (page + pageSize query, as perf.pagination finds them) are
+also requested at each --page-sizes value. The least-squares slope of bytes
+against rows is the cost of one more row, a measure of DTO width that the
+page size does not hide.
+
+Two rankings come out:
+
+    compression  bytes per request that gzip/brotli would remove, and the
+                 transfer time that saves on a --bandwidth Mbit/s link
+    DTO size     bytes per row, fields per row and null share for the list
+                 endpoints; wide rows full of nulls are over-fetching
+
+Only 2xx responses are ranked and totalled; the rest are listed as failed.
+Brotli sizes need the brotli package; without it that column is empty.
+
+Usage:
+    python -m perf.payloads --base-url http://localhost:5143/api --scan-controllers --json payloads.json
+    python -m perf.payloads --modules contracts products --page-sizes 10 100 500 --bandwidth 5
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import sys
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, item_path, load_collection
+from perf.pagination import count_rows, paging_params, with_query
+from perf.runner import add_common_arguments, login, open_session, select_items
+from perf.seed import SeededIds
+from perf.stats import format_table
+
+# CompressionLevel.Fastest (the providers' default) and Optimal, as zlib level / brotli quality
+LEVELS = {"fastest": (1, 1), "optimal": (6, 4)}
+
+
+def compressed_sizes(body, level="fastest"):
+    """(gzip bytes, brotli bytes or None) for a response body."""
+    gzip_level, brotli_quality = LEVELS[level]
+    gzipped = len(gzip.compress(body, gzip_level))
+    try:
+        import brotli
+    except ImportError:
+        return gzipped, None
+    return gzipped, len(brotli.compress(body, quality=brotli_quality))
+
+
+def json_shape(value):
+    """{"depth", "fields", "nulls", "key_bytes", "keys"} for a parsed JSON document."""
+    shape = {"depth": 0, "fields": 0, "nulls": 0, "key_bytes": 0, "keys": set()}
+    stack = [(value, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, dict):
+            shape["depth"] = max(shape["depth"], depth)
+            for key, child in node.items():
+                shape["fields"] += 1
+                shape["nulls"] += child is None
+                shape["key_bytes"] += len(key.encode("utf-8")) + 3  # "key":
+                shape["keys"].add(key)
+                stack.append((child, depth + 1))
+        elif isinstance(node, list):
+            shape["depth"] = max(shape["depth"], depth)
+            stack.extend((child, depth + 1) for child in node)
+    return shape
+
+
+async def fetch(session, method, url, headers, data):
+    """(status, decoded body, bytes as served, Content-Encoding)."""
+    async with session.request(method, url, headers=headers, data=data) as response:
+        body = await response.read()
+        encoding = response.headers.get("Content-Encoding", "")
+        served = int(response.headers["Content-Length"]) if encoding and "Content-Length" in response.headers \
+            else len(body)
+        return response.status, body, served, encoding
+
+
+def measure(status, body, served, encoding, level):
+    """Size and shape row for one response."""
+    row = {"status": status, "bytes": len(body), "served_bytes": served, "encoding": encoding or "-"}
+    row["gzip_bytes"], row["br_bytes"] = compressed_sizes(body, level) if body else (0, None)
+    best = min(size for size in (row["gzip_bytes"], row["br_bytes"], served) if size is not None)
+    row["compression_saves"] = served - best
+    row["ratio"] = best / served if served else None
+    try:
+        shape = json_shape(json.loads(body)) if body else None
+    except ValueError:
+        shape = None
+    if shape:
+        row.update(depth=shape["depth"], fields=shape["fields"], distinct_keys=len(shape["keys"]),
+                   null_share=shape["nulls"] / shape["fields"] if shape["fields"] else None,
+                   key_share=shape["key_bytes"] / len(body))
+    rows = count_rows(body) if body else None
+    if rows:
+        row["rows"] = rows
+        row["bytes_per_row"] = len(body) / rows
+        row["fields_per_row"] = row.get("fields", 0) / rows
+    return row
+
+
+def bytes_per_row_slope(points):
+    """Least-squares bytes per extra row over (rows, bytes) points, or None."""
+    points = [(rows, size) for rows, size in points if rows]
+    if len({rows for rows, _ in points}) < 2:
+        return None
+    mean_x = sum(p[0] for p in points) / len(points)
+    mean_y = sum(p[1] for p in points) / len(points)
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+
+
+async def audit(session, items, variables, page_sizes, level, ids=None, seed=0):
+    """One row per item, with a pageSize curve for paginated GETs."""
+    rng = random.Random(seed)
+    results = []
+    for module, item in items:
+        method, url, headers, data = build_request(item, variables)
+        if ids is not None:
+            split = urlsplit(url)
+            url = split._replace(path=ids.rewrite_path(split.path, rng)).geturl()
+        try:
+            row = measure(*await fetch(session, method, url, headers, data), level)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            row = {"status": type(e).__name__}
+        row.update(name=f"{module} / {item['name']}", method=method, path=item_path(item))
+        paging = paging_params(item) if method == "GET" else None
+        if paging and row["status"] == 200:
+            curve = []
+            for size in page_sizes:
+                sized = with_query(url, **{paging[0]: 1, paging[1]: size})
+                try:
+                    status, body, _, _ = await fetch(session, method, sized, headers, data)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    continue
+                if status == 200:
+                    curve.append({"page_size": size, "rows": count_rows(body), "bytes": len(body)})
+            row["page_sizes"] = curve
+            row["slope_bytes_per_row"] = bytes_per_row_slope([(p["rows"], p["bytes"]) for p in curve])
+            row["max_rows"] = max((p["rows"] or 0 for p in curve), default=None)
+        results.append(row)
+        print(f"  {row['name']}: HTTP {row['status']}, {row.get('bytes', 0):,} B", file=sys.stderr)
+    return results
+
+
+COMPRESSION_COLUMNS = [
+    ("name", "Endpoint"),
+    ("status", "HTTP"),
+    ("served_bytes", "Served B", ",d"),
+    ("encoding", "Encoding"),
+    ("gzip_bytes", "gzip B", ",d"),
+    ("br_bytes", "br B", ",d"),
+    ("ratio", "Best ratio", ".0%"),
+    ("compression_saves", "Saves B", ",d"),
+    ("transfer_saved_ms", "Saves ms", ",.0f"),
+]
+
+DTO_COLUMNS = [
+    ("name", "Endpoint"),
+    ("rows", "Rows"),
+    ("bytes_per_row", "B/row", ",.0f"),
+    ("slope_bytes_per_row", "B/extra row", ",.0f"),
+    ("max_rows", "Max rows"),
+    ("fields_per_row", "Fields/row", ".1f"),
+    ("distinct_keys", "Keys"),
+    ("depth", "Depth"),
+    ("null_share", "Nulls", ".0%"),
+    ("key_share", "Key bytes", ".0%"),
+]
+
+
+def _measured(row):
+    # Error bodies (401, 404 on a stale route, 500) are not the payloads being audited
+    return "bytes" in row and 200 <= row["status"] < 300
+
+
+def print_report(rows, top, bandwidth):
+    measured = [row for row in rows if _measured(row)]
+    for row in measured:
+        row["transfer_saved_ms"] = row["compression_saves"] * 8 / (bandwidth * 1e6) * 1000.0
+    by_savings = sorted(measured, key=lambda r: -r["compression_saves"])
+    print(f"\nCompression: bytes and transfer time saved per request at {bandwidth:g} Mbit/s")
+    print(format_table(by_savings[:top] if top else by_savings, COMPRESSION_COLUMNS))
+    lists = sorted((row for row in measured if row.get("rows")), key=lambda r: -(r["slope_bytes_per_row"]
+                   if r.get("slope_bytes_per_row") is not None else r["bytes_per_row"]))
+    if lists:
+        print("\nDTO size on list endpoints, widest rows first")
+        print(format_table(lists[:top] if top else lists, DTO_COLUMNS))
+    served = sum(row["served_bytes"] for row in measured)
+    saved = sum(row["compression_saves"] for row in measured)
+    uncompressed = sum(1 for row in measured if row["encoding"] == "-" and row["compression_saves"] > 0)
+    print(f"\n{len(measured)} responses, {served:,} bytes served; compression would remove {saved:,} "
+          f"({saved / served:.0%})" if served else f"\n{len(measured)} responses")
+    if uncompressed:
+        print(f"  {uncompressed} responses were sent without Content-Encoding and would shrink")
+    failed = [row for row in rows if not _measured(row)]
+    if failed:
+        print(f"  {len(failed)} failed, not counted:")
+    for row in failed:
+        print(f"    {row['name']}: {row['status']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--modules", nargs="*", help="Module numbers or names (default: all)")
+    parser.add_argument("--methods", nargs="*", default=["GET"],
+                        help="HTTP verbs to call (default: GET only, writes are opt-in)")
+    parser.add_argument("--page-sizes", nargs="*", type=int, default=[10, 50, 200],
+                        help="pageSize values for the bytes-per-row curve")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="fastest",
+                        help="Compression level to size for (ASP.NET Core's default is fastest)")
+    parser.add_argument("--bandwidth", type=float, default=10.0, help="Link speed in Mbit/s for the time saved")
+    parser.add_argument("--top", type=int, default=25, help="Rows per ranking (0: all)")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: replace hardcoded ids")
+    parser.add_argument("--json", help="Write every measured row to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    items = select_items(collection, args.modules, args.methods)
+    if not items:
+        print("No items match the selected modules/methods", file=sys.stderr)
+        return 2
+    ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+
+    async def run():
+        async with open_session(1, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            return await audit(session, items, variables, args.page_sizes, args.level, ids)
+
+    print(f"Auditing {len(items)} endpoints at {variables['baseUrl']}", file=sys.stderr)
+    rows = asyncio.run(run())
+    print_report(rows, args.top, args.bandwidth)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
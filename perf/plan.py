@@ -0,0 +1,116 @@
+"""
+Compiled request plans for the load tools
+
+compile_plan() turns collection items into immutable CompiledRequest records
+once, up front: compact pre-encoded JSON body bytes, the fully resolved URL,
+a prebuilt header dict and an HTTP/1.1 request head. The send loop then does
+no JSON or {{variable}} work; only the bearer token is patched in per request.
+
+Given seeded ids (perf.seed.SeededIds), each item is compiled into several
+variants whose path ids and *Id body fields point at different seeded rows.
+"""
+
+import json
+import random
+from urllib.parse import urlsplit
+
+from yarl import URL
+
+from perf.collection import (
+    item_method, item_requires_auth, substitute,
+)
+
+
+class CompiledRequest:
+    """One ready-to-send request. Immutable once built."""
+
+    __slots__ = ("module", "name", "method", "url", "url_bytes", "target", "headers",
+                 "auth", "body", "head")
+
+    def __init__(self, module, name, method, url, headers, auth, body):
+        split = urlsplit(url)
+        target = split.path + ("?" + split.query if split.query else "")
+        head = [f"{method} {target} HTTP/1.1", f"Host: {split.netloc}"]
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        if body is not None:
+            head.append(f"Content-Length: {len(body)}")
+        set_ = object.__setattr__
+        set_(self, "module", module)
+        set_(self, "name", name)
+        set_(self, "method", method)
+        # encoded=True: the URL is already resolved, skip yarl's re-quoting per send
+        set_(self, "url", URL(url, encoded=True))
+        set_(self, "url_bytes", url.encode("utf-8"))
+        set_(self, "target", target.encode("utf-8"))
+        set_(self, "headers", headers)
+        set_(self, "auth", auth)
+        set_(self, "body", body)
+        set_(self, "head", ("\r\n".join(head) + "\r\n").encode("latin-1"))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledRequest is immutable")
+
+    def __repr__(self):
+        return f"<CompiledRequest {self.method} {self.url_bytes.decode()}>"
+
+    def request_headers(self, bearer):
+        """Header dict for this send; `bearer` is the prebuilt 'Bearer <token>' value."""
+        if self.auth and bearer:
+            headers = self.headers.copy()
+            headers["Authorization"] = bearer
+            return headers
+        return self.headers
+
+    def wire(self, authorization_line):
+        """Raw HTTP/1.1 request bytes; authorization_line comes from bearer_line()."""
+        auth = authorization_line if self.auth else b""
+        return self.head + auth + b"\r\n" + (self.body or b"")
+
+
+def bearer_value(token):
+    return "Bearer " + token if token else ""
+
+
+def bearer_line(token):
+    return ("Authorization: Bearer " + token + "\r\n").encode("latin-1") if token else b""
+
+
+def _compact_body(item, variables, ids=None, rng=None):
+    body = item["request"].get("body")
+    if not body or body.get("mode") != "raw":
+        return None
+    raw = substitute(body["raw"], variables)
+    try:
+        value = json.loads(raw)
+        if ids is not None:
+            value = ids.rewrite_body(value, rng)
+        raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    except ValueError:
+        pass  # not JSON, send as written
+    return raw.encode("utf-8")
+
+
+def compile_item(module, item, variables, ids=None, rng=None):
+    """Compile one collection item; {{token}} is deliberately not resolved here."""
+    static = {k: v for k, v in variables.items() if k != "token"}
+    request = item["request"]
+    url = substitute(request["url"]["raw"], static)
+    if ids is not None:
+        split = urlsplit(url)
+        url = split._replace(path=ids.rewrite_path(split.path, rng)).geturl()
+    headers = {h["key"]: substitute(h["value"], static) for h in request.get("header", [])}
+    return CompiledRequest(module, item["name"], item_method(item), url, headers,
+                           item_requires_auth(item), _compact_body(item, static, ids, rng))
+
+
+def compile_plan(items, variables, ids=None, variants=64, seed=0):
+    """Compile (module, item) pairs into a tuple of CompiledRequest.
+
+    With seeded ids the tuple holds `variants` rounds of the items, each
+    round drawing fresh ids, so cycling through it keeps every item's share.
+    """
+    if ids is None:
+        return tuple(compile_item(module, item, variables) for module, item in items)
+    rng = random.Random(seed)
+    return tuple(compile_item(module, item, variables, ids, rng)
+                 for _ in range(variants) for module, item in items)
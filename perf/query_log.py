@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+EF Core slow-query and N+1 analyzer for the API's Serilog files
+
+Streams every "Executed DbCommand (Nms)" entry out of
+NPPContractManagement.API/logs/npp-*.log (plain or .gz, any size), groups the
+commands by a normalized SQL fingerprint and reports count, total, p95 and
+max duration per fingerprint. Commands are attributed to the request(s) open
+at the time, resolved to controller actions through the endpoint registry, so
+the report also shows which endpoints drive database time and flags N+1
+bursts: one fingerprint executed many times inside a single request.
+
+Files are analyzed in parallel worker processes, one file each, and the
+partial results are merged; memory per worker is bounded by the number of
+distinct fingerprints and concurrently open requests, not by the log size.
+
+Usage:
+    python -m perf.query_log
+    python -m perf.query_log NPPContractManagement.API/logs/npp-2026*.log.gz --top 30 --json db.json
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from perf.collection import REPO_ROOT
+from perf.controller_scan import endpoint_resolver, registry, scan_controllers
+from perf.histogram import Histogram
+from perf.serilog import db_command, iter_log, request_finished, request_starting, url_path
+from perf.stats import format_table
+
+DEFAULT_LOGS = os.path.join(REPO_ROOT, "NPPContractManagement.API", "logs", "npp-*.log*")
+BACKGROUND = "(no request)"
+# Requests still open after this long are assumed lost (crash, log rotation)
+STALE_REQUEST_S = 600
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"(?<![\w@`.])-?\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"@\w+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\((?:\?|\?\+)\)(?:\s*,\s*\((?:\?|\?\+)\))+")
+_SPACE = re.compile(r"\s+")
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_sql(sql):
+    """Replace literals and parameters with ?, collapse IN lists and VALUES rows."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAMETER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    sql = _LIST.sub("(?+)", sql)
+    return _ROWS.sub("(?+)+", sql)
+
+
+def fingerprint(sql):
+    normalized = normalize_sql(sql)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:10], normalized
+
+
+class QueryStats:
+    """Mergeable per-fingerprint, per-endpoint and N+1 aggregates."""
+
+    def __init__(self):
+        self.queries = {}
+        self.endpoints = {}
+        self.bursts = {}
+        self.entries = 0
+
+    def add_command(self, key, sql, ms, failed, labels):
+        query = self.queries.get(key)
+        if query is None:
+            query = self.queries[key] = {"sql": sql, "count": 0, "failed": 0, "total_ms": 0,
+                                         "histogram": Histogram(), "endpoints": {}}
+        query["count"] += 1
+        query["failed"] += failed
+        query["total_ms"] += ms
+        query["histogram"].record(ms * 1000)
+        for label in labels:
+            query["endpoints"][label] = query["endpoints"].get(label, 0) + 1
+
+    def endpoint(self, label):
+        if label not in self.endpoints:
+            self.endpoints[label] = {"requests": 0, "db_ms": 0.0, "commands": 0.0,
+                                     "shared_commands": 0, "server_ms": 0.0}
+        return self.endpoints[label]
+
+    def add_burst(self, label, key, repeats, shared):
+        burst = self.bursts.setdefault((label, key), {"requests": 0, "max_repeats": 0,
+                                                       "total_repeats": 0, "shared": 0})
+        burst["requests"] += 1
+        burst["max_repeats"] = max(burst["max_repeats"], repeats)
+        burst["total_repeats"] += repeats
+        burst["shared"] += shared
+
+    def merge(self, other):
+        self.entries += other.entries
+        for key, query in other.queries.items():
+            mine = self.queries.get(key)
+            if mine is None:
+                self.queries[key] = query
+                continue
+            for field in ("count", "failed", "total_ms"):
+                mine[field] += query[field]
+            mine["histogram"].merge(query["histogram"])
+            for label, count in query["endpoints"].items():
+                mine["endpoints"][label] = mine["endpoints"].get(label, 0) + count
+        for label, values in other.endpoints.items():
+            mine = self.endpoint(label)
+            for field, value in values.items():
+                mine[field] += value
+        for key, burst in other.bursts.items():
+            mine = self.bursts.setdefault(key, dict.fromkeys(burst, 0))
+            for field, value in burst.items():
+                mine[field] = max(mine[field], value) if field == "max_repeats" else mine[field] + value
+        return self
+
+
+class _OpenRequest:
+    __slots__ = ("label", "started", "db_ms", "commands", "shared", "counts")
+
+    def __init__(self, label, started):
+        self.label = label
+        self.started = started
+        self.db_ms = 0.0
+        self.commands = 0.0
+        self.shared = 0
+        self.counts = {}
+
+
+def analyze_file(path, endpoints, burst_threshold=10):
+    """One pass over one log file; returns its QueryStats."""
+    resolve = endpoint_resolver(endpoints)
+    stats = QueryStats()
+    open_requests = {}
+    fingerprints = {}
+    for entry in iter_log(path):
+        stats.entries += 1
+        command = db_command(entry)
+        if command:
+            ms, failed, _ = command
+            sql = entry.text
+            if sql not in fingerprints:
+                if len(fingerprints) > 50000:  # literal SQL text can be unbounded
+                    fingerprints.clear()
+                fingerprints[sql] = fingerprint(sql)
+            key, normalized = fingerprints[sql]
+            # Without a request id, a command belongs to every request open at the time
+            active = [r for r in open_requests.values() if r.label]
+            share = 1.0 / len(active) if active else 0.0
+            for request in active:
+                request.db_ms += ms * share
+                request.commands += share
+                request.shared += len(active) > 1
+                request.counts[key] = request.counts.get(key, 0) + 1
+            if not active:
+                background = stats.endpoint(BACKGROUND)
+                background["db_ms"] += ms
+                background["commands"] += 1
+            stats.add_command(key, normalized, ms, failed,
+                              {r.label for r in active} or {BACKGROUND})
+            continue
+        started = request_starting(entry)
+        if started:
+            method, url = started
+            path = url_path(url)
+            key = (method, path)
+            # OPTIONS preflights never reach a controller
+            label = None
+            if method != "OPTIONS":
+                endpoint = resolve(method, path[4:] if path.startswith("/api/") else path)
+                label = (f"{endpoint['controller']}.{endpoint['action']}" if endpoint
+                         else f"{method} {_ID_SEGMENT.sub('/{id}', path)}")
+            # The same method+path can be open twice; keep both by suffixing the key
+            while key in open_requests:
+                key = key + (None,)
+            open_requests[key] = _OpenRequest(label, entry.timestamp)
+            continue
+        finished = request_finished(entry)
+        if finished:
+            method, url, _, server_ms = finished
+            key = (method, url_path(url))
+            candidates = [k for k in open_requests if k[:2] == key]
+            if not candidates:
+                continue
+            request = open_requests.pop(candidates[0])
+            if request.label:
+                totals = stats.endpoint(request.label)
+                totals["requests"] += 1
+                totals["db_ms"] += request.db_ms
+                totals["commands"] += request.commands
+                totals["shared_commands"] += request.shared
+                totals["server_ms"] += server_ms
+                for fp, repeats in request.counts.items():
+                    if repeats >= burst_threshold:
+                        stats.add_burst(request.label, fp, repeats, request.shared > 0)
+            if len(open_requests) > 64:
+                now = entry.timestamp
+                for stale in [k for k, r in open_requests.items() if now - r.started > STALE_REQUEST_S]:
+                    del open_requests[stale]
+    return stats
+
+
+def _analyze(args):
+    return analyze_file(*args)
+
+
+def analyze(paths, endpoints, burst_threshold=10, workers=None):
+    """Analyze files in parallel and merge the per-file results."""
+    total = QueryStats()
+    jobs = [(path, endpoints, burst_threshold) for path in paths]
+    if workers == 1 or len(jobs) < 2:
+        for job in jobs:
+            total.merge(_analyze(job))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_analyze, jobs):
+            total.merge(result)
+    return total
+
+
+def query_rows(stats, top):
+    rows = []
+    for key, query in stats.queries.items():
+        histogram = query["histogram"]
+        endpoints = sorted(query["endpoints"].items(), key=lambda e: -e[1])
+        rows.append({
+            "fingerprint": key, "count": query["count"], "failed": query["failed"],
+            "total_ms": query["total_ms"], "mean_ms": query["total_ms"] / query["count"],
+            "p95_ms": histogram.value_at(95) / 1000.0, "max_ms": (histogram.max or 0) / 1000.0,
+            "top_endpoint": endpoints[0][0] if endpoints else "",
+            "endpoints": dict(endpoints), "sql": query["sql"],
+        })
+    rows.sort(key=lambda r: -r["total_ms"])
+    return rows[:top] if top else rows
+
+
+def endpoint_rows(stats):
+    rows = []
+    for label, values in stats.endpoints.items():
+        requests = values["requests"]
+        rows.append(dict(values, name=label,
+                         db_ms_per_request=values["db_ms"] / requests if requests else None,
+                         commands_per_request=values["commands"] / requests if requests else None,
+                         db_share=values["db_ms"] / values["server_ms"] if values["server_ms"] else None))
+    rows.sort(key=lambda r: -r["db_ms"])
+    return rows
+
+
+def burst_rows(stats):
+    rows = [dict(burst, endpoint=label, fingerprint=key,
+                 mean_repeats=burst["total_repeats"] / burst["requests"],
+                 sql=stats.queries[key]["sql"])
+            for (label, key), burst in stats.bursts.items()]
+    rows.sort(key=lambda r: -r["total_repeats"])
+    return rows
+
+
+def print_report(stats, top, show_sql):
+    queries = query_rows(stats, top)
+    print(f"\n{stats.entries:,} log entries, {len(stats.queries):,} distinct SQL fingerprints")
+    print(f"\nTop {len(queries)} fingerprints by total DB time")
+    print(format_table(queries, [
+        ("fingerprint", "Fingerprint"), ("count", "Count", ","), ("failed", "Failed"),
+        ("total_ms", "Total ms", ","), ("mean_ms", "Mean ms", ".1f"), ("p95_ms", "p95 ms", ".0f"),
+        ("max_ms", "Max ms", ".0f"), ("top_endpoint", "Mostly from")]))
+    if show_sql:
+        for row in queries:
+            print(f"\n[{row['fingerprint']}] {row['sql'][:show_sql]}")
+    print("\nEndpoints by DB time")
+    print(format_table(endpoint_rows(stats), [
+        ("name", "Endpoint"), ("requests", "Requests", ","), ("db_ms", "DB ms", ",.0f"),
+        ("db_ms_per_request", "DB ms/req", ".1f"), ("commands_per_request", "Cmds/req", ".1f"),
+        ("db_share", "DB share of server time", ".0%"), ("shared_commands", "Overlapped cmds", ",")]))
+    bursts = burst_rows(stats)
+    print("\nN+1 bursts (same fingerprint repeated inside one request)")
+    if bursts:
+        print(format_table(bursts, [
+            ("endpoint", "Endpoint"), ("fingerprint", "Fingerprint"), ("requests", "Requests"),
+            ("mean_repeats", "Mean repeats", ".1f"), ("max_repeats", "Max repeats"),
+            ("shared", "Overlapped")]))
+    else:
+        print("  none")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("logs", nargs="*", help=f"Log files or globs (default: {DEFAULT_LOGS})")
+    parser.add_argument("--top", type=int, default=20, help="Fingerprints to list (0 = all)")
+    parser.add_argument("--n-plus-one", type=int, default=10,
+                        help="Repeats of one fingerprint in one request that count as an N+1 burst")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--sql", type=int, nargs="?", const=400, default=0,
+                        help="Print the normalized SQL of the listed fingerprints (first N chars)")
+    parser.add_argument("--json", help="Write fingerprints, endpoints and bursts to this file")
+    args = parser.parse_args(argv)
+
+    paths = sorted({p for pattern in (args.logs or [DEFAULT_LOGS]) for p in glob.glob(pattern)})
+    if not paths:
+        parser.error("No log files found")
+    endpoints = registry(scan_controllers())
+    print(f"Analyzing {len(paths)} log files ({sum(os.path.getsize(p) for p in paths) / 1e6:,.1f} MB)",
+          file=sys.stderr)
+    stats = analyze(paths, endpoints, args.n_plus_one, args.workers)
+    print_report(stats, args.top, args.sql)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"entries": stats.entries,
+                       "fingerprints": [dict(r) for r in query_rows(stats, 0)],
+                       "endpoints": endpoint_rows(stats), "bursts": burst_rows(stats)}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
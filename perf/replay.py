@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Replay real traffic reconstructed from the API's Serilog files
+
+Streams the Microsoft.AspNetCore.Hosting.Diagnostics entries of
+NPPContractManagement.API/logs/npp-*.log (oldest file first). Each
+"Request starting HTTP/1.1 <verb> <url>" line becomes one request at its
+logged time. CORS preflights (OPTIONS) are left out unless
+--include-options is given. Each request is mapped to the collection item
+whose path template matches, taking the most literal segments. The replay
+sends the logged path and query string, with the item's headers and sample
+body (the logs carry no bodies). With --seed-ids, ids are spread over the
+seeded rows the way perf.runner does. Login/token items and uploads are
+not replayed, as in perf.runner. Requests that match no item are counted
+and listed, and replayed only if they are GETs and --unmatched-gets is set.
+
+Arrivals keep the recorded inter-arrival times divided by --speed (10 = ten
+times real speed). Idle gaps longer than --max-gap seconds of log time, such
+as nights between daily files, are shortened to --max-gap. The replay is
+open-loop like perf.workload: latency is measured from the intended send
+time, so queueing behind a slow API counts. The report puts replay latency
+next to the server time logged for the same endpoint ("Request finished ...
+315.4613ms").
+
+--analyze only prints the reconstructed mix: verbs, endpoints, match rate
+and inter-arrival statistics.
+
+Usage:
+    python -m perf.replay NPPContractManagement.API/logs/npp-*.log --analyze
+    python -m perf.replay NPPContractManagement.API/logs/npp-20260220.log \
+        --base-url http://localhost:5143/api --speed 10 --scan-controllers
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import sys
+import time
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, item_is_upload, item_path, iter_items, load_collection
+from perf.histogram import Histogram
+from perf.results import add_store_arguments, save_from_args
+from perf.runner import SESSION_ITEMS, Recorder, add_common_arguments, login, open_session
+from perf.seed import SeededIds
+from perf.serilog import iter_log, request_finished, request_starting
+from perf.stats import LATENCY_COLUMNS, format_table
+
+_VARIABLE = re.compile(r"^(\d+|\{\{\w+\}\}|\{\w+[^}]*\})$")
+API_PREFIX = "/api"
+
+
+def relative_url(url):
+    """Logged absolute URL -> path and query below the API base ("/contracts/5?page=1")."""
+    rest = url.split("://", 1)[-1]
+    rest = rest[rest.find("/"):] if "/" in rest else "/"
+    if rest.lower().startswith(API_PREFIX + "/"):
+        rest = rest[len(API_PREFIX):]
+    return rest
+
+
+class ItemMatcher:
+    """Map (method, path) to the collection item whose path template matches most literally."""
+
+    def __init__(self, collection):
+        self.routes = {}
+        for module, item in iter_items(collection):
+            path = item_path(item).split("?", 1)[0]
+            segments = path.strip("/").split("/")
+            # a numeric sample id only stands for numeric ids: /industries/1 must not take /industries/active
+            pattern = "/".join(r"\d+" if s.isdigit() else "[^/]+" if _VARIABLE.match(s) else re.escape(s)
+                               for s in segments)
+            literals = sum(1 for s in segments if not _VARIABLE.match(s))
+            self.routes.setdefault(item["request"]["method"].upper(), []).append(
+                (literals, re.compile(f"^/{pattern}/?$", re.IGNORECASE), module, item))
+        for routes in self.routes.values():
+            routes.sort(key=lambda route: -route[0])
+        self.cache = {}
+
+    def match(self, method, path):
+        """(module, item) or None; path is relative to the API base, without the query."""
+        key = (method, path.lower())
+        if key not in self.cache:
+            self.cache[key] = next(((module, item) for _, regex, module, item in self.routes.get(method, ())
+                                    if regex.match(path)), None)
+        return self.cache[key]
+
+
+def label_for(match, method, path):
+    if match:
+        return match[0], match[1]["name"]
+    return "(unmatched)", f"{method} {re.sub(r'/[0-9]+(?=/|$)', '/{id}', path.lower())}"
+
+
+def replayable(match):
+    return match is not None and match[1]["name"] not in SESSION_ITEMS and not item_is_upload(match[1])
+
+
+def read_traffic(paths, matcher, include_options=False, logged=None):
+    """Yield (timestamp, method, relative url, match) per logged request, in log order.
+
+    Finished entries are folded into `logged` ({(module, name): Histogram of server ms})."""
+    for path in paths:
+        for entry in iter_log(path):
+            started = request_starting(entry)
+            if started:
+                method, url = started
+                if method == "OPTIONS" and not include_options:
+                    continue
+                relative = relative_url(url)
+                yield entry.timestamp, method, relative, matcher.match(method, relative.split("?", 1)[0])
+                continue
+            if logged is not None:
+                finished = request_finished(entry)
+                if finished and (include_options or finished[0] != "OPTIONS"):
+                    method, url, _, server_ms = finished
+                    path = relative_url(url).split("?", 1)[0]
+                    key = label_for(matcher.match(method, path), method, path)
+                    logged.setdefault(key, Histogram()).record(server_ms * 1000)
+
+
+def schedule(traffic, speed, max_gap):
+    """Yield (offset seconds from replay start, method, url, match) with gaps compressed."""
+    previous, offset = None, 0.0
+    for timestamp, method, url, match in traffic:
+        if previous is not None:
+            offset += min(max(timestamp - previous, 0.0), max_gap) / speed
+        previous = timestamp
+        yield offset, method, url, match
+
+
+def analyze(traffic, max_gap):
+    """Verb/endpoint mix, match rate and inter-arrival statistics of the logged traffic."""
+    verbs, endpoints, gaps = {}, {}, []
+    previous, total, matched, first, last = None, 0, 0, None, None
+    for timestamp, method, url, match in traffic:
+        total += 1
+        matched += match is not None
+        verbs[method] = verbs.get(method, 0) + 1
+        key = label_for(match, method, url.split("?", 1)[0])
+        endpoints[key] = endpoints.get(key, 0) + 1
+        if previous is not None and timestamp - previous <= max_gap:
+            gaps.append(timestamp - previous)
+        previous = timestamp
+        first = timestamp if first is None else first
+        last = timestamp
+    summary = {"requests": total, "matched": matched, "verbs": verbs,
+               "span_s": (last - first) if total else 0.0, "endpoints": endpoints}
+    if len(gaps) > 1:
+        mean = statistics.fmean(gaps)
+        summary.update(gap_mean_s=mean, gap_p50_s=statistics.median(gaps),
+                       gap_p95_s=sorted(gaps)[int(0.95 * (len(gaps) - 1))],
+                       gap_cv=statistics.pstdev(gaps) / mean if mean else None)
+    return summary
+
+
+def print_analysis(summary, top=25):
+    total = summary["requests"]
+    print(f"{total:,} requests over {summary['span_s'] / 3600:.1f} h of log time, "
+          f"{summary['matched']:,} ({summary['matched'] / max(total, 1):.0%}) matched to collection items")
+    print("Verbs: " + ", ".join(f"{verb} {count:,}" for verb, count in
+                                sorted(summary["verbs"].items(), key=lambda kv: -kv[1])))
+    if "gap_mean_s" in summary:
+        print(f"Inter-arrival: mean {summary['gap_mean_s'] * 1000:.0f} ms, p50 {summary['gap_p50_s'] * 1000:.0f} ms, "
+              f"p95 {summary['gap_p95_s'] * 1000:.0f} ms, CV {summary['gap_cv']:.2f} (1 = Poisson, >1 = bursty)")
+    rows = [{"name": f"{module} / {name}", "requests": count, "share": count / max(total, 1)}
+            for (module, name), count in sorted(summary["endpoints"].items(), key=lambda kv: -kv[1])[:top]]
+    print(format_table(rows, [("name", "Endpoint"), ("requests", "Requests", ","), ("share", "Share", ".1%")]))
+
+
+async def _fire(session, method, url, headers, data, intended, slots, recorder, key):
+    async with slots:
+        try:
+            async with session.request(method, url, headers=headers, data=data) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 0
+    recorder.record(key[0], key[1], time.perf_counter() - intended, status)
+
+
+async def replay(session, events, variables, recorder, max_in_flight, unmatched_gets=False, ids=None,
+                 limit=None, seed=0):
+    """Send scheduled events open-loop; returns (sent, skipped)."""
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks, sent, skipped = set(), 0, 0
+    base = variables["baseUrl"]
+    start = time.perf_counter()
+    for offset, method, url, match in events:
+        if limit is not None and sent >= limit:
+            break
+        path, _, query = url.partition("?")
+        if ids is not None:
+            path = ids.rewrite_path(path, rng)
+        if replayable(match):
+            _, _, headers, data = build_request(match[1], variables)
+            if data is not None and ids is not None:
+                try:
+                    data = json.dumps(ids.rewrite_body(json.loads(data), rng)).encode("utf-8")
+                except ValueError:
+                    pass
+        elif match is None and unmatched_gets and method == "GET":
+            headers = {"Authorization": "Bearer " + variables["token"]} if variables.get("token") else {}
+            data = None
+        else:
+            skipped += 1
+            continue
+        intended = start + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        key = label_for(match, method, path)
+        task = asyncio.ensure_future(_fire(session, method, base + path + ("?" + query if query else ""),
+                                           headers, data, intended, slots, recorder, key))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        sent += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+    recorder.stop()
+    return sent, skipped
+
+
+REPLAY_COLUMNS = LATENCY_COLUMNS + [("logged_p50_ms", "Logged p50 ms", ".1f"),
+                                    ("logged_p95_ms", "Logged p95 ms", ".1f")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("logs", nargs="+", help="Serilog files (plain or .gz), replayed in name order")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression (10 = 10x real speed)")
+    parser.add_argument("--max-gap", type=float, default=60.0,
+                        help="Longest idle gap kept, in seconds of log time")
+    parser.add_argument("--include-options", action="store_true", help="Also replay CORS preflights")
+    parser.add_argument("--unmatched-gets", action="store_true",
+                        help="Replay GETs that match no collection item, as logged")
+    parser.add_argument("--limit", type=int, help="Stop after this many requests")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: replace logged ids")
+    parser.add_argument("--analyze", action="store_true", help="Only print the reconstructed mix")
+    parser.add_argument("--json", help="Write the mix and replay summary to this file")
+    add_store_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    matcher = ItemMatcher(collection)
+    paths = sorted(args.logs)
+    summary = analyze(read_traffic(paths, matcher, args.include_options), args.max_gap)
+    print_analysis(summary)
+    if args.analyze or not summary["requests"]:
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(dict(summary, endpoints={f"{m} / {n}": c for (m, n), c in summary["endpoints"].items()}),
+                          f, indent=2)
+        return 0
+
+    ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+    logged = {}
+    recorder = Recorder()
+    wall = summary["span_s"] / args.speed
+    print(f"\nReplaying at {args.speed:g}x against {variables['baseUrl']} "
+          f"(at most ~{wall / 60:.1f} min before gap compression)")
+
+    async def run():
+        async with open_session(args.max_in_flight, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            events = schedule(read_traffic(paths, matcher, args.include_options, logged), args.speed, args.max_gap)
+            return await replay(session, events, variables, recorder, args.max_in_flight, args.unmatched_gets,
+                                ids, args.limit)
+
+    sent, skipped = asyncio.run(run())
+    rows = recorder.by_endpoint()
+    for row in rows:
+        histogram = logged.get((row["module"], row["endpoint"]))
+        if histogram:
+            row["logged_p50_ms"] = histogram.value_at(50) / 1000.0
+            row["logged_p95_ms"] = histogram.value_at(95) / 1000.0
+    print(f"\nSent {sent:,} requests in {recorder.elapsed:.1f}s, skipped {skipped:,} "
+          f"(login/token items, uploads, unmatched)")
+    print(format_table(rows, REPLAY_COLUMNS))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mix": dict(summary, endpoints={f"{m} / {n}": c for (m, n), c in summary["endpoints"].items()}),
+                       "sent": sent, "skipped": skipped, "duration_s": recorder.elapsed, "endpoints": rows},
+                      f, indent=2)
+    save_from_args(args, "replay", recorder.histograms(), recorder.elapsed, variables["baseUrl"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Date-range scaling analyzer for the report endpoints
+
+The Reports module items and the velocity usage report are only ever called
+with startDate=2024-01-01&endDate=2024-12-31. This tool sweeps the window from
+one day to several years (1, 2, 4 ... --max-days days, ending at --end). For
+each span it sends the request twice in a row and records latency, response
+bytes, rows and, with --api-log, server DB time and DbCommand count.
+
+For each report it flags:
+  - jumps: cold latency grows more than --jump-factor times between two
+    neighbouring spans, or the DbCommand count changes. Both suggest a
+    different query plan, such as a full scan or a missing index, from that
+    range on.
+  - flat cost: the one-day window already costs most of what the widest one
+    costs, even though it returns far fewer rows. The date filter is then
+    probably applied after reading everything.
+  - caching: the replay skips the database (no DbCommands) or is much faster
+    than the first request.
+
+Collection items pass the window as startDate/endDate query parameters. The
+API's own routes (--scan-controllers) take a JSON body; WINDOW_FIELDS maps
+them to their date fields. Requests are sent one at a time, so DB time from
+the log is attributed exactly.
+
+Usage:
+    python -m perf.report_ranges --base-url http://localhost:5143/api --max-days 1460 \
+        --api-log NPPContractManagement.API/logs/npp-20260220.log
+    python -m perf.report_ranges --scan-controllers --end 2025-12-31 --json ranges.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import sys
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, item_body, item_path, iter_items, load_collection
+from perf.pagination import count_rows, with_query
+from perf.runner import add_common_arguments, login, open_session
+from perf.serilog import LogTail, db_time_for
+from perf.stats import fit_power_law, format_table, geometric_sizes
+
+QUERY_WINDOWS = [("startDate", "endDate"), ("fromDate", "toDate"), ("dateFrom", "dateTo")]
+# The API's report routes take the window in the request body (ContractPricingReportRequest,
+# VelocityUsageReportRequest)
+WINDOW_FIELDS = {
+    "/reports/contract-pricing": ("startDateFrom", "startDateTo"),
+    "/velocity/usage-report": ("startDate", "endDate"),
+}
+
+
+def window_targets(collection, names=None):
+    """[(module, item, where, (start field, end field))] for every date-windowed report item."""
+    targets = []
+    for module, item in iter_items(collection):
+        if names and item["name"] not in names:
+            continue
+        path = item_path(item)
+        query = dict(parse_qsl(urlsplit(path).query))
+        fields = next((pair for pair in QUERY_WINDOWS if pair[0] in query and pair[1] in query), None)
+        if fields:
+            targets.append((module, item, "query", fields))
+        elif item["request"]["method"].upper() == "POST" and path.split("?")[0] in WINDOW_FIELDS:
+            targets.append((module, item, "body", WINDOW_FIELDS[path.split("?")[0]]))
+    return targets
+
+
+def windowed_request(item, variables, where, fields, start, end):
+    method, url, headers, data = build_request(item, variables)
+    start, end = start.isoformat(), end.isoformat()
+    if where == "query":
+        return method, with_query(url, **{fields[0]: start, fields[1]: end}), headers, data
+    body = item_body(item)
+    body = dict(body if isinstance(body, dict) else {}, **{fields[0]: start, fields[1]: end})
+    headers = dict(headers, **{"Content-Type": "application/json"})
+    return method, url, headers, json.dumps(body).encode("utf-8")
+
+
+async def _send(session, request):
+    method, url, headers, data = request
+    start = time.perf_counter()
+    try:
+        async with session.request(method, url, headers=headers, data=data) as response:
+            payload = await response.read()
+            status = response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        payload, status = b"", 0
+    return status, time.perf_counter() - start, payload
+
+
+async def sweep(session, target, variables, spans, end, tail, settle, samples):
+    """Cold and warm (immediate replay) measurements per span; medians over `samples`."""
+    _, item, where, fields = target
+    path = item_path(item).split("?", 1)[0]
+    method = item["request"]["method"].upper()
+    rows = []
+    for days in spans:
+        start = end - datetime.timedelta(days=days - 1)
+        request = windowed_request(item, variables, where, fields, start, end)
+        runs = []
+        for _ in range(samples):
+            pair = []
+            for _ in range(2):  # cold, then the identical request again
+                if tail:
+                    tail.read()
+                status, latency, payload = await _send(session, request)
+                db = None
+                if tail:
+                    await asyncio.sleep(settle)  # let Serilog flush the request's entries
+                    db = db_time_for(tail.read(), method, path)
+                pair.append((status, latency, payload, db))
+            runs.append(pair)
+        cold = [r[0] for r in runs]
+        warm = [r[1] for r in runs]
+        row = {
+            "days": days,
+            "start": start.isoformat(),
+            "status": ",".join(sorted({str(r[0]) for r in cold + warm})),
+            "cold_ms": statistics.median(r[1] for r in cold) * 1000.0,
+            "warm_ms": statistics.median(r[1] for r in warm) * 1000.0,
+            "bytes": len(cold[-1][2]),
+            "rows": count_rows(cold[-1][2]) if cold[-1][0] == 200 else None,
+            "db_ms": None, "db_commands": None, "warm_db_ms": None, "warm_db_commands": None,
+        }
+        if all(r[3] for r in cold + warm):
+            row.update(db_ms=statistics.median(r[3][0] for r in cold),
+                       db_commands=int(statistics.median(r[3][1] for r in cold)),
+                       warm_db_ms=statistics.median(r[3][0] for r in warm),
+                       warm_db_commands=int(statistics.median(r[3][1] for r in warm)))
+        row["warm_ratio"] = row["warm_ms"] / row["cold_ms"] if row["cold_ms"] else None
+        rows.append(row)
+        print(f"  {days:>5} days  cold {row['cold_ms']:9.1f} ms  warm {row['warm_ms']:9.1f} ms  "
+              f"{row['bytes']:>10,} B  HTTP {row['status']}", file=sys.stderr)
+    return rows
+
+
+def analyze(rows, jump_factor, flat_ratio):
+    """Growth fit, jumps between neighbouring spans, flat-cost and caching verdicts."""
+    ok = [r for r in rows if r["status"] in ("200", "201")]
+    findings = {"fit": None, "jumps": [], "flat_cost": False, "caching": None}
+    if len(ok) < 2:
+        return findings
+    findings["fit"] = fit_power_law([r["days"] for r in ok], [r["cold_ms"] for r in ok])
+    for previous, current in zip(ok, ok[1:]):
+        growth = current["cold_ms"] / previous["cold_ms"] if previous["cold_ms"] else 0
+        plan_change = (previous["db_commands"] is not None and current["db_commands"] is not None
+                       and previous["db_commands"] != current["db_commands"])
+        if growth > jump_factor or plan_change:
+            current["jump"] = f"x{growth:.1f}" + (" commands" if plan_change else "")
+            findings["jumps"].append({"from_days": previous["days"], "to_days": current["days"],
+                                      "growth": growth, "db_commands_changed": plan_change})
+    first, last = ok[0], ok[-1]
+    more_data = ((last["rows"] or 0) >= 10 * max(1, first["rows"] or 0)
+                 or last["bytes"] >= 10 * max(1, first["bytes"]))
+    findings["flat_cost"] = more_data and first["cold_ms"] >= flat_ratio * last["cold_ms"]
+    if all(r["warm_db_commands"] is not None for r in ok):
+        skipped = sum(1 for r in ok if r["warm_db_commands"] == 0 and (r["db_commands"] or 0) > 0)
+        findings["caching"] = ("results cached (replay runs no DB commands)" if skipped > len(ok) / 2
+                               else None)
+    if findings["caching"] is None:
+        ratio = statistics.median(r["warm_ratio"] for r in ok)
+        findings["caching"] = (f"replay {1 / ratio:.1f}x faster (cache or warm buffer pool)" if ratio < 0.5
+                               else "no result caching")
+    return findings
+
+
+RANGE_COLUMNS = [
+    ("days", "Days"),
+    ("status", "HTTP"),
+    ("cold_ms", "Cold ms", ".1f"),
+    ("warm_ms", "Replay ms", ".1f"),
+    ("rows", "Rows"),
+    ("bytes", "Bytes", ","),
+    ("db_ms", "DB ms", ".0f"),
+    ("db_commands", "DB cmds"),
+    ("warm_db_commands", "Replay DB cmds"),
+    ("jump", "Jump"),
+]
+
+
+def print_report(label, rows, findings):
+    print(f"\n{label}")
+    print(format_table(rows, RANGE_COLUMNS))
+    fit = findings["fit"]
+    if fit:
+        print(f"  latency ~ {fit['c']:.1f} + {fit['a']:.4g} * days^{fit['b']:.2f}  (R²={fit['r2']:.3f})")
+    for jump in findings["jumps"]:
+        print(f"  JUMP {jump['from_days']} -> {jump['to_days']} days: x{jump['growth']:.1f}"
+              + (", DbCommand count changed" if jump["db_commands_changed"] else ""))
+    if findings["flat_cost"]:
+        print("  FLAT COST: a one-day window costs nearly as much as the widest one; "
+              "the date filter is probably applied after a full scan")
+    if findings["caching"]:
+        print(f"  Caching: {findings['caching']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--items", nargs="*", help="Item names (default: every date-windowed report)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="Last day of every window (YYYY-MM-DD, default: today)")
+    parser.add_argument("--max-days", type=int, default=1460)
+    parser.add_argument("--factor", type=float, default=2.0, help="Growth factor between spans")
+    parser.add_argument("--samples", type=int, default=1, help="Cold/replay pairs per span (median)")
+    parser.add_argument("--api-log", help="API Serilog file to read server DB time from")
+    parser.add_argument("--log-settle", type=float, default=0.2,
+                        help="Seconds to wait for log entries after each request")
+    parser.add_argument("--jump-factor", type=float, default=3.0,
+                        help="Latency growth between neighbouring spans flagged as a jump")
+    parser.add_argument("--flat-ratio", type=float, default=0.5,
+                        help="Smallest/largest window cost ratio flagged as flat")
+    parser.add_argument("--json", help="Write results and findings to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    targets = window_targets(collection, args.items)
+    if not targets:
+        print("No date-windowed report items found", file=sys.stderr)
+        return 2
+    spans = geometric_sizes(1, args.max_days, args.factor)
+    if spans[-1] != args.max_days:
+        spans.append(args.max_days)
+
+    async def run():
+        async with open_session(1, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            tail = LogTail(args.api_log) if args.api_log else None
+            out = {}
+            for target in targets:
+                label = f"{target[0]} / {target[1]['name']}"
+                print(f"{label}: {len(spans)} spans up to {args.max_days} days", file=sys.stderr)
+                out[label] = await sweep(session, target, variables, spans, args.end, tail,
+                                         args.log_settle, args.samples)
+            return out
+
+    report, flagged = {}, False
+    for label, rows in asyncio.run(run()).items():
+        findings = analyze(rows, args.jump_factor, args.flat_ratio)
+        print_report(label, rows, findings)
+        flagged = flagged or bool(findings["jumps"]) or findings["flat_cost"]
+        report[label] = {"spans": rows, "findings": findings}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Benchmark result store with regression detection
+
+perf.runner and perf.workload save every run to a SQLite file: git SHA and
+dirty flag, tool, label, base URL, environment (host, platform, Python, CPUs,
+$PERF_ENV) and, per endpoint, the latency histogram (perf.histogram), count,
+errors and throughput. The default file is perf/results.sqlite. Use --store
+or $PERF_STORE to pick another, and --no-store to skip saving.
+
+`compare` tests each endpoint of a candidate run against a baseline. The
+baseline is either one run, or `last:N`: the N runs before the candidate with
+the same tool and label, their histograms merged. Two tests are available:
+
+  mwu        one-sided Mann-Whitney U on the histogram buckets (ties
+             corrected, normal approximation). Asks whether candidate
+             latencies are stochastically larger.
+  bootstrap  resamples both histograms and gives a confidence interval for
+             the ratio of the --quantile latencies.
+
+An endpoint counts as regressed only when two things hold. The test is
+significant at --alpha, Holm-corrected across the endpoints compared. And
+its --quantile latency grew by more than --min-change: with large samples a
+1% shift is "significant" but not worth blocking a release for. An error
+rate that grows by more than --error-margin is also a regression. The exit
+code is 1 when any endpoint regressed, so CI can gate on it.
+
+Usage:
+    python -m perf.runner --base-url http://localhost:5143/api --modules lookup --label lookup
+    python -m perf.results list
+    python -m perf.results compare last:5 latest --label lookup
+    python -m perf.results compare 12 14 --test bootstrap --quantile 95 --min-change 0.10
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+
+from perf.collection import REPO_ROOT
+from perf.histogram import Histogram
+from perf.stats import LATENCY_COLUMNS, format_table
+
+DEFAULT_STORE = os.path.join(REPO_ROOT, "perf", "results.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    label TEXT,
+    git_sha TEXT,
+    git_dirty INTEGER,
+    base_url TEXT,
+    duration_s REAL,
+    environment TEXT,
+    arguments TEXT
+);
+CREATE TABLE IF NOT EXISTS endpoints (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    rps REAL,
+    p50_ms REAL,
+    p95_ms REAL,
+    p99_ms REAL,
+    histogram TEXT NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS runs_tool_label ON runs (tool, label, id);
+"""
+
+
+def add_store_arguments(parser):
+    """--store/--no-store/--label for tools that save their runs."""
+    parser.add_argument("--store", default=os.environ.get("PERF_STORE", DEFAULT_STORE),
+                        help="SQLite result store (default: $PERF_STORE or perf/results.sqlite)")
+    parser.add_argument("--no-store", action="store_true", help="Do not save this run")
+    parser.add_argument("--label", help="Run label used to pick comparable baselines")
+
+
+def git_state():
+    """(HEAD sha, working tree dirty) or (None, None) outside a git checkout."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD", "--"], cwd=REPO_ROOT).returncode != 0
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def environment():
+    return {
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "env": os.environ.get("PERF_ENV"),
+    }
+
+
+class ResultStore:
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def save_run(self, tool, endpoints, duration, base_url=None, label=None, arguments=None):
+        """Store one run; endpoints is {name: (Histogram, errors)}. Returns the run id."""
+        sha, dirty = git_state()
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO runs (created_at, tool, label, git_sha, git_dirty, base_url, duration_s,"
+                " environment, arguments) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"), tool, label,
+                 sha, None if dirty is None else int(dirty), base_url, duration, json.dumps(environment()),
+                 json.dumps(arguments or {})))
+            run_id = cursor.lastrowid
+            for name, (histogram, errors) in endpoints.items():
+                summary = histogram.summary(duration, errors)
+                self.db.execute(
+                    "INSERT INTO endpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, name, histogram.count, errors, summary["rps"], summary["p50_ms"],
+                     summary["p95_ms"], summary["p99_ms"], json.dumps(histogram.to_dict())))
+        return run_id
+
+    def runs(self, tool=None, label=None, limit=20):
+        query, params = "SELECT * FROM runs WHERE 1=1", []
+        if tool:
+            query += " AND tool = ?"
+            params.append(tool)
+        if label:
+            query += " AND label = ?"
+            params.append(label)
+        query += " ORDER BY id DESC LIMIT ?"
+        return [dict(row) for row in self.db.execute(query, params + [limit])]
+
+    def run(self, run_id):
+        row = self.db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"No run {run_id} in {self.path}")
+        return dict(row)
+
+    def latest(self, tool=None, label=None):
+        runs = self.runs(tool, label, 1)
+        if not runs:
+            raise ValueError(f"No runs in {self.path}")
+        return runs[0]
+
+    def endpoints(self, run_ids):
+        """{name: (merged Histogram, errors)} over one or more runs."""
+        merged = {}
+        marks = ",".join("?" * len(run_ids))
+        for row in self.db.execute(f"SELECT name, errors, histogram FROM endpoints WHERE run_id IN ({marks})",
+                                   list(run_ids)):
+            histogram = Histogram.from_dict(json.loads(row["histogram"]))
+            if row["name"] in merged:
+                merged[row["name"]][0].merge(histogram)
+                merged[row["name"]][1] += row["errors"]
+            else:
+                merged[row["name"]] = [histogram, row["errors"]]
+        return {name: tuple(value) for name, value in merged.items()}
+
+    def baseline_ids(self, spec, candidate):
+        """Run ids for a baseline spec: a run id, "latest", or "last:N" before the candidate."""
+        if spec.startswith("last:"):
+            count = int(spec.split(":", 1)[1])
+            rows = self.db.execute(
+                "SELECT id FROM runs WHERE tool = ? AND label IS ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (candidate["tool"], candidate["label"], candidate["id"], count)).fetchall()
+            if not rows:
+                raise ValueError(f"No earlier {candidate['tool']} runs labelled {candidate['label']!r}")
+            return [row["id"] for row in rows]
+        return [self.resolve(spec)["id"]]
+
+    def resolve(self, spec, tool=None, label=None):
+        return self.latest(tool, label) if spec == "latest" else self.run(int(spec))
+
+
+def save_from_args(args, tool, endpoints, duration, base_url):
+    """Save a run when the tool was not started with --no-store; returns the run id or None."""
+    if args.no_store:
+        return None
+    arguments = {k: v for k, v in vars(args).items() if k not in ("password", "store", "no_store")}
+    store = ResultStore(args.store)
+    try:
+        run_id = store.save_run(tool, endpoints, duration, base_url, args.label, arguments)
+    finally:
+        store.close()
+    print(f"Saved as run {run_id} in {args.store}")
+    return run_id
+
+
+def mann_whitney(base, candidate):
+    """One-sided Mann-Whitney U on two histograms: P-value that candidate is not slower, and
+    P(candidate > base) as effect size. Values in the same bucket are ties."""
+    n1, n2 = base.count, candidate.count
+    if not n1 or not n2:
+        return None, None
+    counts = {}
+    for index, count in base.counts.items():
+        counts[index] = [count, 0]
+    for index, count in candidate.counts.items():
+        counts.setdefault(index, [0, 0])[1] = count
+    seen, rank_sum, ties = 0, 0.0, 0.0
+    for index in sorted(counts):
+        a, b = counts[index]
+        t = a + b
+        rank_sum += b * (seen + (t + 1) / 2.0)
+        ties += t ** 3 - t
+        seen += t
+    u = rank_sum - n2 * (n2 + 1) / 2.0
+    n = n1 + n2
+    mean = n1 * n2 / 2.0
+    variance = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1))) if n > 1 else 0.0
+    if variance <= 0:
+        return 1.0, u / (n1 * n2)
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2)), u / (n1 * n2)
+
+
+def _quantile(values, counts, q):
+    rank = max(1, math.ceil(q / 100.0 * counts.sum()))
+    return values[min(int((counts.cumsum() >= rank).argmax()), len(values) - 1)]
+
+
+def bootstrap_ratio(base, candidate, q=95, resamples=1000, seed=0):
+    """Bootstrap of candidate/base at quantile q: (P-value of ratio <= 1, (2.5%, 97.5%) CI)."""
+    import numpy as np
+
+    if not base.count or not candidate.count:
+        return None, (None, None)
+    rng = np.random.default_rng(seed)
+    draws = []
+    for histogram in (base, candidate):
+        buckets = histogram.buckets()
+        values = np.array([max(value, 1) for value, _ in buckets], dtype=float)
+        weights = np.array([count for _, count in buckets], dtype=float)
+        samples = rng.multinomial(histogram.count, weights / weights.sum(), size=resamples)
+        draws.append(np.array([_quantile(values, s, q) for s in samples]))
+    ratios = draws[1] / draws[0]
+    return float((ratios <= 1.0).mean()), (float(np.percentile(ratios, 2.5)), float(np.percentile(ratios, 97.5)))
+
+
+def holm(p_values, alpha):
+    """Indexes significant under Holm-Bonferroni (family-wise error rate alpha)."""
+    ranked = sorted((p, i) for i, p in enumerate(p_values) if p is not None)
+    significant = set()
+    for k, (p, i) in enumerate(ranked):
+        if p >= alpha / (len(ranked) - k):
+            break
+        significant.add(i)
+    return significant
+
+
+def compare(base, candidate, test="mwu", q=95, alpha=0.01, min_change=0.05, error_margin=0.01):
+    """Per-endpoint comparison rows; "regressed" is set on real regressions.
+
+    P-values are Holm-corrected across endpoints, so comparing 50 endpoints does not
+    turn alpha into a false alarm on every other run."""
+    rows, tested = [], []
+    for name in sorted(set(base) | set(candidate)):
+        if name not in base or name not in candidate:
+            rows.append({"name": name, "verdict": "only in candidate" if name in candidate else "only in baseline"})
+            continue
+        (h1, e1), (h2, e2) = base[name], candidate[name]
+        row = {"name": name, "base_n": h1.count, "cand_n": h2.count,
+               "base_q_ms": h1.value_at(q) / 1000.0, "cand_q_ms": h2.value_at(q) / 1000.0,
+               "base_err": e1 / h1.count if h1.count else 0.0, "cand_err": e2 / h2.count if h2.count else 0.0}
+        row["change"] = row["cand_q_ms"] / row["base_q_ms"] - 1.0 if row["base_q_ms"] else None
+        if test == "bootstrap":
+            row["p_value"], (row["ci_low"], row["ci_high"]) = bootstrap_ratio(h1, h2, q)
+        else:
+            row["p_value"], row["effect"] = mann_whitney(h1, h2)
+        rows.append(row)
+        tested.append(row)
+    significant = holm([row["p_value"] for row in tested], alpha)
+    for i, row in enumerate(tested):
+        slower = i in significant and row["change"] is not None and row["change"] > min_change
+        if test == "bootstrap" and slower:
+            slower = row["ci_low"] > 1.0
+        more_errors = row["cand_err"] > row["base_err"] + error_margin
+        row["regressed"] = slower or more_errors
+        row["verdict"] = ("REGRESSION" + (" (errors)" if more_errors and not slower else "")
+                          if row["regressed"] else
+                          "faster" if row["change"] is not None and row["change"] < -min_change else "ok")
+    return rows
+
+
+RUN_COLUMNS = [
+    ("id", "Run"),
+    ("created_at", "Created (UTC)"),
+    ("tool", "Tool"),
+    ("label", "Label"),
+    ("git", "Git"),
+    ("base_url", "Base URL"),
+    ("duration_s", "Seconds", ".0f"),
+    ("endpoints", "Endpoints"),
+]
+
+
+def compare_columns(test, q):
+    columns = [
+        ("name", "Endpoint"),
+        ("base_n", "Base n", ","),
+        ("cand_n", "Cand n", ","),
+        ("base_q_ms", f"Base p{q:g} ms", ".1f"),
+        ("cand_q_ms", f"Cand p{q:g} ms", ".1f"),
+        ("change", "Change", "+.1%"),
+        ("p_value", "p", ".2g"),
+    ]
+    if test == "bootstrap":
+        columns += [("ci_low", "CI low", ".3f"), ("ci_high", "CI high", ".3f")]
+    else:
+        columns.append(("effect", "P(cand>base)", ".2f"))
+    return columns + [("cand_err", "Cand errors", ".1%"), ("verdict", "Verdict")]
+
+
+def _git(run):
+    return (run["git_sha"] or "?")[:10] + ("+dirty" if run["git_dirty"] else "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--store", default=os.environ.get("PERF_STORE", DEFAULT_STORE))
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="Recent runs")
+    listing.add_argument("--tool")
+    listing.add_argument("--label")
+    listing.add_argument("--limit", type=int, default=20)
+    show = commands.add_parser("show", help="Per-endpoint summary of one run")
+    show.add_argument("run", help="Run id or 'latest'")
+    diff = commands.add_parser("compare", help="Test a candidate run against a baseline")
+    diff.add_argument("baseline", help="Run id, 'latest' or 'last:N' (N runs before the candidate, merged)")
+    diff.add_argument("candidate", nargs="?", default="latest", help="Run id or 'latest' (default)")
+    diff.add_argument("--tool", help="With 'latest': only runs of this tool")
+    diff.add_argument("--label", help="With 'latest': only runs with this label")
+    diff.add_argument("--test", choices=["mwu", "bootstrap"], default="mwu")
+    diff.add_argument("--quantile", type=float, default=95.0, help="Latency quantile for the change check")
+    diff.add_argument("--alpha", type=float, default=0.01,
+                      help="Family-wise significance level across endpoints")
+    diff.add_argument("--min-change", type=float, default=0.05,
+                      help="Smallest quantile increase counted as a regression (0.05 = 5%%)")
+    diff.add_argument("--error-margin", type=float, default=0.01,
+                      help="Error-rate increase counted as a regression (0.01 = 1 point)")
+    diff.add_argument("--json", help="Write the comparison to this file")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.store):
+        print(f"No result store at {args.store}", file=sys.stderr)
+        return 2
+    store = ResultStore(args.store)
+    try:
+        return _command(store, args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+
+
+def _command(store, args):
+    if args.command == "list":
+        rows = store.runs(args.tool, args.label, args.limit)
+        for row in rows:
+            row["git"] = _git(row)
+            row["endpoints"] = store.db.execute("SELECT COUNT(*) FROM endpoints WHERE run_id = ?",
+                                                (row["id"],)).fetchone()[0]
+        print(format_table(rows, RUN_COLUMNS))
+        return 0
+    if args.command == "show":
+        run = store.resolve(args.run)
+        print(f"Run {run['id']}: {run['tool']} {run['label'] or ''} at {_git(run)}, {run['created_at']}")
+        rows = []
+        for name, (histogram, errors) in sorted(store.endpoints([run["id"]]).items()):
+            row = histogram.summary(run["duration_s"] or 0, errors)
+            row["name"] = name
+            rows.append(row)
+        print(format_table(rows, LATENCY_COLUMNS))
+        return 0
+    candidate = store.resolve(args.candidate, args.tool, args.label)
+    base_ids = store.baseline_ids(args.baseline, candidate)
+    rows = compare(store.endpoints(base_ids), store.endpoints([candidate["id"]]), args.test, args.quantile,
+                   args.alpha, args.min_change, args.error_margin)
+    print(f"Baseline runs {', '.join(map(str, base_ids))} vs candidate run {candidate['id']} "
+          f"({_git(candidate)}), {args.test}, alpha {args.alpha:g}, min change {args.min_change:.0%}")
+    print(format_table(rows, compare_columns(args.test, args.quantile)))
+    regressed = [r["name"] for r in rows if r.get("regressed")]
+    print(f"\n{len(regressed)} regressed endpoint(s)" + (": " + ", ".join(regressed) if regressed else ""))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"baseline": base_ids, "candidate": candidate["id"], "endpoints": rows}, f, indent=2)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Async load runner for the NPP Contract Management API Postman collection
+
+Logs in once through the collection's "Login" item, then replays the selected
+modules concurrently over a pooled keep-alive HTTP client and reports
+p50/p95/p99 latency and throughput per module and per endpoint.
+
+Usage:
+    python -m perf.runner --base-url http://localhost:5143/api --modules contracts lookup \
+        --concurrency 32 --duration 60
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+
+import aiohttp
+
+from perf.breakdown import Correlator
+from perf.collection import (
+    build_request, collection_variables, find_item, item_body, item_is_upload,
+    item_method, iter_items, load_collection,
+)
+from perf.histogram import Histogram
+from perf.plan import bearer_value, compile_plan
+from perf.results import add_store_arguments, save_from_args
+from perf.seed import SeededIds
+from perf.stats import LATENCY_COLUMNS, format_table, summarize
+
+# Items that would end or replace the runner's own session
+SESSION_ITEMS = {"Login", "Logout", "Refresh Token", "Change Password", "Reset Password"}
+
+
+def open_session(concurrency, timeout=30.0):
+    """Keep-alive client session with a connection pool sized to the concurrency."""
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency,
+                                     keepalive_timeout=60, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector,
+                                 timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, `burst` at once."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.perf_counter()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.perf_counter()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def login(session, collection, variables, user=None, password=None):
+    """Send the "Login" item and store the token like its Postman test script does."""
+    item = find_item(collection, "Login")
+    if item is None:
+        raise RuntimeError("Collection has no 'Login' item")
+    credentials = item_body(item)
+    if user:
+        credentials["userId"] = user
+    if password:
+        credentials["password"] = password
+    method, url, headers, _ = build_request(item, variables)
+    async with session.request(method, url, headers=headers,
+                               data=json.dumps(credentials).encode("utf-8")) as response:
+        if response.status != 200:
+            raise RuntimeError(f"Login failed: HTTP {response.status} {await response.text()}")
+        data = await response.json(content_type=None)
+    # pm.collectionVariables.set('token', jsonData.token)
+    variables["token"] = data["token"]
+    if data.get("refreshToken"):
+        variables["refreshToken"] = data["refreshToken"]
+    return data
+
+
+async def send(session, method, url, headers, data):
+    """Send one request and drain the body so the connection returns to the pool."""
+    async with session.request(method, url, headers=headers, data=data) as response:
+        await response.read()
+        return response.status
+
+
+def select_items(collection, modules=None, methods=("GET",), names=None):
+    """Pick (module, item) pairs to replay; uploads and session items are excluded."""
+    methods = {m.upper() for m in methods} if methods else None
+    selected = []
+    for module, item in iter_items(collection, modules):
+        if item["name"] in SESSION_ITEMS or item_is_upload(item):
+            continue
+        if methods and item_method(item) not in methods:
+            continue
+        if names and item["name"] not in names:
+            continue
+        selected.append((module, item))
+    return selected
+
+
+class Recorder:
+    """Collects latencies per (module, endpoint)."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, module, name, latency, status):
+        key = (module, name)
+        self.latencies.setdefault(key, []).append(latency)
+        self.statuses.setdefault(key, {})
+        self.statuses[key][status] = self.statuses[key].get(status, 0) + 1
+        if status == 0 or status >= 400:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def by_endpoint(self):
+        rows = []
+        for (module, name), values in sorted(self.latencies.items()):
+            row = summarize(values, self.elapsed, self.errors.get((module, name), 0))
+            row.update(name=f"{module} / {name}", module=module, endpoint=name,
+                       statuses={str(k): v for k, v in sorted(self.statuses[(module, name)].items())})
+            rows.append(row)
+        return rows
+
+    def histograms(self):
+        """{"module / endpoint": (Histogram, errors)} for perf.results."""
+        out = {}
+        for (module, name), values in self.latencies.items():
+            histogram = Histogram()
+            for value in values:
+                histogram.record_seconds(value)
+            out[f"{module} / {name}"] = (histogram, self.errors.get((module, name), 0))
+        return out
+
+    def by_module(self):
+        grouped = {}
+        errors = {}
+        for (module, name), values in self.latencies.items():
+            grouped.setdefault(module, []).extend(values)
+            errors[module] = errors.get(module, 0) + self.errors.get((module, name), 0)
+        rows = []
+        for module, values in sorted(grouped.items()):
+            row = summarize(values, self.elapsed, errors[module])
+            row["name"] = module
+            rows.append(row)
+        return rows
+
+
+async def _worker(session, queue, variables, recorder, deadline, budget, correlator=None):
+    token, bearer = None, ""
+    while time.perf_counter() < deadline and budget[0] != 0:
+        budget[0] -= 1
+        request = next(queue)
+        if variables.get("token") is not token:
+            token = variables.get("token")
+            bearer = bearer_value(token)
+        url, headers = request.url, request.request_headers(bearer)
+        if correlator is not None:
+            correlation_id, url, headers = correlator.tag(url, headers)
+        start = time.perf_counter()
+        try:
+            status = await send(session, request.method, url, headers, request.body)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 0
+        latency = time.perf_counter() - start
+        recorder.record(request.module, request.name, latency, status)
+        if correlator is not None:
+            correlator.record(correlation_id, request.module, request.name, request.method, latency, status)
+
+
+async def run_load(items, variables, concurrency=16, duration=30.0, requests=None,
+                   session=None, collection=None, user=None, password=None, ids=None,
+                   correlator=None, recorder=None):
+    """Replay items round-robin with `concurrency` workers; returns the Recorder.
+
+    Items are compiled into a request plan first, so the send loop only patches
+    in the bearer token. With `ids` (perf.seed.SeededIds) path ids and *Id body
+    fields are spread over the seeded rows. A perf.breakdown.Correlator tags
+    each request and keeps its client timing. `recorder` replaces the default
+    Recorder; anything with record(module, name, latency, status) and stop() works.
+    """
+    own_session = session is None
+    session = session or open_session(concurrency)
+    try:
+        if collection is not None and not variables.get("token"):
+            await login(session, collection, variables, user, password)
+        queue = itertools.cycle(compile_plan(items, variables, ids))
+        budget = [requests if requests else -1]
+        recorder = recorder or Recorder()
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_worker(session, queue, variables, recorder, deadline, budget, correlator)
+                               for _ in range(concurrency)))
+        recorder.stop()
+        return recorder
+    finally:
+        if own_session:
+            await session.close()
+
+
+def print_report(recorder):
+    print(f"\nDuration: {recorder.elapsed:.1f}s\n")
+    print("Per module")
+    print(format_table(recorder.by_module(), LATENCY_COLUMNS))
+    print("\nPer endpoint")
+    print(format_table(recorder.by_endpoint(), LATENCY_COLUMNS))
+
+
+def add_common_arguments(parser):
+    """Connection and login options shared by the perf command-line tools."""
+    parser.add_argument("--base-url", help="Override {{baseUrl}} (e.g. http://localhost:5143/api)")
+    parser.add_argument("--collection", help="Read a collection JSON export instead of the generator")
+    parser.add_argument("--scan-controllers", action="store_true",
+                        help="Use the endpoint registry generated from the API controllers")
+    parser.add_argument("--user", help="Login userId (default: the Login item's sample)")
+    parser.add_argument("--password", help="Login password (default: the Login item's sample)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--modules", nargs="*", help="Module numbers or names to replay (default: all)")
+    parser.add_argument("--methods", nargs="*", default=["GET"],
+                        help="HTTP verbs to include (default: GET only, writes are opt-in)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--json", help="Write the per-module/per-endpoint summary to this file")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: replace hardcoded ids")
+    parser.add_argument("--correlate", metavar="FILE",
+                        help="Tag requests with a correlation id and write client timings for perf.breakdown")
+    add_store_arguments(parser)
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    items = select_items(collection, args.modules, args.methods)
+    if not items:
+        print("No items match the selected modules/methods", file=sys.stderr)
+        return 2
+
+    print(f"Replaying {len(items)} endpoints against {variables['baseUrl']} "
+          f"with {args.concurrency} workers")
+
+    correlator = Correlator() if args.correlate else None
+
+    async def run():
+        async with open_session(args.concurrency, args.timeout) as session:
+            return await run_load(items, variables, args.concurrency, args.duration, args.requests,
+                                  session=session, collection=collection,
+                                  user=args.user, password=args.password,
+                                  ids=SeededIds.load(args.seed_ids) if args.seed_ids else None,
+                                  correlator=correlator)
+
+    recorder = asyncio.run(run())
+    print_report(recorder)
+    if correlator is not None:
+        correlator.write(args.correlate)
+        print(f"\nWrote {len(correlator.rows):,} request timings to {args.correlate}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"duration_s": recorder.elapsed, "modules": recorder.by_module(),
+                       "endpoints": recorder.by_endpoint()}, f, indent=2)
+    save_from_args(args, "runner", recorder.histograms(), recorder.elapsed, variables["baseUrl"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
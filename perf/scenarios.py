@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware CRUD scenario chains derived from the collection
+
+Nearly every collection item targets /.../1, so concurrent workers replaying
+the writes all hit the same row and the Delete items remove fixtures the
+other workers rely on. This tool turns the module dicts into chains that own
+their rows instead:
+
+    Create Manufacturer -> Create Product -> Create Contract -> Get Contract
+    -> Create New Version -> Update Version -> Add Product to Contract -> ...
+    -> Update Contract -> Delete Version -> Delete Contract -> Delete Product
+    -> Delete Manufacturer
+
+A resource with a POST at /x and items at /x/1 gets a chain. Its steps are
+the items of /x/1 and of the sub-resources created under it; the resources
+its create bodies reference through *Id fields (manufacturerId, contractId)
+are created first and deleted last. Each run captures the ids from the
+create responses (id, <resource>Id, data.id or a Location header), sends
+every later step to those ids, and gives unique-looking fields
+(contractNumber, productCode, email, ...) a per-run suffix. Chains therefore
+run in isolation, and thousands can run in parallel without interfering.
+If a create fails, the rest of that run is skipped and only the deletes of
+rows it already created are sent.
+
+Usage:
+    python -m perf.scenarios --list
+    python -m perf.scenarios --base-url http://localhost:5143/api --chains contracts contract-prices \
+        --concurrency 200 --duration 120
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode
+
+import aiohttp
+
+from perf.collection import (
+    build_request, collection_variables, item_is_upload, item_method, item_path, iter_items,
+    load_collection, module_matches,
+)
+from perf.runner import SESSION_ITEMS, Recorder, add_common_arguments, login, open_session
+from perf.seed import SeededIds
+from perf.stats import LATENCY_COLUMNS, format_table, summarize
+
+# Fields that are unique in the schema (contract numbers, product codes, user ids, ...)
+_UNIQUE_FIELD = re.compile(r"(?i)(number|code|email|userid)$|^name$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def _segments(path):
+    return path.split("?", 1)[0].strip("/").split("/")
+
+
+def path_template(path):
+    """'/contracts/1/versions/1' -> '/contracts/{id}/versions/{id}'"""
+    return "/" + "/".join("{id}" if s.isdigit() else s for s in _segments(path))
+
+
+def resource_key(path):
+    """The capture key of the resource a path names: '/contracts/1/versions' -> 'contracts/versions'."""
+    return "/".join(s for s in _segments(path) if not s.isdigit())
+
+
+def id_keys(path):
+    """[(segment index, capture key)] for the numeric segments of a sample path."""
+    keys, names = [], []
+    for index, segment in enumerate(_segments(path)):
+        if segment.isdigit():
+            keys.append((index, "/".join(names)))
+        else:
+            names.append(segment)
+    return keys
+
+
+def _stem(name):
+    name = name.replace("-", "").replace("_", "").lower()
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    return name[:-1] if name.endswith("s") else name
+
+
+def _field_stem(field):
+    if field.endswith("Ids"):
+        return _stem(field[:-3])
+    return _stem(field[:-2]) if field.endswith("Id") else None
+
+
+def _body(item):
+    body = item["request"].get("body")
+    if not body or body.get("mode") != "raw":
+        return None
+    try:
+        return json.loads(body["raw"])
+    except ValueError:
+        return None
+
+
+def _id_fields(value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if _field_stem(key):
+                yield key
+            yield from _id_fields(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _id_fields(item)
+
+
+class Step:
+    """One item of a chain. role is "create" (captures `key`), "delete" (of `key`) or "step"."""
+
+    __slots__ = ("module", "item", "name", "method", "path", "role", "key", "ids", "body")
+
+    def __init__(self, module, item, role="step", key=None):
+        self.module = module
+        self.item = item
+        self.name = item["name"]
+        self.method = item_method(item)
+        self.path = item_path(item)
+        self.role = role
+        self.key = key
+        self.ids = id_keys(self.path)
+        self.body = _body(item)
+
+    def __repr__(self):
+        return f"<Step {self.role} {self.method} {path_template(self.path)}>"
+
+    @property
+    def is_write(self):
+        return self.method != "GET"
+
+    def resolve_path(self, captured):
+        """Path with every id segment replaced by a captured id, or None if one is missing."""
+        path, _, query = self.path.partition("?")
+        segments = _segments(path)
+        for index, key in self.ids:
+            if key not in captured:
+                return None
+            segments[index] = str(captured[key])
+        path = "/" + "/".join(segments)
+        if query:
+            params = [(k, _captured_for(k, captured) or v) for k, v in parse_qsl(query)]
+            path += "?" + urlencode(params)
+        return path
+
+    def resolve_body(self, captured, tag, ids=None, rng=None):
+        if self.body is None:
+            return None
+        body = ids.rewrite_body(self.body, rng) if ids is not None else self.body
+        return _fill(body, captured, tag if self.is_write else None)
+
+
+def _captured_for(field, captured):
+    """The captured id a *Id field refers to; root resources win over nested ones."""
+    stem = _field_stem(field)
+    if not stem:
+        return None
+    matches = [k for k in captured if _stem(k.rsplit("/", 1)[-1]) == stem]
+    return captured[min(matches, key=lambda k: k.count("/"))] if matches else None
+
+
+def _fill(value, captured, tag):
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            new_id = _captured_for(key, captured)
+            if new_id is not None and isinstance(item, int) and not isinstance(item, bool):
+                out[key] = new_id
+            elif new_id is not None and isinstance(item, list):
+                out[key] = [new_id] + item[1:]
+            elif tag and isinstance(item, str) and _UNIQUE_FIELD.search(key) and not _DATE.match(item):
+                local, at, domain = item.partition("@")
+                out[key] = f"{local}+{tag}@{domain}" if at else f"{item}-{tag}"
+            else:
+                out[key] = _fill(item, captured, tag)
+        return out
+    if isinstance(value, list):
+        return [_fill(item, captured, tag) for item in value]
+    return value
+
+
+class Chain:
+    def __init__(self, name, module, steps):
+        self.name = name
+        self.module = module
+        self.steps = steps
+
+    def __repr__(self):
+        return f"<Chain {self.name} ({len(self.steps)} steps)>"
+
+
+def _entries(collection):
+    entries = []
+    for module, item in iter_items(collection):
+        if item["name"] in SESSION_ITEMS or item_is_upload(item):
+            continue
+        entries.append((module, item, item_method(item), item_path(item)))
+    return entries
+
+
+def derive_chains(collection):
+    """One Chain per creatable resource, in collection order."""
+    entries = _entries(collection)
+    templates = {}
+    for module, item, method, path in entries:
+        templates.setdefault(path_template(path), []).append((module, item, method))
+    creates = {}
+    for module, item, method, path in entries:
+        if method == "POST" and _body(item) is not None and path_template(path) + "/{id}" in templates:
+            creates.setdefault(resource_key(path), (module, item))
+    roots = [key for key, (_, item) in creates.items() if not id_keys(item_path(item))]
+    by_stem = {}
+    for key in roots:
+        by_stem.setdefault(_stem(key.rsplit("/", 1)[-1]), key)
+    return [_chain(key, creates, templates, by_stem) for key in roots]
+
+
+def _single(templates, template, method):
+    return next(((m, i) for m, i, verb in templates.get(template, []) if verb == method), None)
+
+
+def _dependencies(key, creates, by_stem, seen):
+    """Root resources the create bodies of `key` reference, dependencies first."""
+    order = []
+    for sub_key, (_, item) in creates.items():
+        if sub_key != key and not sub_key.startswith(key + "/"):
+            continue
+        for field in _id_fields(_body(item)):
+            dependency = by_stem.get(_field_stem(field))
+            if dependency and dependency != key and dependency not in seen:
+                seen.add(dependency)
+                order += _dependencies(dependency, creates, by_stem, seen) + [dependency]
+    return order
+
+
+def _chain(key, creates, templates, by_stem):
+    module, create = creates[key]
+    base = path_template(item_path(create)) + "/{id}"
+    head = [Step(module, create, "create", key)]
+    middle, tail = [], []
+    used = {id(create)}
+
+    def take(template, method, role="step", step_key=None):
+        found = _single(templates, template, method)
+        if found and id(found[1]) not in used:
+            used.add(id(found[1]))
+            return Step(found[0], found[1], role, step_key)
+        return None
+
+    head += filter(None, [take(base, "GET")])
+    # Flat resources filtered by a parent id (?contractId=1) list right after the create
+    for found_module, item, method in templates.get(base[:-len("/{id}")], []):
+        query = parse_qsl(item_path(item).partition("?")[2])
+        if method == "GET" and id(item) not in used and any(_field_stem(k) for k, _ in query):
+            used.add(id(item))
+            head.append(Step(found_module, item))
+    for sub_key, (sub_module, sub_create) in creates.items():
+        sub_base = path_template(item_path(sub_create))
+        if not sub_key.startswith(key + "/") or sub_base.rsplit("/", 1)[0] != base:
+            continue
+        used.add(id(sub_create))
+        middle.append(Step(sub_module, sub_create, "create", sub_key))
+        middle += filter(None, [take(sub_base, "GET"), take(sub_base + "/{id}", "GET"),
+                                take(sub_base + "/{id}", "PUT")])
+        tail += filter(None, [take(sub_base + "/{id}", "DELETE", "delete", sub_key)])
+    # Remaining reads and actions on the new row (/contracts/1/assignments, /contracts/1/activate)
+    for template, found in templates.items():
+        if not template.startswith(base + "/") or template.count("{id}") != base.count("{id}"):
+            continue
+        for found_module, item, method in found:
+            if method in ("GET", "PUT") and id(item) not in used:
+                used.add(id(item))
+                middle.append(Step(found_module, item))
+    middle += filter(None, [take(base, "PUT"), take(base, "PATCH")])
+    tail += filter(None, [take(base, "DELETE", "delete", key)])
+
+    before, after = [], []
+    for dependency in _dependencies(key, creates, by_stem, {key}):
+        dep_module, dep_create = creates[dependency]
+        before.append(Step(dep_module, dep_create, "create", dependency))
+        dep_delete = _single(templates, path_template(item_path(dep_create)) + "/{id}", "DELETE")
+        if dep_delete:
+            after.insert(0, Step(dep_delete[0], dep_delete[1], "delete", dependency))
+    return Chain(key, module, before + head + middle + tail + after)
+
+
+def extract_id(payload, key, location=None):
+    """The new row's id from a create response body or Location header."""
+    if location:
+        last = location.rstrip("/").rsplit("/", 1)[-1]
+        if last.isdigit():
+            return int(last)
+    stem = _stem(key.rsplit("/", 1)[-1])
+    candidates = [payload, payload.get("data") if isinstance(payload, dict) else None]
+    for value in candidates:
+        if not isinstance(value, dict):
+            continue
+        for field, item in value.items():
+            if field.lower() in ("id", stem + "id") and isinstance(item, int) and not isinstance(item, bool):
+                return item
+    return None
+
+
+class ChainStats:
+    """Per-chain run counts and end-to-end durations."""
+
+    def __init__(self):
+        self.durations = {}
+        self.completed = {}
+        self.aborted = {}
+        self.step_errors = {}
+        self.writes = 0
+        self.leaked = 0
+
+    def record(self, chain, duration, aborted_at, errors):
+        self.durations.setdefault(chain, []).append(duration)
+        if aborted_at:
+            counts = self.aborted.setdefault(chain, {})
+            counts[aborted_at] = counts.get(aborted_at, 0) + 1
+        elif not errors:
+            self.completed[chain] = self.completed.get(chain, 0) + 1
+        self.step_errors[chain] = self.step_errors.get(chain, 0) + errors
+
+    def rows(self, elapsed):
+        rows = []
+        for chain, durations in sorted(self.durations.items()):
+            aborted = self.aborted.get(chain, {})
+            row = summarize(durations, elapsed, sum(aborted.values()))
+            row.update(name=chain, completed=self.completed.get(chain, 0),
+                       step_errors=self.step_errors.get(chain, 0),
+                       aborted_at=max(aborted, key=aborted.get) if aborted else "")
+            rows.append(row)
+        return rows
+
+
+CHAIN_COLUMNS = [
+    ("name", "Chain"),
+    ("count", "Runs"),
+    ("completed", "Clean"),
+    ("errors", "Aborted"),
+    ("step_errors", "Step errors"),
+    ("rps", "Chains/s", ".2f"),
+    ("p50_ms", "p50 ms", ".1f"),
+    ("p95_ms", "p95 ms", ".1f"),
+    ("aborted_at", "Most aborts at"),
+]
+
+
+async def run_chain(session, chain, variables, recorder, stats, tag, ids=None, rng=None):
+    """Run one chain with its own captured ids; returns the number of failed steps."""
+    captured, aborted_at, errors = {}, None, 0
+    base_url = variables["baseUrl"]
+    start = time.perf_counter()
+    for step in chain.steps:
+        if aborted_at and step.role != "delete":
+            continue
+        if step.role == "delete" and step.key not in captured:
+            continue
+        path = step.resolve_path(captured)
+        if path is None:
+            continue
+        method, _, headers, _ = build_request(step.item, variables)
+        body = step.resolve_body(captured, tag, ids, rng)
+        data = json.dumps(body, separators=(",", ":")).encode("utf-8") if body is not None else None
+        sent = time.perf_counter()
+        payload, location = None, None
+        try:
+            async with session.request(method, base_url + path, headers=headers, data=data) as response:
+                status = response.status
+                raw = await response.read()
+                if step.role == "create" and 200 <= status < 300:
+                    location = response.headers.get("Location")
+                    payload = json.loads(raw) if raw else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            status = 0
+        recorder.record(chain.name, step.name, time.perf_counter() - sent, status)
+        ok = 200 <= status < 300
+        if ok and step.is_write:
+            stats.writes += 1
+        if step.role == "create":
+            new_id = extract_id(payload, step.key, location) if ok else None
+            if new_id is None:
+                aborted_at = step.name
+                if ok:
+                    stats.leaked += 1  # created, but the response carried no id to delete it by
+                continue
+            captured[step.key] = new_id
+        elif not ok:
+            errors += 1
+    stats.record(chain.name, time.perf_counter() - start, aborted_at, errors)
+    return errors
+
+
+async def run_chains(session, chains, variables, concurrency=50, duration=60.0, runs=None,
+                     ids=None, seed=None):
+    """Run chains round-robin with `concurrency` workers; returns (Recorder, ChainStats)."""
+    queue = itertools.cycle(chains)
+    recorder, stats = Recorder(), ChainStats()
+    budget = [runs if runs else -1]
+    deadline = time.perf_counter() + duration
+    prefix = f"{int(time.time()) % 1000000:06d}"
+
+    async def worker(number):
+        rng = random.Random(f"{seed}:{number}")
+        for run in itertools.count():
+            if time.perf_counter() >= deadline or budget[0] == 0:
+                return
+            budget[0] -= 1
+            await run_chain(session, next(queue), variables, recorder, stats,
+                            f"{prefix}w{number}r{run}", ids, rng)
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    recorder.stop()
+    return recorder, stats
+
+
+def select_chains(chains, names=None, modules=None):
+    selected = []
+    for chain in chains:
+        if names and not any(n.lower() in chain.name.lower() for n in names):
+            continue
+        if modules and not module_matches(chain.module, modules):
+            continue
+        selected.append(chain)
+    return selected
+
+
+def print_chains(chains):
+    roles = {"create": "+", "delete": "-", "step": " "}
+    for chain in chains:
+        print(f"{chain.name} ({chain.module}, {len(chain.steps)} steps)")
+        for step in chain.steps:
+            print(f"  {roles[step.role]} {step.method:6} {path_template(step.path):45} {step.name}")
+
+
+def print_report(recorder, stats):
+    elapsed = recorder.elapsed
+    print(f"\nDuration: {elapsed:.1f}s, successful writes: {stats.writes} ({stats.writes / elapsed:.1f}/s)")
+    if stats.leaked:
+        print(f"{stats.leaked} rows were created but their id could not be read; they were not deleted")
+    print("\nPer chain (end-to-end)")
+    print(format_table(stats.rows(elapsed), CHAIN_COLUMNS))
+    print("\nPer step")
+    print(format_table(recorder.by_endpoint(), LATENCY_COLUMNS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--chains", nargs="*", help="Chain names (substring match, default: all)")
+    parser.add_argument("--modules", nargs="*", help="Only chains whose create item is in these modules")
+    parser.add_argument("--concurrency", type=int, default=50, help="Chains in flight")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run")
+    parser.add_argument("--runs", type=int, help="Stop after this many chain runs")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed for the ids chains do not create")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--list", action="store_true", help="Print the derived chains and exit")
+    parser.add_argument("--json", help="Write per-chain and per-step summaries to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    chains = select_chains(derive_chains(collection), args.chains, args.modules)
+    if not chains:
+        print("No chains match the selection", file=sys.stderr)
+        return 2
+    if args.list:
+        print_chains(chains)
+        return 0
+    variables = collection_variables(collection, args.base_url)
+    ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+    print(f"Running {len(chains)} chains against {variables['baseUrl']} with {args.concurrency} in flight")
+
+    async def run():
+        async with open_session(args.concurrency, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            return await run_chains(session, chains, variables, args.concurrency, args.duration,
+                                    args.runs, ids, args.seed)
+
+    recorder, stats = asyncio.run(run())
+    print_report(recorder, stats)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"duration_s": recorder.elapsed, "writes": stats.writes,
+                       "chains": stats.rows(recorder.elapsed), "steps": recorder.by_endpoint()}, f, indent=2)
+    return 0 if not stats.aborted else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Final table schema replayed from the EF Core migration script (migrations.sql)
+
+The script is a sequence of guarded migration procedures. replay_schema()
+applies their CREATE TABLE / ALTER TABLE / CREATE UNIQUE INDEX / DROP TABLE
+statements in order and returns the tables as they exist after the last
+migration, plus the ids of the rows the migrations themselves insert
+(lookup and sample data).
+"""
+
+import os
+import re
+
+from perf.collection import REPO_ROOT
+
+MIGRATIONS_FILE = os.path.join(REPO_ROOT, "migrations.sql")
+
+_STATEMENT = re.compile(r"(?m)^[ \t]*(CREATE TABLE|ALTER TABLE|CREATE UNIQUE INDEX|DROP TABLE|INSERT INTO)\b")
+_NAME = r"`([^`]+)`"
+_CREATE = re.compile(r"CREATE TABLE (?:IF NOT EXISTS )?" + _NAME + r"\s*\((.*)\)[^)]*$", re.S)
+_COLUMN = re.compile(_NAME + r"\s+([a-z]+(?:\([\d, ]+\))?)(.*)$", re.S | re.I)
+_PRIMARY = re.compile(r"PRIMARY KEY \(([^)]*)\)", re.I)
+_FOREIGN = re.compile(r"CONSTRAINT " + _NAME + r" FOREIGN KEY \(([^)]*)\) REFERENCES " + _NAME
+                      + r" \(([^)]*)\)", re.I)
+_ALTER = re.compile(r"ALTER TABLE " + _NAME + r"\s+(.*)$", re.S)
+_UNIQUE = re.compile(r"CREATE UNIQUE INDEX " + _NAME + r" ON " + _NAME + r" \(([^)]*)\)", re.I)
+# Raw-SQL migrations insert lookup rows without backticks
+_INSERT = re.compile(r"INSERT INTO `?(\w+)`?\s*\(([^)]*)\)\s*VALUES\s*(.*)$", re.S)
+_ROW_ID = re.compile(r"(?:^|\),)\s*\((\d+)\s*,")
+_NAMES = re.compile(_NAME)
+
+
+class Column:
+    __slots__ = ("name", "type", "nullable", "auto_increment", "default")
+
+    def __init__(self, name, type_, rest):
+        self.name = name
+        self.type = type_.lower()
+        self.nullable = "NOT NULL" not in rest.upper()
+        self.auto_increment = "AUTO_INCREMENT" in rest.upper()
+        default = re.search(r"DEFAULT (\S+)", rest)
+        self.default = default.group(1) if default else None
+
+    @property
+    def length(self):
+        match = re.search(r"\((\d+)", self.type)
+        return int(match.group(1)) if match else None
+
+    def __repr__(self):
+        return f"<Column {self.name} {self.type}{'' if self.nullable else ' NOT NULL'}>"
+
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}
+        self.primary_key = []
+        self.foreign_keys = {}
+        self.unique = {}
+        self.seeded_ids = []
+
+    def references(self):
+        """{column: referenced table} for single-column foreign keys."""
+        return {cols[0]: ref for cols, ref, _ in self.foreign_keys.values() if len(cols) == 1}
+
+    def __repr__(self):
+        return f"<Table {self.name} ({len(self.columns)} columns)>"
+
+
+def _names(text):
+    return _NAMES.findall(text)
+
+
+def _split_top_level(text):
+    parts, depth, current, quote = [], 0, [], None
+    for char in text:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current).strip())
+    return parts
+
+
+def iter_statements(text):
+    """Yield the schema-relevant statements of a migration script, in order."""
+    starts = [m.start(1) for m in _STATEMENT.finditer(text)]
+    for start in starts:
+        # Statements end at the first ';' outside quotes
+        quote = None
+        for index in range(start, len(text)):
+            char = text[index]
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char == "'":
+                quote = char
+            elif char == ";":
+                yield text[start:index].strip()
+                break
+
+
+def _create(tables, statement):
+    match = _CREATE.match(statement)
+    if not match:
+        return
+    table = tables[match.group(1)] = Table(match.group(1))
+    for part in _split_top_level(match.group(2)):
+        _table_element(table, part)
+
+
+def _table_element(table, part):
+    foreign = _FOREIGN.search(part)
+    if foreign:
+        table.foreign_keys[foreign.group(1)] = (_names(foreign.group(2)), foreign.group(3),
+                                                _names(foreign.group(4)))
+        return
+    primary = _PRIMARY.search(part)
+    if primary and (part.upper().startswith("CONSTRAINT") or part.upper().startswith("PRIMARY")):
+        table.primary_key = _names(primary.group(1))
+        return
+    column = _COLUMN.match(part)
+    if column:
+        table.columns[column.group(1)] = Column(column.group(1), column.group(2), column.group(3))
+
+
+def _alter(tables, statement):
+    match = _ALTER.match(statement)
+    if not match or match.group(1) not in tables:
+        return
+    name, clause = match.group(1), match.group(2).strip()
+    table = tables[name]
+    upper = clause.upper()
+    if upper.startswith("ADD CONSTRAINT") or upper.startswith("ADD PRIMARY KEY"):
+        _table_element(table, clause[4:])
+    elif upper.startswith("ADD "):
+        _table_element(table, clause[4:].replace("COLUMN ", "", 1) if upper.startswith("ADD COLUMN")
+                       else clause[4:])
+    elif upper.startswith("DROP FOREIGN KEY"):
+        table.foreign_keys.pop(_names(clause)[0], None)
+    elif upper.startswith("DROP PRIMARY KEY"):
+        table.primary_key = []
+    elif upper.startswith("DROP INDEX"):
+        table.unique.pop(_names(clause)[0], None)
+    elif upper.startswith("DROP COLUMN") or upper.startswith("DROP `"):
+        column = _names(clause)[0]
+        table.columns.pop(column, None)
+        table.foreign_keys = {k: v for k, v in table.foreign_keys.items() if column not in v[0]}
+        table.unique = {k: v for k, v in table.unique.items() if column not in v}
+    elif upper.startswith("RENAME COLUMN"):
+        old, new = _names(clause)[:2]
+        table.columns = {new if k == old else k: v for k, v in table.columns.items()}
+        table.columns[new].name = new
+        table.foreign_keys = {k: ([new if c == old else c for c in cols], ref, refcols)
+                              for k, (cols, ref, refcols) in table.foreign_keys.items()}
+        table.unique = {k: [new if c == old else c for c in cols] for k, cols in table.unique.items()}
+    elif upper.startswith("RENAME INDEX"):
+        old, new = _names(clause)[:2]
+        if old in table.unique:
+            table.unique[new] = table.unique.pop(old)
+    elif upper.startswith("RENAME"):
+        new = _names(clause)[0]
+        table.name = new
+        tables[new] = tables.pop(name)
+        for other in tables.values():
+            other.foreign_keys = {k: (cols, new if ref == name else ref, refcols)
+                                  for k, (cols, ref, refcols) in other.foreign_keys.items()}
+    elif upper.startswith("MODIFY COLUMN"):
+        _table_element(table, clause.split(None, 2)[2])
+
+
+def replay_schema(path=MIGRATIONS_FILE):
+    """{table name: Table} after applying every migration in the script."""
+    with open(path, encoding="utf-8-sig") as f:
+        text = f.read()
+    tables = {}
+    for statement in iter_statements(text):
+        if statement.startswith("CREATE TABLE"):
+            _create(tables, statement)
+        elif statement.startswith("ALTER TABLE"):
+            _alter(tables, statement)
+        elif statement.startswith("CREATE UNIQUE INDEX"):
+            match = _UNIQUE.match(statement)
+            if match and match.group(2) in tables:
+                tables[match.group(2)].unique[match.group(1)] = _names(match.group(3))
+        elif statement.startswith("DROP TABLE"):
+            for name in _names(statement):
+                tables.pop(name, None)
+        elif statement.startswith("INSERT INTO"):
+            match = _INSERT.match(statement)
+            if match and match.group(1) in tables and match.group(2).split(",")[0].strip(" `") == "Id":
+                tables[match.group(1)].seeded_ids.extend(int(i) for i in _ROW_ID.findall(match.group(3)))
+    tables.pop("__EFMigrationsHistory", None)
+    return tables
+
+
+def dependency_order(tables):
+    """Table names ordered so that every table comes after the tables it references."""
+    order, state = [], {}
+
+    def visit(name):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":  # cycle: break it here, the FK column must be nullable
+            return
+        state[name] = "visiting"
+        for cols, ref, _ in tables[name].foreign_keys.values():
+            if ref in tables and ref != name:
+                visit(ref)
+        state[name] = "done"
+        order.append(name)
+
+    for name in sorted(tables):
+        visit(name)
+    return order
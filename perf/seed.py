@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Production-scale data seeder for the schema in migrations.sql
+
+Replays migrations.sql to get the final tables (perf.schema), then generates
+referentially consistent rows for them at a chosen scale and writes them as
+MySQL LOAD DATA files (tab-separated) or multi-row INSERT scripts, in chunks
+written by parallel worker processes. Every foreign key points at a row that
+the migrations insert or that the seeder generates; child rows are grouped
+under their parent (all of a contract's prices are contiguous) and
+composite unique indexes such as (ContractId, ProductId) stay unique.
+
+Generated ids start above --id-base so they never collide with rows created
+by hand. seed_ids.json records the id range of every table; pass it to the
+load tools with --seed-ids and the collection's hardcoded /1 paths and *Id
+body fields are filled with seeded ids instead.
+
+At --scale 1 the dataset has 1,000,000 ContractPrices rows and ~3.7M rows in
+total; see DEFAULT_ROWS.
+
+Usage:
+    python -m perf.seed --scale 0.01 --list
+    python -m perf.seed --scale 1 --output seed-data --workers 8
+    mysql --local-infile=1 -u root -p NPPContractManagment < seed-data/load.sql
+    python -m perf.runner --base-url http://localhost:5143/api --seed-ids seed-data/seed_ids.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from perf.schema import MIGRATIONS_FILE, dependency_order, replay_schema
+
+# Rows per table at --scale 1. Tables not listed only keep the migrations' own rows.
+DEFAULT_ROWS = {
+    "Manufacturers": 500,
+    "Distributors": 50,
+    "OpCos": 1000,
+    "MemberAccounts": 10000,
+    "CustomerAccounts": 50000,
+    "Products": 100000,
+    "DistributorProductCodes": 200000,
+    "Users": 1000,
+    "UserRoles": 1000,
+    "UserManufacturers": 2000,
+    "Contracts": 20000,
+    "ContractVersions": 60000,
+    "ContractManufacturers": 20000,
+    "ContractDistributors": 40000,
+    "ContractIndustries": 20000,
+    "ContractOpCos": 100000,
+    "ContractManufacturersVersion": 60000,
+    "ContractDistributorsVersion": 120000,
+    "ContractIndustriesVersion": 60000,
+    "ContractOpCosVersion": 300000,
+    "ContractProducts": 300000,
+    "ContractVersionProduct": 300000,
+    "ContractPrices": 1000000,
+    "ContractVersionPrice": 300000,
+    "Proposals": 20000,
+    "ProposalProducts": 400000,
+    "ProposalDistributors": 40000,
+    "ProposalIndustries": 20000,
+    "ProposalOpCos": 60000,
+    "ProposalStatusHistory": 60000,
+}
+CHUNK_ROWS = 200000
+INSERT_BATCH = 1000
+NULL = "\\N"
+# Spread secondary foreign keys so (parent, other) pairs stay distinct within a parent
+_STRIDE = 7919
+# BCrypt hash of "Admin@123", the admin password shipped in Database/InsertAdminUser.sql
+PASSWORD_HASH = "$2a$12$A2njs.w2dAu/Lamur/KBFuRb71mU/a0qHMIJOxOLJ1LZw..1SyMqG"
+SEEDED_PASSWORD = "Admin@123"
+_DATES = [(datetime.date(2023, 1, 1) + datetime.timedelta(days=d)).isoformat() + " 00:00:00"
+          for d in range(1500)]
+_ALWAYS_NULL = re.compile(r"^(Modified|Deleted|Suspended|LastLogin|Assigned)")
+_TRUE_FLAGS = {"IsActive", "EmailConfirmed", "BillbacksAllowed", "W9"}
+_QUOTED = ("char", "varchar", "text", "longtext", "mediumtext", "datetime", "date", "timestamp", "time")
+
+
+def _id_at(parent, index):
+    seeded, first_id = parent["seeded"], parent["first_id"]
+    return seeded[index] if index < len(seeded) else first_id + index - len(seeded)
+
+
+def plan_tables(tables, scale=1.0, overrides=None, id_base=1000000):
+    """Per-table generation plans, in dependency order."""
+    overrides = overrides or {}
+    plans = {}
+    for name in dependency_order(tables):
+        table = tables[name]
+        rows = overrides.get(name, int(round(DEFAULT_ROWS.get(name, 0) * scale)))
+        references = {c: r for c, r in table.references().items() if c in table.columns}
+        # The parent a row belongs to: the referenced table its name starts with, else the first NOT NULL FK
+        primary = max((c for c, r in references.items() if name.startswith(r.rstrip("s"))),
+                      key=lambda c: len(references[c]), default=None)
+        if primary is None:
+            primary = next((c for c, r in references.items()
+                            if not table.columns[c].nullable and r != name), None)
+        plans[name] = {
+            "name": name,
+            "rows": rows,
+            "seeded": sorted(table.seeded_ids),
+            "first_id": id_base + 1,
+            "columns": [(c.name, c.type, c.nullable, c.length) for c in table.columns.values()],
+            "unique": sorted({c for cols in table.unique.values() for c in cols}),
+            "references": references,
+            "primary": primary,
+        }
+    for plan in plans.values():
+        plan["parents"] = {c: {"seeded": plans[r]["seeded"], "first_id": plans[r]["first_id"],
+                               "count": len(plans[r]["seeded"]) + plans[r]["rows"]}
+                           for c, r in plan["references"].items() if r in plans}
+    return plans
+
+
+def _column_writer(plan, column, versions_per_parent):
+    """fn(row_id, group, ordinal, rng) -> TSV token for one column."""
+    name, type_, nullable, length = column
+    parents = plan["parents"]
+    if name == "Id":
+        return lambda row_id, group, ordinal, rng: str(row_id)
+    if name in parents:
+        parent = parents[name]
+        count = parent["count"]
+        if count == 0:
+            return lambda *_: NULL
+        if name == plan["primary"]:
+            return lambda row_id, group, ordinal, rng: str(_id_at(parent, group))
+        return lambda row_id, group, ordinal, rng: str(_id_at(parent, (ordinal + group * _STRIDE) % count))
+    if nullable and _ALWAYS_NULL.match(name):
+        return lambda *_: NULL
+    if name == "VersionNumber":
+        return lambda row_id, group, ordinal, rng: str(ordinal % versions_per_parent + 1)
+    if name == "CurrentVersionNumber":
+        token = str(versions_per_parent)
+        return lambda *_: token
+    base = type_.split("(")[0]
+    if base == "tinyint":
+        token = "1" if name in _TRUE_FLAGS else "0"
+        return lambda *_: token
+    if base in ("int", "bigint", "smallint"):
+        if "Status" in name or name.endswith("Type"):
+            return lambda *_: "1"
+        if name == "FailedAuthAttempts":
+            return lambda *_: "0"
+        return lambda row_id, group, ordinal, rng: str(rng.randint(1, 1000))
+    if base == "decimal":
+        scale = int(type_.split(",")[1].rstrip(")")) if "," in type_ else 0
+        spec = f".{min(scale, 2)}f"
+        return lambda row_id, group, ordinal, rng: format(rng.uniform(1, 500), spec)
+    if base in ("datetime", "date", "timestamp"):
+        offset = 365 if "End" in name or "Expir" in name else 0
+        return lambda row_id, group, ordinal, rng: _DATES[row_id % 1000 + offset]
+    if base in ("char",) and length == 36:
+        return lambda row_id, group, ordinal, rng: "%08x-0000-4000-8000-%012x" % (row_id, group)
+    if "Email" in name:
+        return lambda row_id, group, ordinal, rng: f"user{row_id}@example.com"
+    if name == "PasswordHash":
+        return lambda *_: PASSWORD_HASH
+    if name == "UserId":
+        return lambda row_id, group, ordinal, rng: f"user{row_id}"
+    limit = length or 200
+    prefix = f"{plan['name'][:12]} {name}"[:max(1, limit - 12)]
+    return lambda row_id, group, ordinal, rng: f"{prefix} {row_id}"[:limit]
+
+
+def write_chunk(plan, start, count, path, fmt, seed, versions_per_parent):
+    """Generate rows [start, start + count) of one table into path; returns (rows, bytes)."""
+    rng = random.Random(f"{seed}:{plan['name']}:{start}")
+    writers = [_column_writer(plan, column, versions_per_parent) for column in plan["columns"]]
+    quoted = [column[1].split("(")[0] in _QUOTED for column in plan["columns"]]
+    primary = plan["primary"]
+    rows, n_parent = plan["rows"], plan["parents"][primary]["count"] if primary else 0
+    first_id = plan["first_id"]
+    lines = []
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for r in range(start, start + count):
+            if n_parent:
+                group = r * n_parent // rows
+                ordinal = r - (group * rows + n_parent - 1) // n_parent
+            else:
+                group, ordinal = r, 0
+            tokens = [write(first_id + r, group, ordinal, rng) for write in writers]
+            if fmt == "tsv":
+                lines.append("\t".join(tokens))
+            else:
+                lines.append("(" + ",".join("NULL" if t == NULL else (f"'{t}'" if q else t)
+                                            for t, q in zip(tokens, quoted)) + ")")
+            if len(lines) >= INSERT_BATCH:
+                _flush(f, plan, lines, fmt)
+                lines = []
+        if lines:
+            _flush(f, plan, lines, fmt)
+        size = f.tell()
+    return count, size
+
+
+def _flush(f, plan, lines, fmt):
+    if fmt == "tsv":
+        f.write("\n".join(lines) + "\n")
+    else:
+        columns = ", ".join(f"`{c[0]}`" for c in plan["columns"])
+        f.write(f"INSERT INTO `{plan['name']}` ({columns}) VALUES\n" + ",\n".join(lines) + ";\n")
+
+
+def _write_chunk(args):
+    return write_chunk(*args)
+
+
+def chunk_jobs(plans, output, fmt, seed, chunk_rows=CHUNK_ROWS):
+    versions = _versions_per_parent(plans)
+    jobs = []
+    extension = "tsv" if fmt == "tsv" else "sql"
+    for order, plan in enumerate(p for p in plans.values() if p["rows"]):
+        for part, start in enumerate(range(0, plan["rows"], chunk_rows)):
+            path = os.path.join(output, f"{order:02d}_{plan['name']}.{part:03d}.{extension}")
+            jobs.append((plan, start, min(chunk_rows, plan["rows"] - start), path, fmt, seed, versions))
+    return jobs
+
+
+def _versions_per_parent(plans):
+    contracts = plans.get("Contracts", {}).get("rows", 0) + len(plans.get("Contracts", {}).get("seeded", []))
+    versions = plans.get("ContractVersions", {}).get("rows", 0)
+    return max(1, -(-versions // contracts)) if contracts else 1
+
+
+def load_script(plans, jobs, fmt):
+    lines = ["-- Generated by perf.seed; run with: mysql --local-infile=1 <database> < load.sql",
+             "SET foreign_key_checks = 0;", "SET unique_checks = 0;", "SET autocommit = 0;"]
+    for plan, _, _, path, _, _, _ in jobs:
+        path = os.path.abspath(path).replace("\\", "/")
+        if fmt == "tsv":
+            columns = ", ".join(f"`{c[0]}`" for c in plan["columns"])
+            lines.append(f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE `{plan['name']}` ({columns});")
+        else:
+            lines.append(f"SOURCE {path};")
+        lines.append("COMMIT;")
+    lines += ["SET unique_checks = 1;", "SET foreign_key_checks = 1;", "SET autocommit = 1;"]
+    return "\n".join(lines) + "\n"
+
+
+def seed_ids(plans):
+    return {name: {"seeded": plan["seeded"], "first": plan["first_id"],
+                   "last": plan["first_id"] + plan["rows"] - 1 if plan["rows"] else None}
+            for name, plan in plans.items() if plan["rows"] or plan["seeded"]}
+
+
+class SeededIds:
+    """Ids from seed_ids.json, addressed by REST resource name ("contracts", "customer-accounts")."""
+
+    def __init__(self, data):
+        self.tables = {}
+        for name, info in data.items():
+            ids = (info["first"], info["last"]) if info.get("last") else None
+            self.tables[name.lower()] = (info.get("seeded", []), ids)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def table_for(self, resource):
+        key = resource.replace("-", "").replace("_", "").lower()
+        for candidate in (key, key + "s", key[:-1] + "ies" if key.endswith("y") else None):
+            if candidate in self.tables:
+                return candidate
+        return None
+
+    def pick(self, table, rng):
+        seeded, generated = self.tables[table]
+        if generated:
+            return rng.randint(*generated)
+        return rng.choice(seeded) if seeded else None
+
+    def rewrite_path(self, path, rng):
+        """Replace numeric segments that follow a known resource with seeded ids."""
+        segments = path.split("/")
+        for index in range(1, len(segments)):
+            if segments[index].isdigit():
+                table = self.table_for(segments[index - 1])
+                value = self.pick(table, rng) if table else None
+                if value is not None:
+                    segments[index] = str(value)
+        return "/".join(segments)
+
+    def rewrite_body(self, value, rng):
+        """Replace numeric xxxId / xxxIds fields with seeded ids of table xxx."""
+        if isinstance(value, dict):
+            out = {}
+            for key, item in value.items():
+                stem = key[:-3] if key.endswith("Ids") else key[:-2] if key.endswith("Id") else None
+                table = self.table_for(stem) if stem else None
+                if table and isinstance(item, int) and not isinstance(item, bool):
+                    item = self.pick(table, rng) or item
+                elif table and isinstance(item, list) and all(isinstance(i, int) for i in item):
+                    item = [self.pick(table, rng) or i for i in item]
+                else:
+                    item = self.rewrite_body(item, rng)
+                out[key] = item
+            return out
+        if isinstance(value, list):
+            return [self.rewrite_body(item, rng) for item in value]
+        return value
+
+
+def _parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        name, _, rows = value.partition("=")
+        overrides[name] = int(float(rows))
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--migrations", default=MIGRATIONS_FILE)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every DEFAULT_ROWS count")
+    parser.add_argument("--rows", nargs="*", metavar="TABLE=N", help="Override row counts per table")
+    parser.add_argument("--output", default="seed-data", help="Output directory")
+    parser.add_argument("--format", choices=("tsv", "insert"), default="tsv",
+                        help="tsv: LOAD DATA LOCAL INFILE files (fastest); insert: multi-row INSERT scripts")
+    parser.add_argument("--workers", type=int, help="Writer processes (default: one per CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--id-base", type=int, default=1000000,
+                        help="Generated ids start above this value")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--list", action="store_true", help="Print the per-table plan and exit")
+    args = parser.parse_args(argv)
+
+    tables = replay_schema(args.migrations)
+    overrides = _parse_overrides(args.rows)
+    unknown = set(overrides) - set(tables)
+    if unknown:
+        parser.error(f"Unknown tables: {', '.join(sorted(unknown))}")
+    plans = plan_tables(tables, args.scale, overrides, args.id_base)
+    total = sum(p["rows"] for p in plans.values())
+    if args.list:
+        rows = [{"name": p["name"], "rows": p["rows"], "seeded": len(p["seeded"]),
+                 "parent": f"{p['primary']} -> {p['references'][p['primary']]}" if p["primary"] else ""}
+                for p in plans.values()]
+        from perf.stats import format_table
+        print(format_table(rows, [("name", "Table"), ("rows", "Rows", ","), ("seeded", "Migration rows"),
+                                  ("parent", "Grouped under")]))
+        print(f"\n{total:,} rows in {len(tables)} tables")
+        return 0
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs = chunk_jobs(plans, args.output, args.format, args.seed, args.chunk_rows)
+    print(f"Writing {total:,} rows in {len(jobs)} chunks to {args.output}/", file=sys.stderr)
+    start = time.perf_counter()
+    written = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for (plan, _, _, path, _, _, _), (rows, size) in zip(jobs, pool.map(_write_chunk, jobs)):
+            written += size
+            print(f"  {os.path.basename(path):48} {rows:>10,} rows {size / 1e6:8.1f} MB", file=sys.stderr)
+    with open(os.path.join(args.output, "load.sql"), "w", newline="\n") as f:
+        f.write(load_script(plans, jobs, args.format))
+    with open(os.path.join(args.output, "seed_ids.json"), "w") as f:
+        json.dump(seed_ids(plans), f, indent=2)
+    elapsed = time.perf_counter() - start
+    print(f"{total:,} rows, {written / 1e6:,.1f} MB in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s); "
+          f"load with: mysql --local-infile=1 <database> < {os.path.join(args.output, 'load.sql')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Streaming reader for the API's Serilog files (NPPContractManagement.API/logs/npp-*.log)
+
+Program.cs writes entries with the template
+    {Timestamp:yyyy-MM-dd HH:mm:ss.fff zzz} [{Level:u3}] {SourceContext}: {Message:lj}
+and EF Core appends the SQL text of "Executed DbCommand" entries on the
+following lines. iter_entries() groups those continuation lines with their
+entry and never holds more than one entry in memory.
+"""
+
+import datetime
+import functools
+import gzip
+import re
+
+ENTRY = re.compile(r"^(\d{4}-\d{2}-\d{2}) (\d{2}):(\d{2}):(\d{2}\.\d{3}) ([+-]\d{2}):(\d{2}) "
+                   r"\[(\w{3})\] ([^\s:]+): ?(.*)$")
+REQUEST_STARTING = re.compile(r"^Request starting (HTTP/[\d.]+) (\w+) (\S+)")
+REQUEST_FINISHED = re.compile(r"^Request finished (HTTP/[\d.]+) (\w+) (\S+) - (\d{3}) .*?([\d.]+)ms$")
+DB_COMMAND = re.compile(r"^(Executed|Failed executing) DbCommand \((\d+)ms\) \[Parameters=\[(.*)\], ")
+
+HOSTING = "Microsoft.AspNetCore.Hosting.Diagnostics"
+EF_COMMAND = "Microsoft.EntityFrameworkCore.Database.Command"
+
+
+class LogEntry:
+    """One log event; `extra` holds continuation lines (SQL text, stack traces)."""
+
+    __slots__ = ("date", "time", "offset", "level", "source", "message", "extra")
+
+    def __init__(self, date, time, offset, level, source, message):
+        self.date = date
+        self.time = time
+        self.offset = offset
+        self.level = level
+        self.source = source
+        self.message = message
+        self.extra = []
+
+    @property
+    def timestamp(self):
+        """Seconds since the epoch (UTC)."""
+        return _midnight(self.date, self.offset) + self.time
+
+    @property
+    def text(self):
+        return "\n".join(self.extra)
+
+
+@functools.lru_cache(maxsize=64)
+def _midnight(date, offset):
+    day = datetime.datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    return day.timestamp() - offset
+
+
+def open_log(path):
+    """Open a log file (plain or .gz) as text, tolerating stray bytes."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8-sig", errors="replace")
+
+
+def _entry(match):
+    hours, minutes, seconds = int(match.group(2)), int(match.group(3)), float(match.group(4))
+    sign = -1 if match.group(5).startswith("-") else 1
+    offset = sign * (abs(int(match.group(5))) * 3600 + int(match.group(6)) * 60)
+    return LogEntry(match.group(1), hours * 3600 + minutes * 60 + seconds, offset,
+                    match.group(7), match.group(8), match.group(9))
+
+
+def iter_entries(lines):
+    """Yield LogEntry objects from an iterable of lines."""
+    current = None
+    match_entry = ENTRY.match
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = match_entry(line) if line[:2] == "20" else None
+        if match:
+            if current is not None:
+                yield current
+            current = _entry(match)
+        elif current is not None:
+            current.extra.append(line)
+    if current is not None:
+        yield current
+
+
+def iter_log(path):
+    with open_log(path) as f:
+        yield from iter_entries(f)
+
+
+def request_starting(entry):
+    """(method, url) for a Hosting "Request starting" entry, else None."""
+    if entry.source != HOSTING:
+        return None
+    match = REQUEST_STARTING.match(entry.message)
+    return (match.group(2), match.group(3)) if match else None
+
+
+def request_finished(entry):
+    """(method, url, status, elapsed ms) for a Hosting "Request finished" entry, else None."""
+    if entry.source != HOSTING:
+        return None
+    match = REQUEST_FINISHED.match(entry.message)
+    if not match:
+        return None
+    return match.group(2), match.group(3), int(match.group(4)), float(match.group(5))
+
+
+def db_command(entry):
+    """(elapsed ms, failed, parameters) for an EF Core command entry, else None."""
+    if entry.source != EF_COMMAND:
+        return None
+    match = DB_COMMAND.match(entry.message)
+    if not match:
+        return None
+    return int(match.group(2)), match.group(1) != "Executed", match.group(3)
+
+
+class LogTail:
+    """Incremental reader: each read() returns the entries appended since the last one.
+
+    An incomplete trailing line is left for the next read, so an entry being
+    written while we read is never split.
+    """
+
+    def __init__(self, path, from_end=True):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            self.position = f.tell() if from_end else 0
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, 2)
+            if f.tell() < self.position:  # rotated or truncated
+                self.position = 0
+            f.seek(self.position)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.position += end
+        return list(iter_entries(data[:end].decode("utf-8", errors="replace").splitlines()))
+
+
+def db_time_for(entries, method, path):
+    """Sum of DbCommand ms between the start and finish of the last matching request.
+
+    Only meaningful when requests to the API are not overlapping, e.g. a
+    sequential sweep. Returns (db ms, db commands, server ms) or None.
+    """
+    path = path.lower()
+    result = None
+    active = None
+    for entry in entries:
+        started = request_starting(entry)
+        if started and started[0] == method and url_path(started[1]).endswith(path):
+            active = [0, 0]
+            continue
+        if active is not None:
+            command = db_command(entry)
+            if command:
+                active[0] += command[0]
+                active[1] += 1
+                continue
+            finished = request_finished(entry)
+            if finished and finished[0] == method and url_path(finished[1]).endswith(path):
+                result = (active[0], active[1], finished[3])
+                active = None
+    return result
+
+
+def url_path(url):
+    """Lower-case path of a logged request URL, without scheme, host or query."""
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    return path.split("?", 1)[0].lower()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Role- and manufacturer-scoped multi-user session pool
+
+The collection logs in only as admin, but ContractsController filters by the
+caller's manufacturer_ids claim when the caller has the Manufacturer role, so
+admin-only load never exercises those paths. This tool logs in N users,
+optionally gives them roles and manufacturers first through the collection's
+"Assign Role to User" / "Assign Manufacturer to User" items (as admin), and
+spreads the replayed requests across their tokens round-robin.
+
+Tokens are refreshed through "Refresh Token" (/auth/refresh-token) shortly
+before they expire (the JWT exp claim, or --token-ttl to force churn). A
+refresh that fails, or a 401 on a request, falls back to a new /auth/login.
+The report shows latency per role and endpoint, a p50 pivot by role, and
+login / refresh counts and latency under load.
+
+Users come from a JSON file ([{"userId": ..., "password": ...}, ...]) or from
+perf.seed output (--seed-ids): seeded users are user<id> with the admin
+password.
+
+Usage:
+    python -m perf.sessions --base-url http://localhost:5143/api --seed-ids seed-data/seed_ids.json \
+        --users 50 --assign Manufacturer=20 "Contract Viewer=10" --modules contracts --duration 120
+    python -m perf.sessions --users-file users.json --token-ttl 30 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import random
+import sys
+import time
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, find_item, item_body, item_path, load_collection
+from perf.plan import bearer_value, compile_plan
+from perf.runner import Recorder, add_common_arguments, login, open_session, select_items
+from perf.seed import SEEDED_PASSWORD, SeededIds
+from perf.stats import LATENCY_COLUMNS, format_table
+
+# Role ids as inserted by migrations.sql
+ROLE_IDS = {"System Administrator": 1, "Contract Manager": 2, "Manufacturer": 3, "Distributor": 4,
+            "Contract Viewer": 5}
+_ROLE_CLAIMS = ("role", "http://schemas.microsoft.com/ws/2008/06/identity/claims/role")
+DEFAULT_TTL = 3600.0
+# Backoff after a failed refresh and re-login: 1s, 2s, 4s, ... up to a minute
+RETRY_DELAY = 1.0
+RETRY_MAX = 60.0
+
+
+def decode_jwt(token):
+    """Claims of a JWT, without verifying it; {} if the token is not a JWT."""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return {}
+
+
+class PoolUser:
+    __slots__ = ("user_id", "password", "id", "roles", "manufacturer_ids", "token", "refresh_token",
+                 "expires", "bearer", "pending", "failures")
+
+    def __init__(self, user_id, password):
+        self.user_id = user_id
+        self.password = password
+        self.id = None
+        self.roles = ()
+        self.manufacturer_ids = ()
+        self.token = None
+        self.refresh_token = None
+        self.expires = 0.0
+        self.bearer = ""
+        self.pending = None
+        self.failures = 0
+
+    @property
+    def label(self):
+        return "+".join(self.roles) or "(no role)"
+
+    def update(self, data, token_ttl=None):
+        """Take the token, refresh token, roles and expiry from a login/refresh response."""
+        self.token = data["token"]
+        self.refresh_token = data.get("refreshToken") or self.refresh_token
+        self.bearer = bearer_value(self.token)
+        claims = decode_jwt(self.token)
+        user = data.get("user") or {}
+        self.id = user.get("id", self.id)
+        roles = next((claims[c] for c in _ROLE_CLAIMS if c in claims), None)
+        if roles is None:
+            roles = [r["name"] if isinstance(r, dict) else r for r in user.get("roles", [])]
+        self.roles = tuple(sorted([roles] if isinstance(roles, str) else roles))
+        if "manufacturer_ids" in claims:
+            self.manufacturer_ids = tuple(json.loads(claims["manufacturer_ids"]))
+        now = time.time()
+        lifetime = claims["exp"] - now if "exp" in claims else data.get("expiresIn", DEFAULT_TTL)
+        self.expires = now + (min(lifetime, token_ttl) if token_ttl else lifetime)
+
+
+def load_users(path):
+    with open(path) as f:
+        return [PoolUser(u["userId"], u.get("password", SEEDED_PASSWORD)) for u in json.load(f)]
+
+
+def seeded_users(ids, count, password=SEEDED_PASSWORD):
+    """The first `count` users generated by perf.seed."""
+    _, generated = ids.tables.get("users", ([], None))
+    if not generated:
+        raise ValueError("seed_ids.json has no generated Users")
+    first, last = generated
+    return [PoolUser(f"user{i}", password) for i in range(first, min(last, first + count - 1) + 1)]
+
+
+class SessionPool:
+    """Logged-in users handed out round-robin; keeps their tokens fresh."""
+
+    def __init__(self, users, collection, variables, refresh_margin=60.0, token_ttl=None):
+        self.users = users
+        self.login_item = find_item(collection, "Login")
+        self.refresh_item = find_item(collection, "Refresh Token")
+        self.variables = variables
+        self.refresh_margin = refresh_margin
+        self.token_ttl = token_ttl
+        self.auth = Recorder()
+        self.failed = []
+        self._cycle = None
+
+    async def _auth(self, http, item, body, kind, user):
+        method, url, headers, _ = build_request(item, self.variables)
+        start = time.perf_counter()
+        try:
+            async with http.request(method, url, headers=headers,
+                                    data=json.dumps(body).encode("utf-8")) as response:
+                status = response.status
+                data = await response.json(content_type=None) if status < 300 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            status, data = 0, None
+        elapsed = time.perf_counter() - start
+        ok = bool(data and data.get("token"))
+        if ok:
+            user.update(data, self.token_ttl)
+        self.auth.record(user.label, kind, elapsed, status if ok or status >= 300 else 0)
+        return ok
+
+    async def login(self, http, user, kind="login"):
+        body = dict(item_body(self.login_item), userId=user.user_id, password=user.password)
+        return await self._auth(http, self.login_item, body, kind, user)
+
+    async def refresh(self, http, user):
+        if self.refresh_item is not None and user.refresh_token:
+            if await self._auth(http, self.refresh_item, {"refreshToken": user.refresh_token}, "refresh", user):
+                return True
+        return await self.login(http, user, "re-login")
+
+    async def start(self, http, parallel=8):
+        """Log every user in; users whose login fails are left out of the pool."""
+        gate = asyncio.Semaphore(parallel)
+
+        async def one(user):
+            async with gate:
+                if not await self.login(http, user):
+                    self.failed.append(user.user_id)
+
+        await asyncio.gather(*(one(u) for u in self.users))
+        self.users = [u for u in self.users if u.token]
+        self._cycle = itertools.cycle(self.users)
+        return self.users
+
+    def next(self):
+        return next(self._cycle)
+
+    def expired(self, user, http):
+        """A request got 401: re-login once, shared by every worker that saw it."""
+        if user.pending is None or user.pending.done():
+            user.pending = asyncio.ensure_future(self.login(http, user, "re-login"))
+        return user.pending
+
+    async def keep_fresh(self, http, deadline):
+        """Refresh tokens `refresh_margin` seconds before they expire, until deadline."""
+        while time.perf_counter() < deadline:
+            now = time.time()
+            due = [u for u in self.users if u.expires - self.refresh_margin <= now]
+            results = await asyncio.gather(*(self.refresh(http, u) for u in due))
+            now = time.time()
+            for user, ok in zip(due, results):
+                if ok:
+                    user.failures = 0
+                    continue
+                # Keep the user but retry later, so a dead auth endpoint is not hammered
+                user.failures += 1
+                user.expires = now + self.refresh_margin + min(RETRY_MAX, RETRY_DELAY * 2 ** (user.failures - 1))
+            wake = min(u.expires for u in self.users) - self.refresh_margin - now
+            await asyncio.sleep(max(0.05, min(wake, deadline - time.perf_counter())))
+
+
+async def assign_roles(http, collection, admin_variables, users, plan, manufacturer_ids, per_user, rng):
+    """Give users roles (and Manufacturer users manufacturers) through the collection's user items.
+
+    plan is [(role name, user count)]; returns the number of failed calls.
+    """
+    role_item = find_item(collection, "Assign Role to User")
+    manufacturer_item = find_item(collection, "Assign Manufacturer to User")
+    failures = 0
+    targets = iter(users)
+    for role, count in plan:
+        for user in itertools.islice(targets, count):
+            calls = [(role_item, {"roleId": ROLE_IDS.get(role, role)})]
+            if role == "Manufacturer" and manufacturer_ids:
+                calls.append((manufacturer_item, rng.sample(manufacturer_ids, min(per_user, len(manufacturer_ids)))))
+            for item, body in calls:
+                method, url, headers, _ = build_request(item, admin_variables)
+                url = admin_variables["baseUrl"] + item_path(item).replace("/users/1/", f"/users/{user.id}/", 1)
+                async with http.request(method, url, headers=headers, data=json.dumps(body).encode()) as response:
+                    await response.read()
+                    failures += response.status >= 300
+    return failures
+
+
+async def _worker(http, pool, queue, recorder, deadline, budget):
+    while time.perf_counter() < deadline and budget[0] != 0:
+        budget[0] -= 1
+        request, user = next(queue), pool.next()
+        if user.pending is not None and not user.pending.done():
+            await user.pending
+        start = time.perf_counter()
+        try:
+            async with http.request(request.method, request.url, headers=request.request_headers(user.bearer),
+                                    data=request.body) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 0
+        recorder.record(user.label, request.name, time.perf_counter() - start, status)
+        if status == 401 and request.auth:
+            await pool.expired(user, http)
+
+
+async def run_pool(http, pool, plan, concurrency=32, duration=60.0, requests=None):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    budget = [requests if requests else -1]
+    queue = itertools.cycle(plan)
+    refresher = asyncio.ensure_future(pool.keep_fresh(http, deadline))
+    await asyncio.gather(*(_worker(http, pool, queue, recorder, deadline, budget) for _ in range(concurrency)))
+    refresher.cancel()
+    recorder.stop()
+    pool.auth.stop()
+    return recorder
+
+
+def role_pivot(recorder):
+    """p50 ms per endpoint (rows) and role (columns)."""
+    rows, roles = {}, set()
+    for row in recorder.by_endpoint():
+        roles.add(row["module"])
+        rows.setdefault(row["endpoint"], {"name": row["endpoint"]})[row["module"]] = row["p50_ms"]
+    roles = sorted(roles)
+    return list(rows.values()), [("name", "Endpoint")] + [(r, f"{r} p50", ".1f") for r in roles]
+
+
+def print_report(recorder, pool):
+    print(f"\nDuration: {recorder.elapsed:.1f}s, {len(pool.users)} users")
+    if pool.failed:
+        print(f"{len(pool.failed)} users could not log in: {', '.join(pool.failed[:10])}")
+    print("\nLatency p50 by role")
+    rows, columns = role_pivot(recorder)
+    print(format_table(rows, columns))
+    print("\nPer role and endpoint")
+    print(format_table(recorder.by_endpoint(), LATENCY_COLUMNS))
+    print("\nAuthentication (login, refresh, re-login after a failed refresh or a 401)")
+    print(format_table(pool.auth.by_endpoint(), LATENCY_COLUMNS))
+
+
+def _parse_plan(values):
+    plan = []
+    for value in values or []:
+        role, _, count = value.rpartition("=")
+        plan.append((role, int(count)))
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--users-file", help="JSON list of {userId, password}")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: log in as seeded users and "
+                                           "spread hardcoded ids over seeded rows")
+    parser.add_argument("--users", type=int, default=20, help="Seeded users to log in (with --seed-ids)")
+    parser.add_argument("--assign", nargs="*", metavar="ROLE=N",
+                        help="Give the first N users this role before the run (as admin)")
+    parser.add_argument("--manufacturers-per-user", type=int, default=3)
+    parser.add_argument("--token-ttl", type=float, help="Treat tokens as expiring after this many seconds")
+    parser.add_argument("--refresh-margin", type=float, default=60.0,
+                        help="Refresh this many seconds before expiry")
+    parser.add_argument("--modules", nargs="*", help="Module numbers or names to replay (default: all)")
+    parser.add_argument("--methods", nargs="*", default=["GET"])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--json", help="Write per-role and authentication summaries to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+    if args.users_file:
+        users = load_users(args.users_file)
+    elif ids is not None:
+        users = seeded_users(ids, args.users)
+    else:
+        parser.error("Pass --users-file or --seed-ids")
+    items = select_items(collection, args.modules, args.methods)
+    if not items:
+        print("No items match the selected modules/methods", file=sys.stderr)
+        return 2
+    plan = compile_plan(items, variables, ids)
+    margin = min(args.refresh_margin, args.token_ttl / 4) if args.token_ttl else args.refresh_margin
+    pool = SessionPool(users, collection, variables, margin, args.token_ttl)
+
+    async def run():
+        async with open_session(args.concurrency + 8, args.timeout) as http:
+            await pool.start(http)
+            if args.assign:
+                admin = dict(variables)
+                await login(http, collection, admin, args.user, args.password)
+                manufacturers = []
+                if ids is not None and "manufacturers" in ids.tables:
+                    seeded, generated = ids.tables["manufacturers"]
+                    manufacturers = list(seeded) + (list(range(generated[0], generated[1] + 1)) if generated else [])
+                failures = await assign_roles(http, collection, admin, pool.users, _parse_plan(args.assign),
+                                              manufacturers, args.manufacturers_per_user, random.Random(0))
+                if failures:
+                    print(f"{failures} role/manufacturer assignments failed; users keep their current roles",
+                          file=sys.stderr)
+                await asyncio.gather(*(pool.login(http, u) for u in pool.users))
+            if not pool.users:
+                raise RuntimeError("No user could log in")
+            roles = {}
+            for user in pool.users:
+                roles[user.label] = roles.get(user.label, 0) + 1
+            print(f"Replaying {len(items)} endpoints as {len(pool.users)} users "
+                  f"({', '.join(f'{n} {r}' for r, n in sorted(roles.items()))})")
+            return await run_pool(http, pool, plan, args.concurrency, args.duration, args.requests)
+
+    recorder = asyncio.run(run())
+    print_report(recorder, pool)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"duration_s": recorder.elapsed, "users": len(pool.users), "failed_logins": pool.failed,
+                       "endpoints": recorder.by_endpoint(), "auth": pool.auth.by_endpoint()}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
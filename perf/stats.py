@@ -0,0 +1,162 @@
+"""
+Latency statistics and plain-text report tables shared by the perf tools
+"""
+
+import math
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Count, throughput and p50/p95/p99 (milliseconds) for a list of latencies in seconds."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": count / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": (sum(values) / count * 1000.0) if count else 0.0,
+        "p50_ms": percentile(values, 50) * 1000.0,
+        "p95_ms": percentile(values, 95) * 1000.0,
+        "p99_ms": percentile(values, 99) * 1000.0,
+        "max_ms": (values[-1] * 1000.0) if count else 0.0,
+    }
+
+
+def usl_throughput(n, fit):
+    """Throughput the Universal Scalability Law predicts at concurrency n."""
+    return fit["lambda"] * n / (1 + fit["sigma"] * (n - 1) + fit["kappa"] * n * (n - 1))
+
+
+def fit_usl(concurrency, throughput):
+    """Fit the Universal Scalability Law X(N) = λN / (1 + σ(N-1) + κN(N-1)).
+
+    σ is contention (serialised work), κ coherency (crosstalk that makes
+    throughput fall past the peak). λ is the single-client throughput, taken
+    from the N=1 point (or the lowest level measured). The linearised form
+    N·λ/X - 1 = σ(N-1) + κN(N-1) is solved by least squares with σ, κ >= 0.
+    Returns {"lambda", "sigma", "kappa", "peak_n", "peak_x", "r2"}, or None
+    with fewer than three points; peak_n is None when κ = 0 (no peak).
+    """
+    points = sorted((n, x) for n, x in zip(concurrency, throughput) if x > 0)
+    if len(points) < 3:
+        return None
+    lam = points[0][1] / points[0][0]
+    a = [n - 1 for n, _ in points]
+    b = [n * (n - 1) for n, _ in points]
+    y = [n * lam / x - 1 for n, x in points]
+    saa = sum(v * v for v in a)
+    sbb = sum(v * v for v in b)
+    sab = sum(u * v for u, v in zip(a, b))
+    say = sum(u * v for u, v in zip(a, y))
+    sby = sum(u * v for u, v in zip(b, y))
+    det = saa * sbb - sab * sab
+    sigma = (say * sbb - sby * sab) / det if det else 0.0
+    kappa = (sby * saa - say * sab) / det if det else 0.0
+    if sigma < 0:
+        sigma, kappa = 0.0, max(0.0, sby / sbb) if sbb else 0.0
+    if kappa < 0:
+        kappa, sigma = 0.0, max(0.0, say / saa) if saa else 0.0
+    fit = {"lambda": lam, "sigma": sigma, "kappa": kappa}
+    if kappa > 0 and sigma < 1:
+        fit["peak_n"] = ((1 - sigma) / kappa) ** 0.5
+        fit["peak_x"] = usl_throughput(fit["peak_n"], fit)
+    else:
+        # No retrograde term: throughput approaches λ/σ asymptotically
+        fit["peak_n"] = None
+        fit["peak_x"] = lam / sigma if sigma > 0 else None
+    mean_x = sum(x for _, x in points) / len(points)
+    sst = sum((x - mean_x) ** 2 for _, x in points) or 1e-12
+    sse = sum((x - usl_throughput(n, fit)) ** 2 for n, x in points)
+    fit["r2"] = 1.0 - sse / sst
+    return fit
+
+
+def geometric_sizes(start, maximum, factor):
+    """start, start*factor, ... up to maximum, as distinct integers."""
+    sizes = []
+    size = start
+    while size <= maximum:
+        sizes.append(int(size))
+        size = max(size * factor, size + 1)
+    return sorted(set(sizes))
+
+
+def format_table(rows, columns):
+    """Render rows (list of dicts) as an aligned text table.
+
+    columns is a list of (key, header) or (key, header, format spec).
+    """
+    header = [c[1] for c in columns]
+    lines = []
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column[0], "")
+            spec = column[2] if len(column) > 2 else ""
+            if value is None:
+                cells.append("-")
+            else:
+                cells.append(format(value, spec) if spec and value != "" else str(value))
+        lines.append(cells)
+    widths = [max(len(h), *(len(line[i]) for line in lines)) if lines else len(h)
+              for i, h in enumerate(header)]
+    out = ["  ".join(h.ljust(w) if i == 0 else h.rjust(w) for i, (h, w) in enumerate(zip(header, widths)))]
+    out.append("  ".join("-" * w for w in widths))
+    for cells in lines:
+        out.append("  ".join(c.ljust(w) if i == 0 else c.rjust(w)
+                             for i, (c, w) in enumerate(zip(cells, widths))))
+    return "\n".join(out)
+
+
+LATENCY_COLUMNS = [
+    ("name", "Name"),
+    ("count", "Requests"),
+    ("errors", "Errors"),
+    ("rps", "Req/s", ".1f"),
+    ("p50_ms", "p50 ms", ".1f"),
+    ("p95_ms", "p95 ms", ".1f"),
+    ("p99_ms", "p99 ms", ".1f"),
+    ("max_ms", "Max ms", ".1f"),
+]
+
+
+def _linear_fit(xs, ys):
+    """Least-squares y = c + a*x; returns (c, a, sse)."""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    a = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx if sxx else 0.0
+    c = mean_y - a * mean_x
+    return c, a, sum((y - c - a * x) ** 2 for x, y in zip(xs, ys))
+
+
+def fit_power_law(xs, ys, min_exponent=0.1, max_exponent=3.0, step=0.01):
+    """Fit y = c + a * x**b (c = fixed overhead, b = growth exponent).
+
+    Grid search over b with an exact linear fit of c and a at each step;
+    b > 1 means the cost grows faster than the input (superlinear).
+    Returns {"c", "a", "b", "r2"} or None with fewer than three points.
+    """
+    if len(xs) < 3:
+        return None
+    mean_y = sum(ys) / len(ys)
+    sst = sum((y - mean_y) ** 2 for y in ys) or 1e-12
+    best = None
+    b = min_exponent
+    while b <= max_exponent + 1e-9:
+        c, a, sse = _linear_fit([x ** b for x in xs], ys)
+        if a > 0 and (best is None or sse < best[3]):
+            best = (c, a, b, sse)
+        b += step
+    if best is None:
+        return {"c": mean_y, "a": 0.0, "b": 0.0, "r2": 0.0}
+    c, a, b, sse = best
+    return {"c": c, "a": a, "b": round(b, 2), "r2": 1.0 - sse / sst}
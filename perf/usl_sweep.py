@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Closed-loop concurrency sweep with a Universal Scalability Law fit
+
+For each module, replays its items at concurrency 1, 2, 4 ... --max-concurrency.
+Each level gets a warm-up (discarded), then a measured window that records
+steady-state throughput (successful responses per second) and latency. The
+throughput curve is fitted to the USL (perf.stats.fit_usl):
+
+    X(N) = λN / (1 + σ(N-1) + κN(N-1))
+
+σ (contention) is the share of work that serialises, e.g. a lock or a single
+DB connection. κ (coherency) is the crosstalk that makes throughput fall past
+the peak. The report gives the predicted peak throughput and the concurrency
+it occurs at, per module. Use these numbers to size Kestrel's
+MaxConcurrentConnections, the MySQL connection pool and the number of nodes
+for a target load.
+
+The sweep stops raising the concurrency for a module once the error rate goes
+above --max-error-rate; the levels measured so far are still fitted.
+
+Usage:
+    python -m perf.usl_sweep --base-url http://localhost:5143/api --max-concurrency 512 \
+        --warmup 5 --duration 20
+    python -m perf.usl_sweep --modules contracts --levels 1 2 4 8 16 24 32 48 64 --json usl.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from perf.collection import collection_variables, load_collection
+from perf.runner import add_common_arguments, open_session, run_load, select_items
+from perf.seed import SeededIds
+from perf.stats import fit_usl, format_table, geometric_sizes, usl_throughput
+
+DEFAULT_MODULES = ["Contracts", "Proposals", "Lookup", "Reports"]
+
+
+async def sweep(session, items, variables, levels, warmup, duration, max_error_rate, collection=None,
+                user=None, password=None, ids=None):
+    """Measure one item mix at each concurrency level; returns a row per level."""
+    rows = []
+    for level in levels:
+        if warmup > 0:
+            await run_load(items, variables, level, warmup, session=session, collection=collection,
+                           user=user, password=password, ids=ids)
+        recorder = await run_load(items, variables, level, duration, session=session,
+                                  collection=collection, user=user, password=password, ids=ids)
+        latencies = [v for values in recorder.latencies.values() for v in values]
+        errors = sum(recorder.errors.values())
+        overall = recorder.by_module()[0] if latencies else {}
+        row = {
+            "concurrency": level,
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput": (len(latencies) - errors) / recorder.elapsed,
+            "p50_ms": overall.get("p50_ms"),
+            "p95_ms": overall.get("p95_ms"),
+            "p99_ms": overall.get("p99_ms"),
+        }
+        rows.append(row)
+        print(f"  N={level:<5} {row['throughput']:10.1f} req/s  p95 {row['p95_ms'] or 0:8.1f} ms  "
+              f"errors {errors}", file=sys.stderr)
+        if latencies and errors / len(latencies) > max_error_rate:
+            print(f"  error rate above {max_error_rate:.0%}, not going higher", file=sys.stderr)
+            break
+    return rows
+
+
+def summarize_fit(module, rows):
+    fit = fit_usl([r["concurrency"] for r in rows], [r["throughput"] for r in rows])
+    measured = max(rows, key=lambda r: r["throughput"]) if rows else None
+    summary = {"name": module, "measured_peak_x": measured and measured["throughput"],
+               "measured_peak_n": measured and measured["concurrency"]}
+    if fit:
+        summary.update(fit)
+    return summary
+
+
+SUMMARY_COLUMNS = [
+    ("name", "Module"),
+    ("lambda", "λ req/s", ".1f"),
+    ("sigma", "σ contention", ".4f"),
+    ("kappa", "κ coherency", ".6f"),
+    ("r2", "R²", ".3f"),
+    ("peak_n", "Peak at N", ".0f"),
+    ("peak_x", "Predicted peak req/s", ".1f"),
+    ("measured_peak_n", "Best measured N"),
+    ("measured_peak_x", "Best measured req/s", ".1f"),
+]
+LEVEL_COLUMNS = [
+    ("concurrency", "N"),
+    ("requests", "Requests"),
+    ("errors", "Errors"),
+    ("throughput", "Req/s", ".1f"),
+    ("predicted", "USL req/s", ".1f"),
+    ("p50_ms", "p50 ms", ".1f"),
+    ("p95_ms", "p95 ms", ".1f"),
+    ("p99_ms", "p99 ms", ".1f"),
+]
+
+
+def print_report(results):
+    for module, (rows, summary) in results.items():
+        if "sigma" in summary:
+            for row in rows:
+                row["predicted"] = usl_throughput(row["concurrency"], summary)
+        print(f"\n{module}")
+        print(format_table(rows, LEVEL_COLUMNS))
+    print("\nUniversal Scalability Law fit")
+    print(format_table([summary for _, summary in results.values()], SUMMARY_COLUMNS))
+    for module, (_, summary) in results.items():
+        if summary.get("peak_n") is None and summary.get("sigma") is not None:
+            print(f"  {module}: no coherency term (κ = 0), throughput levels off at λ/σ instead of peaking")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("--modules", nargs="*", default=DEFAULT_MODULES,
+                        help="Modules to sweep, each on its own (default: %(default)s)")
+    parser.add_argument("--methods", nargs="*", default=["GET"])
+    parser.add_argument("--levels", nargs="*", type=int, help="Concurrency levels (default: 1, 2, 4 ... max)")
+    parser.add_argument("--max-concurrency", type=int, default=512)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds discarded before each level")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per level")
+    parser.add_argument("--max-error-rate", type=float, default=0.05)
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: replace hardcoded ids")
+    parser.add_argument("--json", help="Write levels and fits to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+    levels = sorted(set(args.levels)) if args.levels else geometric_sizes(1, args.max_concurrency, 2)
+    mixes = {}
+    for module in args.modules:
+        items = select_items(collection, [module], args.methods)
+        if items:
+            mixes[items[0][0]] = items
+        else:
+            print(f"No items match module {module!r}", file=sys.stderr)
+    if not mixes:
+        return 2
+    per_level = args.warmup + args.duration
+    print(f"Sweeping {len(mixes)} modules over N={levels} "
+          f"(~{len(mixes) * len(levels) * per_level / 60:.0f} min) against {variables['baseUrl']}")
+
+    async def run():
+        results = {}
+        async with open_session(max(levels), args.timeout) as session:
+            for module, items in mixes.items():
+                print(f"{module}: {len(items)} items", file=sys.stderr)
+                rows = await sweep(session, items, variables, levels, args.warmup, args.duration,
+                                   args.max_error_rate, collection, args.user, args.password, ids)
+                results[module] = (rows, summarize_fit(module, rows))
+        return results
+
+    results = asyncio.run(run())
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({module: {"levels": rows, "fit": summary} for module, (rows, summary) in results.items()},
+                      f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
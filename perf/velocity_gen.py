@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Synthetic velocity file generator for ingest stress tests
+
+Writes files in the 20-column distributor layout of
+sample_velocity_data_new_format.csv (OPCO, Customer #, ... GTIN, Qty, Sales,
+Landed Cost, Allowances) at a target row count or byte size. Rows are built in
+NumPy batches and streamed to disk, so memory stays constant however large
+the file gets. The same seed and batch size always produce the same file.
+
+Usage:
+    python -m perf.velocity_gen velocity_10mb.csv --size 10MB --seed 7
+    python -m perf.velocity_gen velocity_2g.csv --size 2GB --customers 50000 --products 20000
+    python -m perf.velocity_gen velocity.xlsx --rows 200000 --format xlsx
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+HEADER = [
+    "OPCO", "Customer #", "Customer Name", "Address One", "Address Two",
+    "City", "Zip Code", "Invoice #", "Invoice Date", "Product #",
+    "Brand", "Pack Size", "Description", "Corp Manuf #", "GTIN",
+    "Manufacturer Name", "Qty", "Sales", "Landed Cost", "Allowances",
+]
+
+# Excel's sheet limit, including the header row
+XLSX_MAX_ROWS = 1048576 - 1
+
+CITIES = [
+    ("New York", "10001"), ("Los Angeles", "90001"), ("Chicago", "60601"), ("Houston", "77001"),
+    ("Phoenix", "85001"), ("Philadelphia", "19101"), ("San Antonio", "78201"), ("San Diego", "92101"),
+    ("Dallas", "75201"), ("Atlanta", "30301"), ("Denver", "80201"), ("Seattle", "98101"),
+]
+CUSTOMER_KINDS = ["Restaurant", "Cafe", "Grill", "Food Services Inc", "Bistro", "Deli", "Catering", "Diner"]
+STREETS = ["Main St", "Oak Ave", "Pine Rd", "Elm St", "Maple Dr", "Cedar Ln", "Park Blvd", "Lake Way"]
+PACK_SIZES = ["12x500ml", "24x250ml", "6x1L", "48x125ml", "4x5lb", "10x2kg", "1x25lb", "36x12oz"]
+CATEGORIES = ["Sauce", "Dressing", "Frozen Fries", "Cheese", "Beverage", "Spice Blend", "Pasta", "Dessert"]
+
+# Corruptions used for --invalid-rate, one per field the server validates
+INVALID_VALUES = {"Qty": "-5", "Sales": "N/A", "Landed Cost": "1,000.00.0", "Allowances": "abc",
+                  "Invoice Date": "2024-13-45", "GTIN": "12AB"}
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*$", re.IGNORECASE)
+
+
+def parse_size(text):
+    """'10MB' -> 10485760 (binary units)"""
+    match = _SIZE.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {text}")
+    unit = match.group(2).upper().rstrip("B")
+    return int(float(match.group(1)) * {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[unit])
+
+
+def _gtin13(base):
+    """Vectorized GTIN-13 from 12-digit integers (adds the check digit)."""
+    digits = (base[:, None] // (10 ** np.arange(11, -1, -1))) % 10
+    weights = np.tile([1, 3], 6)
+    check = (10 - (digits * weights).sum(axis=1) % 10) % 10
+    return base * 10 + check
+
+
+def _customer_fields(ids):
+    """CSV text for Customer # .. Zip Code, for unique customer ids."""
+    out = []
+    for c in ids.tolist():
+        city, zip_code = CITIES[c % len(CITIES)]
+        suite = f"Suite {c % 900 + 100}" if c % 3 == 0 else ""
+        out.append(f"CUST{c:07d},{STREETS[c % len(STREETS)].split()[0]} {CUSTOMER_KINDS[c % len(CUSTOMER_KINDS)]} {c},"
+                   f"{c % 9000 + 100} {STREETS[(c // 7) % len(STREETS)]},{suite},{city},{zip_code}")
+    return out
+
+
+def _product_fields(ids, gtins):
+    """CSV text for Product # .. Manufacturer Name, for unique product ids."""
+    out = []
+    for p, gtin in zip(ids.tolist(), gtins.tolist()):
+        manufacturer = p % 97
+        out.append(f"PROD{p:07d},Brand {chr(65 + p % 26)}{p % 50},{PACK_SIZES[p % len(PACK_SIZES)]},"
+                   f"{CATEGORIES[p % len(CATEGORIES)]} {p},CORP{manufacturer:04d},{gtin:013d},"
+                   f"Manufacturer {manufacturer}")
+    return out
+
+
+class VelocityConfig:
+    """Shape of the generated data."""
+
+    def __init__(self, seed=0, customers=5000, products=2000, opcos=25, invoice_lines=8,
+                 start_date="2024-01-01", end_date="2024-12-31", invalid_rate=0.0):
+        self.seed = seed
+        self.customers = customers
+        self.products = products
+        self.opcos = opcos
+        self.invoice_lines = invoice_lines
+        self.start = np.datetime64(start_date, "D")
+        self.days = int((np.datetime64(end_date, "D") - self.start).astype(int)) + 1
+        self.invalid_rate = invalid_rate
+
+
+def generate_batch(config, batch_index, size, first_row):
+    """Columns for `size` rows as NumPy arrays / lists; deterministic per (seed, batch)."""
+    rng = np.random.default_rng((config.seed, batch_index))
+    opco = rng.integers(1, config.opcos + 1, size)
+    # Zipf-ish skew: a few customers and products dominate, like real distributor data
+    customer = (rng.pareto(1.2, size) * config.customers / 20).astype(np.int64) % config.customers + 1
+    product = (rng.pareto(1.1, size) * config.products / 20).astype(np.int64) % config.products + 1
+    rows = np.arange(first_row, first_row + size, dtype=np.int64)
+    invoice = rows // max(config.invoice_lines, 1) + 1
+    dates = (config.start + rng.integers(0, config.days, size).astype("timedelta64[D]")).astype(str)
+    qty = rng.integers(1, 500, size)
+    # Unit price is stable per product so Sales/Qty looks plausible across the file
+    unit_cents = (product * 2654435761 % 9900) + 100
+    sales = qty * unit_cents
+    landed = (sales * rng.uniform(0.70, 0.92, size)).astype(np.int64)
+    allowances = (sales * rng.uniform(0.0, 0.06, size)).astype(np.int64)
+    gtin_base = 100000000000 + product * 7919 % 899999999999
+    columns = {
+        "opco": opco, "customer": customer, "product": product, "invoice": invoice, "date": dates,
+        "qty": qty, "sales": sales, "landed": landed, "allowances": allowances,
+        "gtin": _gtin13(gtin_base), "invalid": None,
+    }
+    if config.invalid_rate > 0:
+        bad = rng.random(size) < config.invalid_rate
+        fields = list(INVALID_VALUES)
+        columns["invalid"] = {int(i): fields[int(f)] for i, f in
+                              zip(np.flatnonzero(bad), rng.integers(0, len(fields), int(bad.sum())))}
+    return columns
+
+
+_CENTS = np.array([f".{i:02d}" for i in range(100)])
+
+
+def _cents(values):
+    """Integer cents -> '123.45' strings, vectorized."""
+    return np.char.add((values // 100).astype(str), _CENTS[values % 100])
+
+
+def _join(*columns):
+    """Comma-join equal-length string arrays element-wise."""
+    out = columns[0]
+    for column in columns[1:]:
+        out = np.char.add(np.char.add(out, ","), column)
+    return out
+
+
+def csv_lines(columns):
+    """Encode a batch as CSV lines (without trailing newline)."""
+    cust_ids, cust_inv = np.unique(columns["customer"], return_inverse=True)
+    prod_ids, prod_first, prod_inv = np.unique(columns["product"], return_index=True, return_inverse=True)
+    customers = _customer_fields(cust_ids)
+    products = _product_fields(prod_ids, columns["gtin"][prod_first])
+    amounts = _join(columns["qty"].astype(str), _cents(columns["sales"]),
+                    _cents(columns["landed"]), _cents(columns["allowances"]))
+    lines = [
+        f"{o:03d},{customers[ci]},INV-{inv:09d},{d},{products[pi]},{tail}"
+        for o, ci, inv, d, pi, tail in zip(
+            columns["opco"].tolist(), cust_inv.tolist(), columns["invoice"].tolist(),
+            columns["date"].tolist(), prod_inv.tolist(), amounts.tolist())
+    ]
+    if columns["invalid"]:
+        for i, field in columns["invalid"].items():
+            cells = lines[i].split(",")
+            cells[HEADER.index(field)] = f'"{INVALID_VALUES[field]}"' if "," in INVALID_VALUES[field] \
+                else INVALID_VALUES[field]
+            lines[i] = ",".join(cells)
+    return lines
+
+
+def xlsx_rows(columns):
+    """Yield a batch as typed rows for openpyxl; Qty and amounts stay numeric when valid."""
+    qty, amounts = HEADER.index("Qty"), [HEADER.index(c) for c in ("Sales", "Landed Cost", "Allowances")]
+    for cells in csv.reader(csv_lines(columns)):
+        if cells[qty].isdigit():
+            cells[qty] = int(cells[qty])
+        for index in amounts:
+            try:
+                cells[index] = float(cells[index])
+            except ValueError:
+                pass
+        yield cells
+
+
+def write_csv(path, config, rows=None, size=None, batch_size=50000, progress=None):
+    """Stream a CSV of `rows` rows or at most `size` bytes; returns (rows, bytes)."""
+    header = (",".join(HEADER) + "\n").encode("utf-8")
+    written_rows = 0
+    written_bytes = len(header)
+    batch_index = 0
+    with open(path, "wb", buffering=1 << 20) as f:
+        f.write(header)
+        while True:
+            want = batch_size if rows is None else min(batch_size, rows - written_rows)
+            if want <= 0:
+                break
+            lines = csv_lines(generate_batch(config, batch_index, want, written_rows))
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            if size is not None and written_bytes + len(data) > size:
+                # Keep whole rows only: cut at the last row that still fits
+                lengths = np.cumsum([len(line) + 1 for line in lines])
+                keep = int(np.searchsorted(lengths, size - written_bytes, side="right"))
+                data = data[:int(lengths[keep - 1])] if keep else b""
+                f.write(data)
+                written_rows += keep
+                written_bytes += len(data)
+                break
+            f.write(data)
+            written_rows += want
+            written_bytes += len(data)
+            batch_index += 1
+            if progress:
+                progress(written_rows, written_bytes)
+    return written_rows, written_bytes
+
+
+def write_xlsx(path, config, rows, batch_size=50000, progress=None):
+    """Stream an .xlsx with openpyxl's write-only workbook; returns (rows, bytes)."""
+    from openpyxl import Workbook
+
+    if rows > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX sheets hold at most {XLSX_MAX_ROWS} data rows")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Velocity")
+    sheet.append(HEADER)
+    written = 0
+    batch_index = 0
+    while written < rows:
+        want = min(batch_size, rows - written)
+        for row in xlsx_rows(generate_batch(config, batch_index, want, written)):
+            sheet.append(row)
+        written += want
+        batch_index += 1
+        if progress:
+            progress(written, None)
+    workbook.save(path)
+    return written, os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("output", help="File to write (.csv or .xlsx)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--rows", type=int, help="Number of data rows")
+    target.add_argument("--size", type=parse_size, help="Target file size, e.g. 10MB, 2GB (CSV only)")
+    parser.add_argument("--format", choices=["csv", "xlsx"],
+                        help="Output format (default: from the file extension)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--customers", type=int, default=5000, help="Distinct customers")
+    parser.add_argument("--products", type=int, default=2000, help="Distinct products")
+    parser.add_argument("--opcos", type=int, default=25, help="Distinct OpCos")
+    parser.add_argument("--invoice-lines", type=int, default=8, help="Rows per invoice number")
+    parser.add_argument("--start-date", default="2024-01-01")
+    parser.add_argument("--end-date", default="2024-12-31")
+    parser.add_argument("--invalid-rate", type=float, default=0.0,
+                        help="Fraction of rows with one deliberately invalid field")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows generated per NumPy batch")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("xlsx" if args.output.lower().endswith(".xlsx") else "csv")
+    if fmt == "xlsx" and args.size is not None:
+        parser.error("--size is only supported for CSV; use --rows with --format xlsx")
+    config = VelocityConfig(args.seed, args.customers, args.products, args.opcos, args.invoice_lines,
+                            args.start_date, args.end_date, args.invalid_rate)
+
+    start = time.perf_counter()
+
+    def progress(rows, size):
+        if sys.stderr.isatty():
+            done = f"{rows:,} rows" + (f", {size / 1048576:,.1f} MB" if size else "")
+            print(f"\r{done}", end="", file=sys.stderr)
+
+    if fmt == "xlsx":
+        rows, size = write_xlsx(args.output, config, args.rows, args.batch_size, progress)
+    else:
+        rows, size = write_csv(args.output, config, args.rows, args.size, args.batch_size, progress)
+    elapsed = time.perf_counter() - start
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(f"Wrote {args.output}: {rows:,} rows, {size:,} bytes in {elapsed:.1f}s "
+          f"({size / 1048576 / elapsed:,.1f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
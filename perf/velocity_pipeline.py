@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+End-to-end velocity ingest pipeline benchmark
+
+Runs N concurrent velocity jobs from upload to a terminal status and reports
+rows/sec ingested, time-to-processed per file size and error-row rates.
+Status is polled with adaptive backoff: the interval follows the observed
+processing rate instead of a fixed sleep.
+
+Two lifecycles are supported:
+  ingest      POST /velocity/ingest, then poll GET /velocity/jobs/{jobId}
+              (what VelocityController serves; the background processor
+              picks the job up)
+  collection  the velocity_module items: Create Velocity Job -> Upload ->
+              Process -> Get Job Processing Status -> Get Job Errors
+
+Usage:
+    python -m perf.velocity_pipeline --base-url http://localhost:5143/api \
+        --sizes 100KB 1MB 5MB 9.5MB --jobs 4 --repeat 3
+    python -m perf.velocity_pipeline --files big.csv other.xlsx --jobs 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from perf.collection import build_request, collection_variables, find_item, load_collection
+from perf.runner import add_common_arguments, login, open_session
+from perf.stats import format_table, percentile
+from perf.velocity_gen import VelocityConfig, parse_size, write_csv
+
+TERMINAL_STATUSES = {"completed", "completed_with_errors", "failed", "error", "cancelled"}
+
+COLLECTION_STEPS = {
+    "create": "Create Velocity Job",
+    "upload": "Upload Velocity File (CSV/Excel)",
+    "process": "Process Velocity Data",
+    "status": "Get Job Processing Status",
+    "errors": "Get Job Errors",
+}
+
+
+class Backoff:
+    """Poll interval that adapts to the job's progress.
+
+    While nothing changes the interval grows geometrically; once rows are
+    being processed it is set to about half the estimated time remaining.
+    """
+
+    def __init__(self, initial=0.1, maximum=5.0, factor=1.6):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.interval = initial
+        self.last = None  # (time, processed rows)
+
+    def next(self, processed, total):
+        now = time.perf_counter()
+        if self.last and processed is not None and total and processed > self.last[1]:
+            rate = (processed - self.last[1]) / (now - self.last[0])
+            remaining = (total - processed) / rate if rate > 0 else self.maximum
+            self.interval = min(self.maximum, max(self.initial, remaining / 2))
+        else:
+            self.interval = min(self.maximum, self.interval * self.factor)
+        if processed is not None:
+            self.last = (now, processed)
+        return self.interval
+
+
+def _field(data, *names):
+    """First present field; the API serializes camelCase but be tolerant."""
+    for name in names:
+        for key in (name, name[0].upper() + name[1:]):
+            if isinstance(data, dict) and data.get(key) is not None:
+                return data[key]
+    return None
+
+
+def count_rows(path):
+    if path.lower().endswith((".xlsx", ".xls")):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        rows = max(workbook.active.max_row - 1, 0)
+        workbook.close()
+        return rows
+    with open(path, "rb") as f:
+        return max(sum(buf.count(b"\n") for buf in iter(lambda: f.read(1 << 20), b"")) - 1, 0)
+
+
+def _form(path, distributor_id):
+    form = aiohttp.FormData()
+    content_type = ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    if path.lower().endswith(".xlsx") else "text/csv")
+    form.add_field("file", open(path, "rb"), filename=os.path.basename(path), content_type=content_type)
+    form.add_field("distributorId", str(distributor_id))
+    return form
+
+
+def _auth(variables):
+    return {"Authorization": "Bearer " + variables["token"]} if variables.get("token") else {}
+
+
+async def _json(response):
+    text = await response.text()
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return {"message": text}
+
+
+async def _poll(session, url, variables, timeout):
+    """Poll a job status URL until a terminal status; returns (status dict, polls)."""
+    backoff = Backoff()
+    polls = 0
+    deadline = time.perf_counter() + timeout
+    while True:
+        async with session.get(url, headers=_auth(variables)) as response:
+            data = await _json(response) if response.status == 200 else None
+        polls += 1
+        status = str(_field(data, "status") or "").lower()
+        if status in TERMINAL_STATUSES:
+            return data, polls
+        if time.perf_counter() > deadline:
+            return dict(data or {}, status="timeout"), polls
+        await asyncio.sleep(backoff.next(_field(data, "processedRows"), _field(data, "totalRows")))
+
+
+async def run_ingest_job(session, variables, path, distributor_id, timeout):
+    base = variables["baseUrl"]
+    result = {"flow": "ingest"}
+    start = time.perf_counter()
+    async with session.post(f"{base}/velocity/ingest", data=_form(path, distributor_id),
+                            headers=_auth(variables)) as response:
+        body = await _json(response)
+        result["upload_status"] = response.status
+    result["upload_s"] = time.perf_counter() - start
+    job_id = _field(body, "jobId")
+    if response.status != 200 or not job_id:
+        result.update(status=f"upload {response.status}", message=_field(body, "message"))
+        return result
+    data, polls = await _poll(session, f"{base}/velocity/jobs/{job_id}", variables, timeout)
+    result.update(job_id=job_id, polls=polls, processed_s=time.perf_counter() - start,
+                  status=_field(data, "status"), total_rows=_field(data, "totalRows"),
+                  failed_rows=_field(data, "failedRows"))
+    return result
+
+
+async def run_collection_job(session, collection, variables, path, distributor_id, timeout):
+    """The velocity_module lifecycle, with the sample job id replaced by the created one."""
+    items = {step: find_item(collection, name) for step, name in COLLECTION_STEPS.items()}
+    missing = [COLLECTION_STEPS[s] for s, item in items.items() if item is None]
+    if missing:
+        raise RuntimeError(f"Collection is missing velocity items: {', '.join(missing)}")
+
+    def url(step, job_id):
+        _, raw, _, _ = build_request(items[step], variables)
+        return raw.replace("/velocity/jobs/1/", f"/velocity/jobs/{job_id}/")
+
+    result = {"flow": "collection"}
+    start = time.perf_counter()
+    method, create_url, headers, body = build_request(items["create"], variables)
+    async with session.request(method, create_url, headers=headers, data=body) as response:
+        created = await _json(response)
+    job_id = _field(created, "jobId", "id")
+    if response.status >= 300 or job_id is None:
+        result.update(status=f"create {response.status}", message=_field(created, "message"))
+        return result
+    async with session.post(url("upload", job_id), data=_form(path, distributor_id),
+                            headers=_auth(variables)) as response:
+        await response.read()
+        result["upload_status"] = response.status
+    result["upload_s"] = time.perf_counter() - start
+    if response.status >= 300:
+        result["status"] = f"upload {response.status}"
+        return result
+    async with session.post(url("process", job_id), headers=_auth(variables)) as response:
+        await response.read()
+    data, polls = await _poll(session, url("status", job_id), variables, timeout)
+    result.update(job_id=job_id, polls=polls, processed_s=time.perf_counter() - start,
+                  status=_field(data, "status"), total_rows=_field(data, "totalRows"),
+                  failed_rows=_field(data, "failedRows"))
+    async with session.get(url("errors", job_id), headers=_auth(variables)) as response:
+        errors = await _json(response) if response.status == 200 else None
+    if result["failed_rows"] is None and errors is not None:
+        result["failed_rows"] = len(errors if isinstance(errors, list) else _field(errors, "errors") or [])
+    return result
+
+
+def generate_files(sizes, directory, seed, invalid_rate):
+    """Velocity CSVs at the given byte sizes, via perf.velocity_gen."""
+    files = []
+    for index, size in enumerate(sizes):
+        path = os.path.join(directory, f"velocity_{size}.csv")
+        rows, written = write_csv(path, VelocityConfig(seed=seed + index, invalid_rate=invalid_rate), size=size)
+        files.append((path, rows, written))
+    return files
+
+
+async def run_pipeline(files, variables, collection, flow, jobs, repeat, distributor_id, timeout,
+                       user=None, password=None):
+    semaphore = asyncio.Semaphore(jobs)
+    results = []
+    async with open_session(jobs * 2, timeout=max(timeout, 60)) as session:
+        await login(session, collection, variables, user, password)
+
+        async def one(path, rows, size):
+            async with semaphore:
+                if flow == "ingest":
+                    result = await run_ingest_job(session, variables, path, distributor_id, timeout)
+                else:
+                    result = await run_collection_job(session, collection, variables, path,
+                                                      distributor_id, timeout)
+            result.update(file=os.path.basename(path), bytes=size, rows=rows)
+            results.append(result)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(*f) for f in files for _ in range(repeat)))
+        wall = time.perf_counter() - start
+    return results, wall
+
+
+def completed(result):
+    """Whether the job finished; timed-out, failed or cancelled jobs have a processed_s but no ingest rate."""
+    return str(result.get("status")).lower().startswith("completed")
+
+
+def summarize_by_size(results):
+    rows = []
+    for size in sorted({r["bytes"] for r in results}):
+        group = [r for r in results if r["bytes"] == size]
+        finished = [r for r in group if completed(r)]
+        done = sorted(r["processed_s"] for r in finished)
+        total = sum((r.get("total_rows") or r["rows"]) for r in finished)
+        failed = sum(r.get("failed_rows") or 0 for r in finished)
+        rows.append({
+            "name": group[0]["file"],
+            "mb": size / 1048576,
+            "rows": group[0]["rows"],
+            "jobs": len(group),
+            "ok": len(finished),
+            "upload_s": sorted(r.get("upload_s", 0) for r in group)[len(group) // 2],
+            "p50_s": percentile(done, 50),
+            "max_s": done[-1] if done else 0.0,
+            "rows_per_s": total / sum(done) if done else 0.0,
+            "error_pct": 100.0 * failed / total if total else 0.0,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--files", nargs="+", help="Existing velocity files to upload")
+    source.add_argument("--sizes", nargs="+", type=parse_size,
+                        help="Generate CSVs of these sizes (e.g. 100KB 1MB 9.5MB)")
+    parser.add_argument("--flow", choices=["ingest", "collection"], default="ingest")
+    parser.add_argument("--jobs", type=int, default=4, help="Concurrent jobs")
+    parser.add_argument("--repeat", type=int, default=1, help="Jobs per file")
+    parser.add_argument("--distributor-id", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0,
+                        help="Fraction of invalid rows in generated files")
+    parser.add_argument("--job-timeout", type=float, default=1800.0,
+                        help="Give up polling a job after this many seconds")
+    parser.add_argument("--json", help="Write per-job results to this file")
+    args = parser.parse_args(argv)
+
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+
+    with tempfile.TemporaryDirectory(prefix="velocity-") as directory:
+        if args.sizes:
+            files = generate_files(args.sizes, directory, args.seed, args.invalid_rate)
+        else:
+            files = [(path, count_rows(path), os.path.getsize(path)) for path in args.files]
+        print(f"Running {len(files) * args.repeat} {args.flow} jobs, {args.jobs} at a time, "
+              f"against {variables['baseUrl']}")
+        results, wall = asyncio.run(run_pipeline(
+            files, variables, collection, args.flow, args.jobs, args.repeat, args.distributor_id,
+            args.job_timeout, args.user, args.password))
+
+    ingested = sum((r.get("total_rows") or r["rows"]) for r in results if completed(r))
+    print(format_table(summarize_by_size(results), [
+        ("name", "File"), ("mb", "MB", ".2f"), ("rows", "Rows", ","), ("jobs", "Jobs"), ("ok", "Completed"),
+        ("upload_s", "Upload s", ".2f"), ("p50_s", "p50 processed s", ".2f"),
+        ("max_s", "Max processed s", ".2f"), ("rows_per_s", "Rows/s per job", ",.0f"),
+        ("error_pct", "Error rows %", ".2f"),
+    ]))
+    print(f"\nWall time {wall:.1f}s, {ingested / wall:,.0f} rows/s ingested across {args.jobs} concurrent jobs")
+    failed = [r for r in results if not completed(r)]
+    for r in failed:
+        print(f"  {r['file']}: {r.get('status')} {r.get('message') or ''}".rstrip())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"wall_s": wall, "jobs": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
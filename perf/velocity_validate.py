@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Offline velocity file pre-validator
+
+Checks a velocity CSV in the 20-column layout of
+sample_velocity_data_new_format.csv before it is uploaded. The checks are the
+ones VelocityCsvParser.ValidateRow applies:
+
+    Qty          non-negative integer (int.TryParse)
+    Sales, Landed Cost, Allowances
+                 decimal (decimal.TryParse, NumberStyles.Any, invariant culture)
+    Invoice Date a date DateTime.TryParse accepts (ISO, M/d/yyyy, "Dec 1, 2024", ...)
+
+plus stricter checks the server does not apply (skip them with --server-rules):
+
+    header       the 20 expected column names (Freight1/Freight2 may follow)
+    columns      20 or 22 fields per row; an unquoted comma shifts every field
+    GTIN         8, 12, 13 or 14 digits
+
+Like the server, the file is split into lines and blank lines are skipped.
+Row numbers count the header as row 1. The file is cut into --chunk-size
+byte ranges on line boundaries, and a process pool validates them. Each
+worker reads only its own range, so a 1 GB file takes about as long as its
+largest chunk does on one core.
+
+Failed rows are written to --output in the shape VelocityService stores them
+and returns as job rows: rowIndex, status "failed", errorMessage (the "Row N:
+..." messages joined by "; ") and rawData (the VelocityShipmentCsvRow as
+JSON). Distributors see the same messages they would get after a full
+upload-and-process round-trip.
+
+Usage:
+    python -m perf.velocity_validate velocity.csv --output errors.json
+    python -m perf.velocity_validate velocity_1g.csv --workers 8 --chunk-size 32MB --server-rules
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from perf.velocity_gen import HEADER, parse_size
+
+FREIGHT = ["Freight1", "Freight2"]
+# VelocityShipmentCsvRow property order; JsonSerializer keeps the PascalCase names in rawData
+ROW_FIELDS = [
+    "OpCo", "CustomerNumber", "CustomerName", "AddressOne", "AddressTwo",
+    "City", "ZipCode", "InvoiceNumber", "InvoiceDate", "ProductNumber",
+    "Brand", "PackSize", "Description", "CorpManufNumber", "GTIN",
+    "ManufacturerName", "Qty", "Sales", "LandedCost", "Allowances",
+    "Freight1", "Freight2",
+]
+CHUNK_SIZE = 16 * 1024 * 1024
+
+_INTEGER = re.compile(r"[+-]?\d+")
+# decimal.TryParse with NumberStyles.Any: sign, parentheses, currency symbol, thousands, exponent
+_DECIMAL = re.compile(r"\(?\s*[+-]?\s*¤?\s*[+-]?(?:\d[\d,]*(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?\s*[+-]?\s*\)?")
+_DATE_FORMATS = [
+    "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%Y/%m/%d",
+    "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %I:%M %p", "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%y", "%m-%d-%Y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%b %d %Y",
+]
+_AMOUNTS = [(HEADER.index(name), name) for name in ("Sales", "Landed Cost", "Allowances")]
+_QTY, _DATE, _GTIN_COLUMN = HEADER.index("Qty"), HEADER.index("Invoice Date"), HEADER.index("GTIN")
+
+
+@functools.lru_cache(maxsize=65536)
+def _date_ok(value):
+    """DateTime.TryParse for the formats a distributor file realistically has; cached per value."""
+    text = value[:-1] if value.endswith("Z") else value
+    for fmt in _DATE_FORMATS:
+        try:
+            datetime.datetime.strptime(text, fmt)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+def parse_line(line):
+    """VelocityCsvParser.ParseCsvLine: split on commas outside quotes, drop the quotes."""
+    if '"' not in line:
+        return line.split(",")
+    values, current, quoted = [], [], False
+    for c in line:
+        if c == '"':
+            quoted = not quoted
+        elif c == "," and not quoted:
+            values.append("".join(current))
+            current = []
+        else:
+            current.append(c)
+    values.append("".join(current))
+    return values
+
+
+def validate_fields(fields, strict=True):
+    """Error messages for one row, without the "Row N: " prefix."""
+    errors = []
+    if strict and len(fields) not in (len(HEADER), len(HEADER) + len(FREIGHT)):
+        errors.append(f"Expected {len(HEADER)} columns, found {len(fields)}")
+    if len(fields) < len(HEADER):
+        fields = fields + [""] * (len(HEADER) - len(fields))
+    # isdigit() fast paths first: almost every value in a real file is a plain number
+    qty = fields[_QTY].strip()
+    if qty and not (qty.isascii() and qty.isdigit() and len(qty) < 10) and (
+            not _INTEGER.fullmatch(qty) or not 0 <= int(qty) <= 2147483647):
+        errors.append("Qty must be a valid non-negative integer")
+    for index, name in _AMOUNTS:
+        value = fields[index].strip()
+        if value and not (value.isascii() and value.replace(".", "", 1).isdigit()) and not (
+                _DECIMAL.fullmatch(value) and any(c.isdigit() for c in value)):
+            errors.append(f"{name} must be a valid decimal number")
+    date = fields[_DATE].strip()
+    if date and not _date_ok(date):
+        errors.append("Invoice Date must be a valid date")
+    if strict:
+        gtin = fields[_GTIN_COLUMN].strip()
+        if gtin and not (gtin.isascii() and gtin.isdigit() and len(gtin) in (8, 12, 13, 14)):
+            errors.append("GTIN must be 8, 12, 13 or 14 digits")
+    return errors
+
+
+def check_header(line):
+    """Header problem as a message, or None."""
+    names = [name.strip() for name in parse_line(line.lstrip("﻿"))]
+    if names == HEADER or names == HEADER + FREIGHT:
+        return None
+    missing = [name for name in HEADER if name not in names]
+    if missing:
+        return f"Header is missing {', '.join(missing)}"
+    return "Header columns are out of order; fields are read by position"
+
+
+def chunk_ranges(path, chunk_size=CHUNK_SIZE):
+    """[(start, end)] byte ranges that begin and end on line boundaries."""
+    size = os.path.getsize(path)
+    ranges, start = [], 0
+    with open(path, "rb") as f:
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def validate_chunk(job):
+    """Validate the lines in [start, end); returns (rows, failed rows, counts, [(ordinal, errors, fields)])."""
+    path, start, end, strict, max_errors = job
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8-sig" if start == 0 else "utf-8", errors="replace")
+    lines = text.split("\n")
+    if start == 0:
+        lines = lines[1:]  # header
+    rows, bad, counts, failed = 0, 0, {}, []
+    for line in lines:
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line.strip():
+            continue
+        fields = parse_line(line)
+        errors = validate_fields(fields, strict)
+        if errors:
+            bad += 1
+            for message in errors:
+                rule = message.split(" must ")[0] if " must " in message else "Columns"
+                counts[rule] = counts.get(rule, 0) + 1
+            if len(failed) < max_errors:
+                failed.append((rows, errors, fields))
+        rows += 1
+    return rows, bad, counts, failed
+
+
+def job_row(row_index, errors, fields):
+    """A failed row as VelocityService records it (VelocityJobRowDto)."""
+    values = [value.strip() or None for value in fields[:len(ROW_FIELDS)]]
+    values += [None] * (len(ROW_FIELDS) - len(values))
+    return {
+        "rowIndex": row_index,
+        "status": "failed",
+        "errorMessage": "; ".join(f"Row {row_index}: {message}" for message in errors),
+        "rawData": json.dumps(dict(zip(ROW_FIELDS, values)), separators=(",", ":"), ensure_ascii=False),
+    }
+
+
+def validate_file(path, workers=None, chunk_size=CHUNK_SIZE, strict=True, max_errors=1000):
+    """Validate a whole file; returns a summary dict and the failed job rows (at most max_errors)."""
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        header = f.readline().rstrip("\r\n")
+    header_error = check_header(header) if strict else None
+    ranges = chunk_ranges(path, chunk_size)
+    jobs = [(path, start, end, strict, max_errors) for start, end in ranges]
+    rows, counts, failed_rows, errors = 0, {}, 0, []
+    if header_error:
+        errors.append({"rowIndex": 1, "status": "failed", "errorMessage": f"Row 1: {header_error}",
+                       "rawData": json.dumps(header)})
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_rows, chunk_failed, chunk_counts, failed in pool.map(validate_chunk, jobs):
+            for ordinal, messages, fields in failed:
+                if len(errors) < max_errors:
+                    errors.append(job_row(rows + ordinal + 2, messages, fields))
+            failed_rows += chunk_failed
+            for rule, count in chunk_counts.items():
+                counts[rule] = counts.get(rule, 0) + count
+            rows += chunk_rows
+    summary = {"rows": rows, "failed_rows": failed_rows, "error_counts": counts, "header_error": header_error,
+               "chunks": len(ranges), "bytes": os.path.getsize(path)}
+    return summary, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("file", help="Velocity CSV to validate")
+    parser.add_argument("--output", help="Write failed rows (job row shape) to this JSON file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Validator processes")
+    parser.add_argument("--chunk-size", type=parse_size, default=CHUNK_SIZE, help="Bytes per chunk (e.g. 32MB)")
+    parser.add_argument("--server-rules", action="store_true",
+                        help="Only the checks the API applies (no header, column count or GTIN checks)")
+    parser.add_argument("--max-errors", type=int, default=10000, help="Failed rows kept for --output")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary, errors = validate_file(args.file, args.workers, args.chunk_size, not args.server_rules,
+                                    args.max_errors)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['rows']:,} rows, {summary['bytes'] / 1e6:,.1f} MB in {elapsed:.2f}s "
+          f"({summary['bytes'] / 1e6 / elapsed:,.0f} MB/s, {summary['chunks']} chunks, {args.workers} workers)")
+    print(f"{summary['failed_rows']:,} rows would fail on the server" if args.server_rules
+          else f"{summary['failed_rows']:,} rows with problems")
+    if summary["header_error"]:
+        print(f"  header: {summary['header_error']}")
+    for rule, count in sorted(summary["error_counts"].items(), key=lambda kv: -kv[1]):
+        print(f"  {rule}: {count:,} rows")
+    for error in errors[:5]:
+        print(f"  {error['errorMessage']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(errors, f, indent=2, ensure_ascii=False)
+    return 1 if summary["failed_rows"] or summary["header_error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
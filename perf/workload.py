@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Open-loop workload runner
+
+Each stream in a workload file sends one collection item (or a module's items,
+round-robin) at a fixed arrival rate, Poisson or constant, regardless of how
+fast the API answers. Latency is measured from the *intended* send time, so
+time spent queued behind a slow response counts, and is recorded into
+mergeable histograms (perf.histogram). Service time (from the actual send)
+is reported alongside; a large gap between the two is queueing.
+
+Workload file (JSON):
+    {
+      "duration": 120,
+      "arrival": "poisson",
+      "streams": [
+        {"module": "lookup", "rate": 40},
+        {"item": "Get Contract by ID", "rate": 30},
+        {"module": "reports", "rate": 4},
+        {"item": "Execute Bulk Renewal", "rate": 0.02}
+      ]
+    }
+
+A stream selects items by "item" (name or list of names), "module" (number or
+name, as --modules), or both; "methods" defaults to GET for module streams.
+"rate" is requests/sec for the whole stream; "arrival" may be set per stream.
+
+Usage:
+    python -m perf.workload perf/workloads/contract_api.json --base-url http://localhost:5143/api
+    python -m perf.workload perf/workloads/contract_api.json --scale 2 --json run.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import aiohttp
+
+from perf.collection import collection_variables, load_collection
+from perf.histogram import Histogram
+from perf.plan import bearer_value, compile_plan
+from perf.results import add_store_arguments, save_from_args
+from perf.runner import add_common_arguments, login, open_session, select_items, send
+from perf.seed import SeededIds
+from perf.stats import LATENCY_COLUMNS, format_table
+
+ARRIVALS = ("poisson", "constant")
+WORKLOAD_COLUMNS = LATENCY_COLUMNS[:-1] + [("p999_ms", "p99.9 ms", ".1f")] + LATENCY_COLUMNS[-1:]
+
+
+def load_workload(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class Stream:
+    """One arrival process over a fixed list of compiled requests."""
+
+    def __init__(self, label, plan, rate, arrival):
+        if arrival not in ARRIVALS:
+            raise ValueError(f"Stream {label!r}: unknown arrival {arrival!r}")
+        self.label = label
+        self.plan = plan
+        self.rate = rate
+        self.arrival = arrival
+        # Fraction of the first interval before the first arrival; perf.distributed
+        # staggers the shards of a constant stream with it
+        self.phase = 1.0
+
+    def interval(self, rng):
+        return rng.expovariate(self.rate) if self.arrival == "poisson" else 1.0 / self.rate
+
+
+def build_streams(workload, collection, variables, scale=1.0, ids=None):
+    default_arrival = workload.get("arrival", "poisson")
+    streams = []
+    for spec in workload["streams"]:
+        names = spec.get("item")
+        names = [names] if isinstance(names, str) else names
+        module = spec.get("module")
+        methods = spec.get("methods", None if names else ["GET"])
+        label = spec.get("label") or module or ", ".join(names or [])
+        items = select_items(collection, [module] if module else None, methods, names)
+        if not items:
+            raise ValueError(f"Stream {label!r} matches no items")
+        rate = float(spec["rate"]) * scale
+        if rate > 0:
+            streams.append(Stream(label, compile_plan(items, variables, ids), rate,
+                                  spec.get("arrival", default_arrival)))
+    return streams
+
+
+class WorkloadRecorder:
+    """Response-time and service-time histograms per (stream, module, item)."""
+
+    def __init__(self):
+        self.response = {}
+        self.service = {}
+        self.errors = {}
+        self.dispatch_lag = Histogram()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, stream, request, status, intended, sent, done):
+        key = (stream.label, request.module, request.name)
+        if key not in self.response:
+            self.response[key] = Histogram()
+            self.service[key] = Histogram()
+            self.errors[key] = 0
+        self.response[key].record_seconds(done - intended)
+        self.service[key].record_seconds(done - sent)
+        self.dispatch_lag.record_seconds(sent - intended)
+        if status == 0 or status >= 400:
+            self.errors[key] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def rows(self, histograms, by="endpoint"):
+        """Merged summaries per "stream", per "endpoint" (module / item) or "all"."""
+        merged = {}
+        errors = {}
+        for key, histogram in histograms.items():
+            name = {"stream": key[0], "endpoint": f"{key[1]} / {key[2]}"}.get(by, "all")
+            merged.setdefault(name, Histogram()).merge(histogram)
+            errors[name] = errors.get(name, 0) + self.errors[key]
+        rows = []
+        for name, histogram in sorted(merged.items()):
+            row = histogram.summary(self.elapsed, errors[name])
+            row["name"] = name
+            rows.append(row)
+        return rows
+
+    def histograms(self):
+        """{"module / item": (merged response-time Histogram, errors)} for perf.results."""
+        out = {}
+        for key, histogram in self.response.items():
+            name = f"{key[1]} / {key[2]}"
+            merged, errors = out.get(name, (Histogram(), 0))
+            out[name] = (merged.merge(histogram), errors + self.errors[key])
+        return out
+
+    def to_dict(self):
+        return {
+            "duration_s": self.elapsed,
+            "dispatch_lag": self.dispatch_lag.to_dict(),
+            "endpoints": [{"stream": k[0], "module": k[1], "name": k[2], "errors": self.errors[k],
+                           "response": self.response[k].to_dict(),
+                           "service": self.service[k].to_dict()} for k in sorted(self.response)],
+        }
+
+
+async def _fire(session, stream, request, bearer, intended, slots, recorder):
+    async with slots:
+        sent = time.perf_counter()
+        try:
+            status = await send(session, request.method, request.url,
+                                request.request_headers(bearer), request.body)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 0
+    recorder.record(stream, request, status, intended, sent, time.perf_counter())
+
+
+async def _arrivals(session, stream, variables, start, deadline, slots, recorder, rng, pending):
+    bearer = bearer_value(variables.get("token"))
+    intended = start + stream.interval(rng) * stream.phase
+    index = 0
+    while intended < deadline:
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        request = stream.plan[index % len(stream.plan)]
+        index += 1
+        task = asyncio.ensure_future(_fire(session, stream, request, bearer, intended, slots, recorder))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        intended += stream.interval(rng)
+
+
+async def run_workload(streams, variables, duration, session, max_in_flight=1000, seed=None,
+                       recorder=None):
+    """Run all streams open-loop for `duration` seconds; returns the WorkloadRecorder.
+
+    Arrivals beyond max_in_flight wait for a free slot, and that wait is part
+    of their latency, as it would be for a user. `recorder` replaces the
+    default WorkloadRecorder (record(stream, request, status, intended, sent,
+    done) and stop()).
+    """
+    recorder = recorder or WorkloadRecorder()
+    slots = asyncio.Semaphore(max_in_flight)
+    pending = set()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(_arrivals(session, stream, variables, start, start + duration, slots,
+                                     recorder, random.Random(rng.random()), pending)
+                           for stream in streams))
+    if pending:
+        await asyncio.gather(*list(pending))
+    recorder.stop()
+    return recorder
+
+
+def print_report(recorder):
+    print(f"\nDuration: {recorder.elapsed:.1f}s")
+    lag = recorder.dispatch_lag
+    print(f"Dispatch lag (actual - intended send): p50 {lag.value_at(50) / 1000:.1f} ms, "
+          f"p99 {lag.value_at(99) / 1000:.1f} ms, max {(lag.max or 0) / 1000:.1f} ms\n")
+    print("Response time from intended send, per stream")
+    print(format_table(recorder.rows(recorder.response, "stream"), WORKLOAD_COLUMNS))
+    print("\nResponse time from intended send, per endpoint")
+    print(format_table(recorder.rows(recorder.response), WORKLOAD_COLUMNS))
+    print("\nService time from actual send, per endpoint")
+    print(format_table(recorder.rows(recorder.service), WORKLOAD_COLUMNS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser)
+    parser.add_argument("workload", help="Workload JSON file")
+    parser.add_argument("--duration", type=float, help="Seconds to run (default: the file's duration)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every stream's rate")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Connection pool size and cap on outstanding requests")
+    parser.add_argument("--seed", type=int, help="Seed for Poisson arrivals")
+    parser.add_argument("--json", help="Write the histograms (mergeable) to this file")
+    parser.add_argument("--seed-ids", help="seed_ids.json from perf.seed: replace hardcoded ids")
+    add_store_arguments(parser)
+    args = parser.parse_args(argv)
+
+    workload = load_workload(args.workload)
+    collection = load_collection(args.collection, args.scan_controllers)
+    variables = collection_variables(collection, args.base_url)
+    try:
+        ids = SeededIds.load(args.seed_ids) if args.seed_ids else None
+        streams = build_streams(workload, collection, variables, args.scale, ids)
+    except ValueError as e:
+        parser.error(str(e))
+    duration = args.duration or workload.get("duration", 60)
+    total = sum(s.rate for s in streams)
+    print(f"{len(streams)} streams, {total:.1f} req/s offered for {duration:g}s against "
+          f"{variables['baseUrl']}")
+
+    async def run():
+        async with open_session(args.max_in_flight, args.timeout) as session:
+            await login(session, collection, variables, args.user, args.password)
+            return await run_workload(streams, variables, duration, session, args.max_in_flight,
+                                      args.seed)
+
+    recorder = asyncio.run(run())
+    print_report(recorder)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(recorder.to_dict(), f, indent=2)
+    save_from_args(args, "workload", recorder.histograms(), recorder.elapsed, variables["baseUrl"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())